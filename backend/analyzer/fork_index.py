@@ -0,0 +1,288 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from backend.analyzer.openrouter_analyzer import cap_low_liquidity
+from backend.config import get_fork_index_config
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime modulus of the universal hash family (as in datasketch).
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SEED = 1
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# Link values that say nothing about the project itself.
+_GENERIC_HOSTS = {"twitter.com", "x.com", "t.me", "discord.gg", "discord.com", "medium.com", "github.com"}
+# Analysis fields that belong to the original project, not to its fork.
+_OWN_FIELDS = {
+    "token_symbol": "unknown",
+    "contract_address": "unknown",
+    "where_to_buy": "unknown",
+    "has_token": False,
+}
+_TRANSIENT_FIELDS = ("strategy", "json_repairs", "stopped_early", "is_truncated", "score_source", "prescreen")
+
+
+def _host(url: Any) -> Optional[str]:
+    if not url or not isinstance(url, str):
+        return None
+    host = urlparse(url if "//" in url else f"//{url}").hostname
+    if not host:
+        return None
+    return host[4:] if host.startswith("www.") else host
+
+
+def features(project: Dict[str, Any], shingle: int = 5) -> Set[str]:
+    """
+    Shingles a project is compared by: character 5-grams of the description
+    with the project's own name blanked out (forks mostly swap the name and
+    the chain), the site domain, and link targets (host + path, so two repos
+    of the same org on github.com still differ).
+    """
+    text = (project.get("description") or "").lower()
+    name = (project.get("name") or "").lower().strip()
+    if name:
+        text = text.replace(name, " ")
+    text = " ".join(_TOKEN.findall(text))
+    out = {text[i:i + shingle] for i in range(max(1, len(text) - shingle + 1))} if text else set()
+    domain = _host(project.get("url"))
+    if domain:
+        out.add(f"domain:{domain}")
+    for value in (project.get("links") or {}).values():
+        for link in value if isinstance(value, list) else [value]:
+            host = _host(link)
+            if not host:
+                continue
+            path = urlparse(link if "//" in link else f"//{link}").path.strip("/").lower()
+            if host in _GENERIC_HOSTS and not path:
+                continue
+            out.add(f"link:{host}/{path}")
+    return out
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` permutations of a 32-bit hash."""
+
+    def __init__(self, num_perm: int = 128, seed: int = _SEED):
+        self.num_perm = num_perm
+        gen = np.random.RandomState(seed)
+        self._a = gen.randint(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = gen.randint(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: Iterable[str]) -> np.ndarray:
+        values = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+        )
+        if values.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # (a*x + b) mod p, truncated to 32 bits; wrap-around of a*x is part of the scheme.
+        with np.errstate(over="ignore"):
+            hashed = (np.outer(values, self._a) + self._b) % _PRIME & _MAX_HASH
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class ForkIndex:
+    """
+    Near-duplicate index of analyzed projects (MinHash + LSH banding).
+
+    Signatures are split into `bands` bands; two projects become candidates
+    when any band matches exactly, and a candidate counts as the same
+    project when its estimated Jaccard similarity reaches `threshold`.
+    Buckets live in memory and are updated on every `add`; signatures and
+    the analysis to reuse are persisted in SQLite, so the index survives
+    restarts and grows incrementally. Blocking methods are meant to be run
+    in an executor; a lock serialises access to the shared connection.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        num_perm: int = 128,
+        bands: int = 32,
+        threshold: float = 0.7,
+        max_age: Optional[float] = 7 * 86400,
+        min_tokens: int = 8,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = path
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_age = max_age
+        self.min_tokens = min_tokens
+        self.hits = 0
+        self.lookups = 0
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fork_index (
+                    project_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    signature BLOB,
+                    analysis TEXT,
+                    analyzed_at REAL
+                )
+                """
+            )
+        self._load()
+
+    @classmethod
+    def from_config(cls) -> Optional["ForkIndex"]:
+        """Index configured in llm.fork_index, or None when it is disabled."""
+        cfg = get_fork_index_config()
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            cfg.get("path", "data/fork_index.db"),
+            num_perm=int(cfg.get("num_perm", 128)),
+            bands=int(cfg.get("bands", 32)),
+            threshold=float(cfg.get("threshold", 0.7)),
+            max_age=float(cfg["max_age"]) if cfg.get("max_age") else None,
+            min_tokens=int(cfg.get("min_tokens", 8)),
+        )
+
+    def _load(self) -> None:
+        skipped = 0
+        for project_id, blob in self._conn.execute("SELECT project_id, signature FROM fork_index"):
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            if len(signature) != self.hasher.num_perm:
+                skipped += 1
+                continue
+            self._insert(project_id, signature)
+        if skipped:
+            logger.warning("Fork index: %s signatures of another num_perm ignored", skipped)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _insert(self, project_id: str, signature: np.ndarray) -> None:
+        old = self._signatures.get(project_id)
+        if old is not None:
+            for key in self._band_keys(old):
+                self._buckets.get(key, set()).discard(project_id)
+        self._signatures[project_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(project_id)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, project: Dict[str, Any]) -> Optional[np.ndarray]:
+        """None for projects with too little text to be compared safely."""
+        words = _TOKEN.findall(project.get("description") or "")
+        if len(words) < self.min_tokens:
+            return None
+        return self.hasher.signature(features(project))
+
+    def add(self, project: Dict[str, Any], analysis: Dict[str, Any]) -> bool:
+        """Indexes an analyzed project; inherited and fallback analyses are not indexed."""
+        if analysis.get("is_fallback") or analysis.get("fork_of") or analysis.get("is_prescreen"):
+            return False
+        signature = self.signature(project)
+        if signature is None:
+            return False
+        stored = {k: v for k, v in analysis.items() if k not in _TRANSIENT_FIELDS}
+        with self._lock:
+            self._insert(project["id"], signature)
+            with self._conn:
+                self._conn.execute(
+                    """
+                    INSERT INTO fork_index (project_id, name, signature, analysis, analyzed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(project_id) DO UPDATE SET
+                        name = excluded.name,
+                        signature = excluded.signature,
+                        analysis = excluded.analysis,
+                        analyzed_at = excluded.analyzed_at
+                    """,
+                    (
+                        project["id"],
+                        project.get("name"),
+                        signature.tobytes(),
+                        json.dumps(stored, ensure_ascii=False),
+                        time.time(),
+                    ),
+                )
+        return True
+
+    def match(self, project: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Best indexed near-duplicate of `project` (other than itself) with a
+        fresh analysis: {"id", "name", "similarity", "analysis"} or None.
+        """
+        signature = self.signature(project)
+        if signature is None:
+            return None
+        with self._lock:
+            self.lookups += 1
+            candidates: Set[str] = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            candidates.discard(project["id"])
+            ranked = sorted(
+                ((similarity(signature, self._signatures[c]), c) for c in candidates),
+                reverse=True,
+            )
+            oldest = time.time() - self.max_age if self.max_age else 0.0
+            for score, candidate in ranked:
+                if score < self.threshold:
+                    break
+                row = self._conn.execute(
+                    "SELECT name, analysis, analyzed_at FROM fork_index WHERE project_id = ?",
+                    (candidate,),
+                ).fetchone()
+                if row is None or row[2] < oldest:
+                    continue
+                self.hits += 1
+                return {"id": candidate, "name": row[0], "similarity": round(score, 3), "analysis": json.loads(row[1])}
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"projects": len(self), "lookups": self.lookups, "hits": self.hits}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def inherit_analysis(project: Dict[str, Any], match: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The matched project's analysis reused for its fork: score, verdict and
+    research carry over, token and listing fields are reset to the fork's
+    own, and the result is annotated with "fork_of". The low-liquidity cap
+    is applied again against the fork's own TVL, as the ensemble does.
+    """
+    result = dict(match["analysis"])
+    result.update(_OWN_FIELDS)
+    result["exchanges"] = []
+    result["buy_links"] = []
+    result["token_symbol"] = project.get("token_symbol") or "unknown"
+    result["fork_of"] = {"id": match["id"], "name": match["name"], "similarity": match["similarity"]}
+    result["summary"] = f"Fork of {match['name']} (similarity {match['similarity']:.2f}). {result.get('summary', '')}".strip()
+    result["backend"] = "fork_index"
+    return cap_low_liquidity(result, project)
@@ -0,0 +1,409 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Repairs reported by extract_json, in the order they can be applied.
+CODE_FENCE = "code_fence"
+TRAILING_COMMA = "trailing_comma"
+EXTRA_COMMA = "extra_comma"
+MISSING_COMMA = "missing_comma"
+MISSING_COLON = "missing_colon"
+SINGLE_QUOTES = "single_quotes"
+SMART_QUOTES = "smart_quotes"
+INNER_QUOTES = "inner_quotes"
+UNQUOTED_KEYS = "unquoted_keys"
+BARE_WORDS = "bare_words"
+NUMBER_FORMAT = "number_format"
+PYTHON_LITERALS = "python_literals"
+COMMENTS = "comments"
+CONTROL_CHARS = "control_chars"
+INVALID_ESCAPE = "invalid_escape"
+MISMATCHED_BRACKET = "mismatched_bracket"
+STRAY_CHARS = "stray_chars"
+TRUNCATED = "truncated"
+
+# Candidate "{"/"[" positions tried before giving up on a response.
+MAX_CANDIDATES = 8
+# Analyses nest three levels deep; anything far deeper is not an answer.
+MAX_DEPTH = 32
+
+_DECODER = json.JSONDecoder()
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_WORD = re.compile(r"[A-Za-z_$][\w$.\-]*")
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+    "NaN": "null", "Infinity": "null", "undefined": "null",
+}
+_CLOSERS = {"{": "}", "[": "]"}
+_OPEN_QUOTES = {'"': '"', "'": "'", "“": "”", "”": "”", "„": "”"}
+_FENCE = re.compile(r"```[A-Za-z]*")
+# "7.5/10", "7,5 / 10", "8/10 (strong)", "6.5"
+_RATING = re.compile(r"(-?\d+(?:[.,]\d+)?)\s*(?:/\s*(\d+(?:[.,]\d+)?))?")
+
+
+class Extraction:
+    """Result of extract_json: the decoded value and the repairs it needed."""
+
+    __slots__ = ("data", "repairs", "error")
+
+    def __init__(self, data: Any = None, repairs: Optional[List[str]] = None, error: Optional[str] = None):
+        self.data = data
+        self.repairs = repairs or []
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        return f"Extraction(ok={self.ok}, repairs={self.repairs}, error={self.error!r})"
+
+
+class _Rewriter:
+    """
+    Single pass over one JSON-ish value starting at `start`, emitting strict
+    JSON tokens. Whitespace is dropped, so the last emitted token is always
+    the last significant one and trailing commas are a pop away. Every
+    object/array frame tracks what it expects next, which is enough to
+    insert missing commas/colons and to cut a dangling key on truncation.
+    """
+
+    def __init__(self, text: str, start: int):
+        self.s = text
+        self.i = start
+        self.out: List[str] = []
+        self.repairs: List[str] = []
+        # frames: [opener, expected ("key"/"colon"/"value"/"after"), index of the current key in out]
+        self.stack: List[List[Any]] = []
+
+    def note(self, repair: str) -> None:
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def run(self) -> Tuple[str, int]:
+        s, n = self.s, len(self.s)
+        while self.i < n:
+            ch = s[self.i]
+            if ch in " \t\r\n":
+                self.i += 1
+            elif ch in "{[":
+                self._before_value()
+                self.out.append(ch)
+                self.stack.append([ch, "key" if ch == "{" else "value", -1])
+                self.i += 1
+                if len(self.stack) > MAX_DEPTH:
+                    return "", self.i
+            elif ch in "}]":
+                self._close(ch)
+                self.i += 1
+                if not self.stack:
+                    return "".join(self.out), self.i
+            elif ch == ",":
+                self._comma()
+                self.i += 1
+            elif ch == ":":
+                frame = self.stack[-1] if self.stack else None
+                if frame is not None and frame[1] == "colon":
+                    self.out.append(":")
+                    frame[1] = "value"
+                else:
+                    self.note(STRAY_CHARS)
+                self.i += 1
+            elif ch in _OPEN_QUOTES:
+                self._string(ch)
+            elif ch == "/" and s.startswith(("//", "/*"), self.i):
+                self.note(COMMENTS)
+                end = s.find("\n" if s[self.i + 1] == "/" else "*/", self.i + 2)
+                self.i = n if end == -1 else end + (1 if s[self.i + 1] == "/" else 2)
+            elif ch == "`" and _FENCE.match(s, self.i):
+                self.note(CODE_FENCE)
+                self.i = _FENCE.match(s, self.i).end()
+            elif ch in "-+.0123456789":
+                self._number()
+            elif _WORD.match(s, self.i):
+                self._word()
+            else:
+                self.note(STRAY_CHARS)
+                self.i += 1
+            if not self.stack and self.out:
+                return "".join(self.out), self.i
+        self._truncate()
+        return "".join(self.out), self.i
+
+    def _before_value(self) -> None:
+        """Called before any value; fixes the separator the model forgot."""
+        if not self.stack:
+            return
+        frame = self.stack[-1]
+        if frame[1] == "after":
+            self.note(MISSING_COMMA)
+            self.out.append(",")
+            frame[1] = "key" if frame[0] == "{" else "value"
+        if frame[0] == "{" and frame[1] == "colon":
+            self.note(MISSING_COLON)
+            self.out.append(":")
+            frame[1] = "value"
+
+    def _after_value(self) -> None:
+        if self.stack:
+            self.stack[-1][1] = "after"
+
+    def _emit_key_or_value(self, token: str) -> None:
+        frame = self.stack[-1] if self.stack else None
+        if frame is not None and frame[0] == "{" and frame[1] in ("key", "after"):
+            if frame[1] == "after":
+                self.note(MISSING_COMMA)
+                self.out.append(",")
+            frame[2] = len(self.out)
+            self.out.append(token)
+            frame[1] = "colon"
+            return
+        self._before_value()
+        self.out.append(token)
+        self._after_value()
+
+    def _comma(self) -> None:
+        frame = self.stack[-1] if self.stack else None
+        if frame is None or frame[1] != "after":
+            self.note(EXTRA_COMMA)
+            return
+        self.out.append(",")
+        frame[1] = "key" if frame[0] == "{" else "value"
+
+    def _close(self, ch: str) -> None:
+        if not self.stack:
+            self.note(STRAY_CHARS)
+            return
+        if ch != _CLOSERS[self.stack[-1][0]]:
+            self.note(MISMATCHED_BRACKET)
+            # {"a": [1, 2} closes the unterminated array and the object itself
+            if any(_CLOSERS[f[0]] == ch for f in self.stack[:-1]):
+                while _CLOSERS[self.stack[-1][0]] != ch:
+                    self._close(_CLOSERS[self.stack[-1][0]])
+        frame = self.stack[-1]
+        closer = _CLOSERS[frame[0]]
+        if self.out and self.out[-1] == ",":
+            self.note(TRAILING_COMMA)
+            self.out.pop()
+        if frame[0] == "{" and frame[1] in ("colon", "value"):
+            self._drop_key(frame)
+        self.out.append(closer)
+        self.stack.pop()
+        self._after_value()
+
+    def _drop_key(self, frame: List[Any]) -> None:
+        """Removes a key that never got its value ({"a": 1, "b"} / {"a": 1, "b":})."""
+        if frame[2] >= 0:
+            del self.out[frame[2]:]
+            if self.out and self.out[-1] == ",":
+                self.out.pop()
+        frame[1] = "after"
+
+    def _truncate(self) -> None:
+        if not self.stack:
+            return
+        self.note(TRUNCATED)
+        while self.stack:
+            self._close(_CLOSERS[self.stack[-1][0]])
+
+    def _string(self, quote: str) -> None:
+        s, n = self.s, len(self.s)
+        if quote == "'":
+            self.note(SINGLE_QUOTES)
+        elif quote != '"':
+            self.note(SMART_QUOTES)
+        closers = '"' if quote == '"' else (quote if quote == "'" else "”“\"")
+        buf = ['"']
+        i = self.i + 1
+        while i < n:
+            c = s[i]
+            if c == "\\" and i + 1 < n:
+                nxt = s[i + 1]
+                if nxt in '"\\/bfnrtu':
+                    buf.append(c + nxt)
+                    i += 2
+                    continue
+                if nxt == "'":
+                    buf.append("'")
+                    i += 2
+                    continue
+                self.note(INVALID_ESCAPE)
+                buf.append("\\\\")
+                i += 1
+                continue
+            if c in closers:
+                j = i + 1
+                while j < n and s[j] in " \t\r":
+                    j += 1
+                # A quote closes the string only where JSON expects a delimiter next.
+                if j >= n or s[j] in ",:}]\n\"" or (quote != '"' and s[j] == "'"):
+                    break
+                self.note(INNER_QUOTES)
+                buf.append('\\"')
+            elif c == '"':
+                buf.append('\\"')
+            elif c == "\n":
+                self.note(CONTROL_CHARS)
+                buf.append("\\n")
+            elif c < " ":
+                self.note(CONTROL_CHARS)
+                buf.append("\\u%04x" % ord(c))
+            else:
+                buf.append(c)
+            i += 1
+        else:
+            self.note(TRUNCATED)
+            if buf[-1].endswith("\\") and not buf[-1].endswith("\\\\"):
+                buf.pop()
+        buf.append('"')
+        self.i = i + 1
+        self._emit_key_or_value("".join(buf))
+
+    def _number(self) -> None:
+        s = self.s
+        m = _NUMBER.match(s, self.i)
+        end = m.end() if m else self.i
+        if m is None or (end < len(s) and s[end] not in " \t\r\n,}]"):
+            # "7.5/10", "10x", "-" — not a JSON number, keep it as text.
+            self._bare_value()
+            return
+        raw = m.group().lstrip("+")
+        if raw.startswith("-."):
+            raw = "-0" + raw[1:]
+        elif raw.startswith("."):
+            raw = "0" + raw
+        if raw.endswith("."):
+            raw += "0"
+        if raw != m.group():
+            self.note(NUMBER_FORMAT)
+        self.i = end
+        self._before_value()
+        self.out.append(raw)
+        self._after_value()
+
+    def _word(self) -> None:
+        s, n = self.s, len(self.s)
+        m = _WORD.match(s, self.i)
+        word = m.group()
+        j = m.end()
+        while j < n and s[j] in " \t":
+            j += 1
+        frame = self.stack[-1] if self.stack else None
+        if frame is not None and frame[0] == "{" and frame[1] in ("key", "after") and j < n and s[j] == ":":
+            self.note(UNQUOTED_KEYS)
+            self.i = m.end()
+            self._emit_key_or_value(json.dumps(word))
+            return
+        literal = _LITERALS.get(word)
+        if literal is not None and (m.end() >= n or s[m.end()] in " \t\r\n,}]"):
+            if literal != word:
+                self.note(PYTHON_LITERALS)
+            self.i = m.end()
+            self._before_value()
+            self.out.append(literal)
+            self._after_value()
+            return
+        self._bare_value()
+
+    def _bare_value(self) -> None:
+        """Unquoted text up to the next delimiter becomes a string (verdict: BUY)."""
+        s, n = self.s, len(self.s)
+        j = self.i
+        while j < n and s[j] not in ",}]\n":
+            j += 1
+        self.note(BARE_WORDS)
+        value = s[self.i:j].strip()
+        self.i = j
+        self._emit_key_or_value(json.dumps(value, ensure_ascii=False))
+
+
+def _next_start(text: str, pos: int, openers: str) -> int:
+    found = [i for i in (text.find(ch, pos) for ch in openers) if i != -1]
+    return min(found) if found else -1
+
+
+def extract_json(text: Optional[str], expect: Optional[type] = dict) -> Extraction:
+    """
+    First JSON value of type `expect` (dict, list or None for either) in an
+    LLM response.
+
+    Each candidate "{"/"[" is first decoded as-is with raw_decode, so a clean
+    answer wrapped in prose or ``` fences costs one decode. Otherwise the
+    candidate is rewritten once into strict JSON (see the repair constants)
+    and decoded again. A failed candidate is skipped as a whole, so the
+    total work stays linear in the length of the response. A candidate
+    that only repairs into an empty container (prose such as "{name}") is
+    kept as a last resort in case nothing better follows.
+    """
+    if not text or not text.strip():
+        return Extraction(error="empty response")
+    openers = "{" if expect is dict else "[" if expect is list else "{["
+    pos, error = 0, "no JSON value found"
+    empty: Optional[Extraction] = None
+    for _ in range(MAX_CANDIDATES):
+        start = _next_start(text, pos, openers)
+        if start == -1:
+            break
+        try:
+            data, end = _DECODER.raw_decode(text, start)
+        except (ValueError, RecursionError) as e:
+            error = str(e)
+        else:
+            if expect is None or isinstance(data, expect):
+                return Extraction(data)
+            # e.g. [{...}] when an object was asked for: look inside
+            pos = start + 1
+            continue
+        rewriter = _Rewriter(text, start)
+        fixed, end = rewriter.run()
+        try:
+            data = json.loads(fixed)
+        except (ValueError, RecursionError) as e:
+            error = str(e)
+            pos = max(end, start + 1)
+            continue
+        if expect is not None and not isinstance(data, expect):
+            pos = start + 1
+        elif not data:
+            empty = empty or Extraction(data, rewriter.repairs)
+            pos = max(end, start + 1)
+        else:
+            return Extraction(data, rewriter.repairs)
+    return empty or Extraction(error=error)
+
+
+def _parse_rating(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    m = _RATING.search(value)
+    if m is None:
+        return None
+    score = float(m.group(1).replace(",", "."))
+    if m.group(2):
+        scale = float(m.group(2).replace(",", "."))
+        if scale <= 0:
+            return None
+        score = score * 10 / scale
+    return score
+
+
+def score_from(data: Dict[str, Any]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Numeric 0-10 score of an analysis and the key it came from.
+
+    "score" wins when it is usable; otherwise "rating" ("7.5/10", "8/10",
+    7.5, "75/100") is rescaled to ten, then any other *score* key is tried.
+    """
+    keys = ["score", "rating", "score_numeric"]
+    keys += [k for k in data if isinstance(k, str) and "score" in k.lower() and k not in keys]
+    for key in keys:
+        if key in data:
+            score = _parse_rating(data[key])
+            if score is not None:
+                return round(score, 2), key
+    return None, None
@@ -0,0 +1,216 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+ERROR = "error"
+PARSE_ERROR = "parse_error"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """
+    Rolling window of the last `size` request latencies of one model.
+
+    Percentiles are computed on demand by sorting the window; with a few
+    dozen samples this is cheaper than maintaining an order statistic tree.
+    """
+
+    def __init__(self, size: int = 50, min_samples: int = 5):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile (0..100), or None until `min_samples` are collected."""
+        if len(self._samples) < max(1, self.min_samples):
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class ModelHealth:
+    """
+    Rolling outcomes of one model and the circuit breaker built on them.
+
+    Every finished request is recorded as ok, error (exception, timeout) or
+    parse_error (answer without usable JSON). The breaker opens after
+    `consecutive_failures` failures in a row, or when the failure rate of
+    the last `window` requests reaches `failure_threshold`. After
+    `cooldown` seconds one probe request is let through (half-open): a good
+    answer closes the breaker, a bad one reopens it with a doubled cooldown,
+    up to `max_cooldown`. The probe is either routed traffic or a timer
+    probe of the ensemble (see probe_due), whichever claims it first.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        window: int = 20,
+        failure_threshold: float = 0.5,
+        min_requests: int = 4,
+        consecutive_failures: int = 3,
+        cooldown: float = 300,
+        max_cooldown: float = 3600,
+    ):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.consecutive_limit = consecutive_failures
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        # Timer probes are tiny requests; their latency is kept out of the hedging windows.
+        self.latency = {"single": LatencyWindow(), "batch": LatencyWindow(), "probe": LatencyWindow()}
+        self.outcomes: Deque[str] = deque(maxlen=window)
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        self.totals = {OK: 0, ERROR: 0, PARSE_ERROR: 0}
+        self._probing = False
+
+    def rate(self, outcome: str) -> Optional[float]:
+        if not self.outcomes:
+            return None
+        return sum(1 for o in self.outcomes if o == outcome) / len(self.outcomes)
+
+    def success_rate(self) -> float:
+        rate = self.rate(OK)
+        return 1.0 if rate is None else rate
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Whether a request may be sent now; claims the probe when half-open."""
+        now = time.time() if now is None else now
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def probe_due(self, now: Optional[float] = None) -> bool:
+        """Whether the cooldown is over and nobody has claimed the probe yet."""
+        now = time.time() if now is None else now
+        return (self.state == OPEN and now >= self.open_until) or (self.state == HALF_OPEN and not self._probing)
+
+    def release(self) -> None:
+        """The probe was cancelled before it finished (e.g. quorum reached)."""
+        self._probing = False
+
+    def record(self, outcome: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self.outcomes.append(outcome)
+        self.totals[outcome] += 1
+        self._probing = False
+        if outcome == OK:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info("Model %s recovered, circuit closed", self.model)
+            self.state = CLOSED
+            self.cooldown = self.base_cooldown
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self._open(now, min(self.cooldown * 2, self.max_cooldown))
+        elif self.state == CLOSED and (
+            self.consecutive_failures >= self.consecutive_limit
+            or (len(self.outcomes) >= self.min_requests and 1 - self.success_rate() >= self.failure_threshold)
+        ):
+            self._open(now, self.cooldown)
+
+    def _open(self, now: float, cooldown: float) -> None:
+        self.state = OPEN
+        self.cooldown = cooldown
+        self.open_until = now + cooldown
+        logger.warning(
+            "Model %s circuit open for %.0fs (success %.0f%%, %s failures in a row)",
+            self.model, cooldown, self.success_rate() * 100, self.consecutive_failures,
+        )
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        return {
+            "state": self.state,
+            "requests": len(self.outcomes),
+            "success_rate": self.rate(OK),
+            "error_rate": self.rate(ERROR),
+            "parse_error_rate": self.rate(PARSE_ERROR),
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": round(max(0.0, self.open_until - now), 1) if self.state == OPEN else 0.0,
+            "latency_p50": self.latency["single"].percentile(50),
+            "latency_p95": self.latency["single"].percentile(95),
+            "batch_latency_p95": self.latency["batch"].percentile(95),
+            "totals": dict(self.totals),
+        }
+
+
+class ModelRouter:
+    """
+    Picks which models of the configured set take the next request.
+
+    Models with a closed breaker are ranked by success rate, then by p95
+    latency; the best `primary_count` become primaries and the rest are
+    spares for hedging. Half-open models whose probe is due are added as
+    extra primaries, so a recovered model rejoins without waiting for a
+    healthy one to fail. Open models get no traffic at all; the ensemble
+    probes them every `probe_interval` seconds even when no traffic comes.
+    """
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        self.cfg = dict(cfg or {})
+        self.enabled = bool(self.cfg.pop("enabled", True))
+        # Seconds between timer probes of open models (0: probe only with routed traffic).
+        self.probe_interval = float(self.cfg.pop("probe_interval", 60))
+        self.models: Dict[str, ModelHealth] = {}
+
+    def health(self, model: str) -> ModelHealth:
+        health = self.models.get(model)
+        if health is None:
+            health = ModelHealth(model, **self.cfg)
+            self.models[model] = health
+        return health
+
+    def route(self, candidates: Sequence[Tuple[str, T]], primary_count: int) -> Tuple[List[T], List[T]]:
+        """(model, item) pairs in configured order -> (primaries, spares)."""
+        if not self.enabled:
+            return [item for _, item in candidates[:primary_count]], [item for _, item in candidates[primary_count:]]
+        now = time.time()
+        closed, probes = [], []
+        for order, (model, item) in enumerate(candidates):
+            health = self.health(model)
+            if health.state == CLOSED:
+                p95 = health.latency["single"].percentile(95)
+                closed.append((-health.success_rate(), p95 if p95 is not None else 0.0, order, item))
+            elif health.allow(now):
+                logger.info("Probing model %s", model)
+                probes.append(item)
+        closed.sort(key=lambda x: x[:3])
+        ranked = [entry[3] for entry in closed]
+        return ranked[:primary_count] + probes, ranked[primary_count:]
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Models whose half-open probe is due."""
+        now = time.time() if now is None else now
+        return [model for model, health in self.models.items() if self.enabled and health.probe_due(now)]
+
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        return {model: health.snapshot(now) for model, health in self.models.items()}
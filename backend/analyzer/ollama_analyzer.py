@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.analyzer.openrouter_analyzer import OpenRouterAnalyzer, fallback_analysis
+from backend.analyzer.prompts import ANALYST_PROMPT, CHAIRMAN_PROMPT, RISK_PROMPT, TECH_PROMPT
+from backend.analyzer.result_parser import safe_load_json
+from backend.config import get_llm_models, get_ollama_config
+from backend.ollama_client import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+# Council seats in config order; extra members repeat the cycle.
+COUNCIL_ROLES: List[Tuple[str, str]] = [
+    ("analyst", ANALYST_PROMPT),
+    ("risk", RISK_PROMPT),
+    ("tech", TECH_PROMPT),
+]
+
+
+def verdict_for(score: float) -> str:
+    if score >= 8:
+        return "STRONG_BUY"
+    if score >= 7:
+        return "BUY"
+    if score >= 5:
+        return "HOLD"
+    return "SELL"
+
+
+class OllamaCouncilAnalyzer:
+    """
+    Local council of Ollama models behind the analyze_project interface.
+
+    Every council member scores the project from its seat (analyst, risk,
+    tech), the chairman gives an overall score, and the final score is the
+    mean of the council (risk inverted) blended 50/50 with the chairman.
+    Members run concurrently; OllamaClient's memory scheduler decides
+    which of them can be resident at the same time.
+    """
+
+    def __init__(
+        self,
+        client: Optional[OllamaClient] = None,
+        council: Optional[List[str]] = None,
+        chairman: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        models_cfg = get_llm_models()
+        self.client = client or OllamaClient()
+        self.council = council or models_cfg.get("council") or []
+        self.chairman = chairman if chairman is not None else models_cfg.get("chairman")
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls) -> Optional["OllamaCouncilAnalyzer"]:
+        """The configured local council, or None when llm.ollama.enabled is off."""
+        if not get_ollama_config().get("enabled", False):
+            return None
+        return cls()
+
+    async def start(self) -> List[str]:
+        """Opens the pooled session and, if configured, preloads the council."""
+        await self.client.open()
+        if not get_ollama_config().get("warm_up", True):
+            return []
+        return await self.client.warm_up([self.chairman] + self.council)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def state(self) -> Dict[str, Any]:
+        return self.client.scheduler.state()
+
+    async def _ask(self, model: str, prompt: str) -> Optional[float]:
+        try:
+            text = await self.client.generate(model, prompt, timeout=self.timeout, options={"temperature": 0.2})
+        except Exception as e:
+            logger.warning("Ollama %s failed: %r", model, e)
+            return None
+        parsed = safe_load_json(text)
+        if parsed.get("source") in {"empty", "fallback", "quoted_string", "score_key_only"}:
+            logger.warning("Ollama %s returned no score: %r", model, text[:100])
+            return None
+        return max(1.0, min(10.0, float(parsed["score"])))
+
+    async def analyze_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        fields = OpenRouterAnalyzer._prompt_fields(project)
+        fields["source"] = project.get("source", "unknown")
+        seats = [(model, *COUNCIL_ROLES[i % len(COUNCIL_ROLES)]) for i, model in enumerate(self.council)]
+        calls = [self._ask(model, prompt.format(**fields)) for model, _, prompt in seats]
+        if self.chairman:
+            calls.append(self._ask(self.chairman, CHAIRMAN_PROMPT.format(**fields)))
+        scores = await asyncio.gather(*calls)
+
+        council: Dict[str, float] = {}
+        votes = []
+        for (model, role, _), score in zip(seats, scores):
+            if score is None:
+                continue
+            council[f"{role}:{model}"] = score
+            votes.append(11 - score if role == "risk" else score)
+        chairman_score = scores[-1] if self.chairman else None
+
+        if not votes and chairman_score is None:
+            return fallback_analysis(project)
+        if votes and chairman_score is not None:
+            final = (sum(votes) / len(votes) + chairman_score) / 2
+        else:
+            final = sum(votes) / len(votes) if votes else chairman_score
+        final = round(final, 1)
+
+        result = fallback_analysis(project)
+        result.pop("is_fallback")
+        result.update(
+            {
+                "score": final,
+                "verdict": verdict_for(final),
+                "summary": f"Local council: {len(council)} member(s), chairman {chairman_score or 'n/a'}",
+                "realistic_growth": "unknown",
+                "main_risk": "unknown",
+                "plan": "verify with a full LLM analysis",
+                "council": council,
+                "chairman_score": chairman_score,
+                "models_used": len(council) + (chairman_score is not None),
+                "backend": "ollama",
+            }
+        )
+        return result
@@ -1,34 +1,44 @@
 import asyncio
+import hashlib
 import json
 import logging
+import math
 import os
-import re
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, RateLimitError
+
+from backend.analyzer.json_extract import extract_json, score_from
+from backend.analyzer.model_health import ERROR, OK, PARSE_ERROR, ModelHealth, ModelRouter
+from backend.analyzer.rate_limiter import QuotaExhausted, RateLimiter
+from backend.analyzer.result_cache import LLMResultCache
+from backend.analyzer.stream_parser import IncrementalJsonObject, has_required_fields, parse_required_fields
+from backend.config import get_llm_cache_config, get_llm_models, get_llm_rate_limit_config
+from backend.scanner.snapshot import fingerprint
 
 logger = logging.getLogger(__name__)
 
-PROMPT_TEMPLATE = """
-ТЫ: ВЕДУЩИЙ DeFi-ИССЛЕДОВАТЕЛЬ С ФОНДОМ $500M. ТЫ КРАЙНЕ ОСТОРОЖЕН. Верни ТОЛЬКО валидный JSON, без текста вне JSON.
+_ROLE = "ТЫ: ВЕДУЩИЙ DeFi-ИССЛЕДОВАТЕЛЬ С ФОНДОМ $500M. ТЫ КРАЙНЕ ОСТОРОЖЕН. Верни ТОЛЬКО валидный JSON, без текста вне JSON."
 
-ДАННЫЕ ДЛЯ АНАЛИЗА:
-- Название: {name}
+_PROJECT_DATA = """- Название: {name}
 - Категория: {category}
 - TVL (USD): {tvl:,.0f}
+- Динамика TVL: {momentum}
 - Описание: {description}
 - Сайт: {url}
 - Токен (если известен): {token_symbol}
+"""
 
-МЕТОДОЛОГИЯ:
+_METHODOLOGY = """МЕТОДОЛОГИЯ:
 - Контекст категории и конкурентов.
 - Фундаментал: TVL, активность, команда, технология.
 - Риск/доходность, временной фактор, восприятие сообщества.
 - Не выдумывай. Если нет данных — "unknown".
+"""
 
-ФОРМАТ ОТВЕТА (JSON):
-{{
-  "research_summary": "3-4 предложения вывода",
+_RESPONSE_FIELDS = """  "research_summary": "3-4 предложения вывода",
   "strengths": ["1-3 проверенные сильные стороны"],
   "weaknesses": ["1-3 критические слабости"],
   "competitive_position": "leader/mid/outsider",
@@ -52,153 +62,824 @@ PROMPT_TEMPLATE = """
   "next_research_steps": ["что проверить дальше"],
   "confidence_level": "HIGH/MEDIUM/LOW",
   "data_limitations": "каких данных нет",
-  "token_symbol": "XXX или unknown",
-  "contract_address": "0x... или unknown",
   "exchanges": ["Binance", "Uniswap"] или [],
   "buy_links": ["https://..."] или [],
-  "where_to_buy": "dex/cex/ido/unknown"
-}}
+  "where_to_buy": "dex/cex/ido/unknown",
+  "token_symbol": "XXX или unknown",
+  "contract_address": "0x... или unknown"
 """
 
+PROMPT_TEMPLATE = (
+    "\n" + _ROLE + "\n\n"
+    "ДАННЫЕ ДЛЯ АНАЛИЗА:\n" + _PROJECT_DATA + "\n"
+    + _METHODOLOGY + "\n"
+    "ФОРМАТ ОТВЕТА (JSON):\n"
+    "{{\n" + _RESPONSE_FIELDS + "}}\n"
+)
+
+# Several projects in one request, so the instructions above are paid for once.
+BATCH_PROMPT_TEMPLATE = (
+    "\n" + _ROLE + "\n\n"
+    "ПРОЕКТЫ ДЛЯ АНАЛИЗА ({count}):\n{projects}\n"
+    + _METHODOLOGY
+    + "- Оценивай каждый проект независимо, не переноси данные между проектами.\n\n"
+    "ФОРМАТ ОТВЕТА (JSON-массив, по одному объекту на каждый проект, в том же порядке):\n"
+    "[{{\n"
+    '  "id": "id проекта из строки ###",\n' + _RESPONSE_FIELDS + "}}]\n"
+)
+
+_BATCH_ITEM = "### id: {id}\n" + _PROJECT_DATA
+
+# Fields after which a streamed answer is good enough to stop generation.
+# They close the response template, so an early stop keeps the listing
+# fields (exchanges, buy_links, where_to_buy) that come before them.
+DEFAULT_REQUIRED_FIELDS = ["score|rating", "verdict", "token_symbol", "contract_address"]
+# A truncated stream is still usable once one of these is complete.
+SALVAGE_FIELDS = {"score", "rating"}
+
+# Timer probe of a model with an open circuit: as cheap as a request gets.
+PROBE_PROMPT = 'Reply with exactly this JSON: {"ok": true}'
+PROBE_MAX_TOKENS = 8
+
+# Conservative chars-per-token ratio for mixed Cyrillic/Latin prompts.
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _iter_json_objects(text: str, pos: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Decodes every well-formed object carrying an "id" in `text`.
+
+    A broken element is skipped instead of failing the whole batch: scanning
+    resumes at the next "{". Objects without "id" (wrappers such as
+    {"results": [...]}) are entered so that their items are still found.
+    """
+    decoder = json.JSONDecoder()
+    while True:
+        pos = text.find("{", pos)
+        if pos == -1:
+            return
+        try:
+            data, end = decoder.raw_decode(text, pos)
+        except ValueError:
+            pos += 1
+            continue
+        if isinstance(data, dict) and "id" in data:
+            yield data
+            pos = end
+        else:
+            pos += 1
+
+
+def cap_low_liquidity(analysis: Dict[str, Any], project: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Caps the score at 5 and the verdict at HOLD when the project's own TVL
+    is under $100k or the main risk mentions low liquidity.
+    """
+    risk_text = str(analysis.get("main_risk", "")).lower()
+    tvl = project.get("metrics", {}).get("tvl", 0) or 0
+    if "ликвид" in risk_text or tvl < 100_000:
+        analysis["score"] = min(analysis.get("score", 5.0), 5.0)
+        if analysis.get("verdict") in {"BUY", "STRONG_BUY"}:
+            analysis["verdict"] = "HOLD"
+    return analysis
+
+
+def fallback_analysis(project: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """TVL-based placeholder used when no model produced a usable answer."""
+    tvl = (project or {}).get("metrics", {}).get("tvl", 0) or 0
+    if tvl > 500_000:
+        score = 7.0
+    elif tvl > 100_000:
+        score = 6.0
+    else:
+        score = 5.0
+    return {
+        "score": score,
+        "verdict": "HOLD",
+        "summary": "Fallback analysis; LLM unavailable",
+        "has_token": False,
+        "token_symbol": "unknown",
+        "contract_address": "unknown",
+        "where_to_buy": "unknown",
+        "exchanges": [],
+        "buy_links": [],
+        "realistic_growth": "1-2x",
+        "main_risk": "insufficient data",
+        "plan": "await LLM result",
+        "is_fallback": True,
+    }
+
+
+def format_momentum(metrics: Dict[str, Any]) -> str:
+    """Compact one-line summary of metrics["momentum"] for prompts."""
+    momentum = metrics.get("momentum") or {}
+
+    def pct(value: Optional[float]) -> str:
+        return "n/a" if value is None else f"{value * 100:+.1f}%"
+
+    if not momentum.get("samples"):
+        change_7d = metrics.get("tvl_change_7d")
+        return f"7d {change_7d:+.1f}%" if change_7d else "unknown"
+    volatility = momentum.get("volatility_7d")
+    slope = momentum.get("slope_7d")
+    return (
+        f"1d {pct(momentum.get('change_1d'))}, 7d {pct(momentum.get('change_7d'))}, "
+        f"30d {pct(momentum.get('change_30d'))}, "
+        f"slope {'n/a' if slope is None else f'{slope:+,.0f}'} USD/day, "
+        f"volatility {'n/a' if volatility is None else f'{volatility * 100:.1f}%'}, "
+        f"drawdown {pct(momentum.get('drawdown_30d'))}"
+    )
+
+
+def cache_text(project: Dict[str, Any], template: str) -> str:
+    """
+    Stable stand-in for the rendered prompt in cache keys: the prompt
+    template, the project id and content fingerprint, and the TVL rounded
+    down to a power of two. The exact TVL and the momentum line change on
+    every scan, so keying on the rendered prompt would make an unchanged
+    project miss the cache; a TVL that doubles or halves still does.
+    """
+    tvl = float((project.get("metrics") or {}).get("tvl") or 0)
+    band = int(math.log2(tvl)) if tvl >= 1 else 0
+    template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+    return json.dumps([template_hash, project.get("id"), fingerprint(project), band])
+
+
+def cacheable(result: Dict[str, Any]) -> bool:
+    """
+    Only usable answers are cached. A stream stopped early has every
+    required field and is as good as a complete answer; a truncated one
+    is asked again next time.
+    """
+    return not (result.get("is_fallback") or result.get("is_truncated"))
+
 
 class OpenRouterAnalyzer:
     """
     Lightweight single-model analyzer for OpenRouter (OpenAI-compatible API).
     """
 
-    def __init__(self, client: OpenAI, model: str):
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str,
+        cache: Optional[LLMResultCache] = None,
+        max_tokens: int = 500,
+        temperature: float = 0.35,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        timeout: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        batch_size: int = 5,
+        batch_prompt_tokens: int = 6000,
+        streaming: bool = False,
+        required_fields: Optional[Sequence[str]] = None,
+        health: Optional[ModelHealth] = None,
+    ):
         self.client = client
         self.model = model or "mistralai/mistral-7b-instruct:free"
+        self.cache = cache
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        # Shared with the other analyzers of an ensemble to cap in-flight requests.
+        self.semaphore = semaphore or asyncio.Semaphore(1)
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.batch_size = max(1, int(batch_size))
+        self.batch_prompt_tokens = batch_prompt_tokens
+        self.streaming = streaming
+        self.required_fields = parse_required_fields(required_fields or DEFAULT_REQUIRED_FIELDS)
+        # Outcomes and latencies (kept apart for single and batched prompts).
+        self.health = health or ModelHealth(self.model)
+        self.latency = self.health.latency
+
+    @staticmethod
+    def _prompt_fields(project: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": project.get("name", "Unknown"),
+            "category": project.get("category", "Unknown"),
+            "tvl": project.get("metrics", {}).get("tvl", 0) or 0,
+            "momentum": format_momentum(project.get("metrics", {})),
+            "description": project.get("description", "") or "",
+            "token_symbol": project.get("token_symbol") or "unknown",
+            "url": project.get("url", "unknown"),
+        }
 
     def _build_prompt(self, project: Dict[str, Any]) -> str:
-        return PROMPT_TEMPLATE.format(
-            name=project.get("name", "Unknown"),
-            category=project.get("category", "Unknown"),
-            tvl=project.get("metrics", {}).get("tvl", 0) or 0,
-            description=project.get("description", "") or "",
-            token_symbol=project.get("token_symbol") or "unknown",
-            url=project.get("url", "unknown"),
+        return PROMPT_TEMPLATE.format(**self._prompt_fields(project))
+
+    def _build_batch_prompt(self, projects: Sequence[Dict[str, Any]]) -> str:
+        items = "\n".join(
+            _BATCH_ITEM.format(id=project["id"], **self._prompt_fields(project)) for project in projects
         )
+        return BATCH_PROMPT_TEMPLATE.format(count=len(projects), projects=items)
+
+    def _cache_key(self, project: Dict[str, Any], batch: bool = False) -> Optional[str]:
+        """
+        Single and batched answers come from different prompts and token
+        budgets, so they are cached under different keys.
+        """
+        if self.cache is None:
+            return None
+        template = BATCH_PROMPT_TEMPLATE + _BATCH_ITEM if batch else PROMPT_TEMPLATE
+        return self.cache.make_key(self.model, cache_text(project, template), self.temperature, self.max_tokens)
 
     async def analyze_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
         prompt = self._build_prompt(project)
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
+
+        cache_key = self._cache_key(project)
+        if cache_key is not None:
+            cached = await loop.run_in_executor(None, self.cache.get, cache_key)
+            if cached is not None:
+                logger.debug("LLM cache hit for %s (%s)", project.get("name"), self.model)
+                return cached
 
         try:
-            completion = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "Return only strict JSON."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    max_tokens=500,
-                    temperature=0.35,
-                ),
-            )
-            text = completion.choices[0].message.content
-            logger.debug("OpenRouter raw response: %s", text[:500])
-            return self._parse_json(text)
+            if self.streaming:
+                result = await self._complete(prompt, reader=self._read_stream)
+            else:
+                completion = await self._complete(prompt)
+                text = completion.choices[0].message.content
+                logger.debug("OpenRouter raw response: %s", text[:500])
+                result = self._parse_json(text)
+            self.health.record(PARSE_ERROR if result.get("is_fallback") else OK)
+            if cache_key is not None and cacheable(result):
+                await loop.run_in_executor(None, self.cache.put, cache_key, self.model, result)
+            return result
+        except QuotaExhausted as e:
+            logger.warning("OpenRouter request skipped: %s", e)
+            self.health.release()
+            return self._fallback(project)
+        except asyncio.CancelledError:
+            self.health.release()
+            raise
         except Exception as e:
-            logger.error("OpenRouter analysis error: %s", e, exc_info=True)
+            logger.error("OpenRouter analysis error (%s): %r", self.model, e, exc_info=True)
+            self.health.record(ERROR)
             return self._fallback(project)
 
-    def _parse_json(self, text: str) -> Dict[str, Any]:
+    def plan_batches(self, projects: Sequence[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Greedily packs projects, in order, into batches of at most
+        `batch_size` projects whose estimated prompt fits
+        `batch_prompt_tokens`. A project that alone exceeds the budget
+        still gets a batch of its own.
+        """
+        overhead = estimate_tokens(BATCH_PROMPT_TEMPLATE.format(count=0, projects=""))
+        batches: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        used = overhead
+        for project in projects:
+            cost = estimate_tokens(_BATCH_ITEM.format(id=project["id"], **self._prompt_fields(project)))
+            if current and (len(current) >= self.batch_size or used + cost > self.batch_prompt_tokens):
+                batches.append(current)
+                current, used = [], overhead
+            current.append(project)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def analyze_batch(self, projects: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyses several projects with as few requests as possible and
+        returns results keyed by project id.
+
+        A cached single-project answer is preferred, then a cached batch
+        answer; only projects with neither are sent to the model. Batch
+        answers are cached under their own key (see _cache_key), so
+        analyze_project never returns one: the cache is shared one way only.
+        """
+        loop = asyncio.get_running_loop()
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for project in projects:
+            cached = None
+            if self.cache is not None:
+                for batch in (False, True):
+                    cached = await loop.run_in_executor(None, self.cache.get, self._cache_key(project, batch))
+                    if cached is not None:
+                        break
+            if cached is not None:
+                results[project["id"]] = cached
+            else:
+                pending.append(project)
+        chunks = await asyncio.gather(*(self._analyze_chunk(batch) for batch in self.plan_batches(pending)))
+        for chunk in chunks:
+            results.update(chunk)
+        return results
+
+    async def _analyze_chunk(self, projects: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        One request for the whole chunk. Projects missing from a partially
+        malformed (or timed out) response are split in halves and retried,
+        down to single-project prompts.
+        """
+        if len(projects) == 1:
+            return {projects[0]["id"]: await self.analyze_project(projects[0])}
+
+        prompt = self._build_batch_prompt(projects)
+        parsed: Dict[str, Dict[str, Any]] = {}
         try:
-            match = re.search(r"\{.*\}", text, re.DOTALL)
-            if not match:
-                raise ValueError("JSON block not found")
-            json_str = match.group()
-            # try to drop trailing commas before } or ]
-            json_str = re.sub(r",(\s*[}\]])", r"\1", json_str)
-            try:
-                data = json.loads(json_str)
-            except Exception:
-                # last resort: try to trim to last closing brace and load again
-                end_idx = json_str.rfind("}")
-                if end_idx != -1:
-                    data = json.loads(json_str[: end_idx + 1])
-                else:
-                    raise
-            score = float(data.get("score", 5.0))
-            data["score"] = max(1, min(10, score))
-            data["verdict"] = str(data.get("verdict", "HOLD")).upper()
-            # legacy fields for downstream formatting
-            data.setdefault("summary", data.get("research_summary", "No summary"))
-            data.setdefault("has_token", False)
-            data.setdefault("token_symbol", "unknown")
-            data.setdefault("contract_address", "unknown")
-            data.setdefault("where_to_buy", "unknown")
-            data.setdefault("exchanges", [])
-            data.setdefault("buy_links", [])
-            data.setdefault("realistic_growth", data.get("realistic_potential", "1-2x"))
-            data.setdefault("main_risk", ", ".join(data.get("key_risks", [])[:1]) or "unknown")
-            data.setdefault("plan", data.get("investment_plan", {}).get("entry_strategy", "collect more data"))
-            return data
+            # Output grows with the batch, so do the token cap and the deadline.
+            completion = await self._complete(
+                prompt,
+                max_tokens=self.max_tokens * len(projects),
+                timeout=self.timeout * len(projects) if self.timeout else None,
+                kind="batch",
+            )
+            text = completion.choices[0].message.content or ""
+            logger.debug("OpenRouter raw batch response: %s", text[:500])
+            parsed = self._parse_batch(text, [p["id"] for p in projects])
+            self.health.record(OK if parsed else PARSE_ERROR)
+        except QuotaExhausted as e:
+            logger.warning("OpenRouter batch skipped: %s", e)
+            self.health.release()
+            return {p["id"]: self._fallback(p) for p in projects}
+        except asyncio.CancelledError:
+            self.health.release()
+            raise
+        except asyncio.TimeoutError:
+            logger.warning("OpenRouter batch of %s timed out (%s)", len(projects), self.model)
+            self.health.record(ERROR)
         except Exception as e:
-            logger.warning("Cannot parse JSON from OpenRouter: %s", e)
+            logger.error("OpenRouter batch error (%s): %r", self.model, e, exc_info=True)
+            self.health.record(ERROR)
+            return {p["id"]: self._fallback(p) for p in projects}
+
+        loop = asyncio.get_running_loop()
+        results: Dict[str, Dict[str, Any]] = {}
+        for project in projects:
+            result = parsed.get(project["id"])
+            if result is None:
+                continue
+            cache_key = self._cache_key(project, batch=True)
+            if cache_key is not None and cacheable(result):
+                await loop.run_in_executor(None, self.cache.put, cache_key, self.model, result)
+            results[project["id"]] = result
+
+        missing = [p for p in projects if p["id"] not in results]
+        if missing:
+            logger.warning(
+                "OpenRouter batch (%s): %s/%s results parsed, retrying the rest in smaller batches",
+                self.model, len(results), len(projects),
+            )
+            half = (len(missing) + 1) // 2 if len(missing) == len(projects) else len(missing)
+            retries = await asyncio.gather(
+                *(self._analyze_chunk(missing[i:i + half]) for i in range(0, len(missing), half))
+            )
+            for retry in retries:
+                results.update(retry)
+        return results
+
+    def _parse_batch(self, text: str, project_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        wanted = {str(pid) for pid in project_ids}
+        start = text.find("[")
+        extraction = extract_json(text, list)
+        items: List[Dict[str, Any]] = []
+        if extraction.ok:
+            if extraction.repairs:
+                logger.debug("Repaired batch JSON from %s: %s", self.model, ", ".join(extraction.repairs))
+            items = [item for item in extraction.data if isinstance(item, dict) and "id" in item]
+        if not items:
+            items = list(_iter_json_objects(text, max(start, 0)))
+        out: Dict[str, Dict[str, Any]] = {}
+        for data in items:
+            pid = str(data.pop("id"))
+            if pid not in wanted or pid in out:
+                continue
+            if score_from(data)[0] is None:
+                # e.g. the element cut off by max_tokens: retry it rather than guess a score
+                logger.debug("Batch item %s has no rating", pid)
+                continue
+            try:
+                out[pid] = self._normalize(data)
+            except (TypeError, ValueError) as e:
+                logger.debug("Malformed batch item %s: %s", pid, e)
+        return out
+
+    async def _complete(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+        reader: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        kind: str = "single",
+    ) -> Any:
+        """
+        One chat completion, paced by the rate limiter.
+
+        The limiter is acquired before the semaphore so that a model waiting
+        for its window does not hold a concurrency slot of the ensemble.
+        429 responses are retried up to `max_attempts` times after the
+        delay the limiter derives from Retry-After / X-RateLimit-Reset.
+        With a `reader` the completion is streamed and the reader consumes
+        the stream inside the same slot and deadline.
+        """
+        limiter = self.rate_limiter.get(self.model) if self.rate_limiter is not None else None
+        attempts = self.rate_limiter.max_attempts if self.rate_limiter is not None else 1
+
+        async def request() -> Any:
+            start = time.monotonic()
+            raw = await self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "Return only strict JSON."},
+                    {"role": "user", "content": prompt},
+                ],
+                max_tokens=max_tokens or self.max_tokens,
+                temperature=self.temperature,
+                stream=reader is not None,
+            )
+            if limiter is not None:
+                limiter.on_response(raw.headers)
+            response = raw.parse()
+            if reader is not None:
+                response = await reader(response)
+            self.latency[kind].add(time.monotonic() - start)
+            return response
+
+        try:
+            for attempt in range(1, attempts + 1):
+                if limiter is not None:
+                    await limiter.acquire()
+                try:
+                    async with self.semaphore:
+                        return await asyncio.wait_for(request(), timeout=timeout or self.timeout)
+                except RateLimitError as e:
+                    if limiter is None:
+                        raise
+                    delay = limiter.on_rate_limited(e.response.headers)
+                    if limiter.remaining_today() == 0:
+                        raise QuotaExhausted(f"daily quota of {self.model} exhausted") from e
+                    if attempt == attempts:
+                        raise
+                    logger.warning(
+                        "OpenRouter 429 for %s (attempt %s/%s), retrying in %.1fs",
+                        self.model, attempt, attempts, delay,
+                    )
+        finally:
+            if self.rate_limiter is not None:
+                self.rate_limiter.save()
+
+    async def _read_stream(self, stream: Any) -> Dict[str, Any]:
+        """
+        Feeds streamed deltas to an incremental JSON parser and closes the
+        stream as soon as the required fields are complete, so the model
+        stops generating (and billing) the tail of the answer. A stream cut
+        off before that still yields a result once the rating is complete.
+        """
+        parser = IncrementalJsonObject()
+        early = False
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                parser.feed(chunk.choices[0].delta.content or "")
+                if parser.complete:
+                    break
+                if has_required_fields(parser.fields, self.required_fields):
+                    early = True
+                    break
+        finally:
+            await stream.close()
+        logger.debug("OpenRouter streamed response: %s", parser.text[:500])
+
+        if parser.complete or early:
+            result = self._normalize(dict(parser.fields))
+        elif SALVAGE_FIELDS & parser.fields.keys():
+            # Cut off (max_tokens, dropped connection) after the rating: keep what is there.
+            logger.warning("OpenRouter stream truncated (%s), using completed fields", self.model)
+            result = self._normalize(dict(parser.fields))
+            result["is_truncated"] = True
+        else:
+            # Not even a usable subset: fall back to the lenient full-text parser.
+            return self._parse_json(parser.text)
+        if early:
+            result["stopped_early"] = True
+        return result
+
+    def _parse_json(self, text: str) -> Dict[str, Any]:
+        extraction = extract_json(text)
+        if not extraction.ok:
+            logger.warning("Cannot parse JSON from OpenRouter (%s): %s", self.model, extraction.error)
+            return self._fallback()
+        if extraction.repairs:
+            logger.debug("Repaired JSON from %s: %s", self.model, ", ".join(extraction.repairs))
+        try:
+            result = self._normalize(extraction.data)
+        except (TypeError, ValueError, AttributeError) as e:
+            logger.warning("Malformed analysis from OpenRouter (%s): %s", self.model, e)
             return self._fallback()
+        if extraction.repairs:
+            result["json_repairs"] = extraction.repairs
+        return result
+
+    @staticmethod
+    def _normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+        # The prompt asks for "rating": "X.X/10"; older answers carry "score".
+        score, source = score_from(data)
+        data["score"] = max(1, min(10, score if score is not None else 5.0))
+        if source not in (None, "score"):
+            data["score_source"] = source
+        data["verdict"] = str(data.get("verdict", "HOLD")).upper()
+        # legacy fields for downstream formatting
+        data.setdefault("summary", data.get("research_summary", "No summary"))
+        data.setdefault("has_token", False)
+        data.setdefault("token_symbol", "unknown")
+        data.setdefault("contract_address", "unknown")
+        data.setdefault("where_to_buy", "unknown")
+        data.setdefault("exchanges", [])
+        data.setdefault("buy_links", [])
+        data.setdefault("realistic_growth", data.get("realistic_potential", "1-2x"))
+        data.setdefault("main_risk", ", ".join(data.get("key_risks", [])[:1]) or "unknown")
+        data.setdefault("plan", data.get("investment_plan", {}).get("entry_strategy", "collect more data"))
+        return data
 
     def _fallback(self, project: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        tvl = (project or {}).get("metrics", {}).get("tvl", 0) or 0
-        if tvl > 500_000:
-            score = 7.0
-        elif tvl > 100_000:
-            score = 6.0
-        else:
-            score = 5.0
-        return {
-            "score": score,
-            "verdict": "HOLD",
-            "summary": "Fallback analysis; LLM unavailable",
-            "has_token": False,
-            "token_symbol": "unknown",
-            "contract_address": "unknown",
-            "where_to_buy": "unknown",
-            "exchanges": [],
-            "buy_links": [],
-            "realistic_growth": "1-2x",
-            "main_risk": "insufficient data",
-            "plan": "await LLM result",
-        }
+        return fallback_analysis(project)
 
 
 class EnsembleOpenRouterAnalyzer:
     """
     Ensemble of several free OpenRouter models with simple aggregation.
+
+    With `quorum` K > 0 a call returns as soon as K models produced usable
+    results and the stragglers are cancelled. With hedging, a model that
+    runs past its own p95 latency (or fails) triggers a backup request to
+    the next model of `hedge_models`.
     """
 
     def __init__(
         self,
         api_key: Optional[str] = None,
         models: Optional[list[str]] = None,
+        cache: Optional[LLMResultCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
     ):
         key = api_key or os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
         if not key:
             raise RuntimeError("OPENROUTER_API_KEY is not set")
 
+        analysis_cfg = get_llm_models().get("analysis", {})
+        max_concurrent = max(1, int(analysis_cfg.get("max_concurrent_analyses", 4)))
+        self.timeout = float(analysis_cfg.get("analysis_timeout", 60))
+        batch_size = int(analysis_cfg.get("batch_size", 5))
+        batch_prompt_tokens = int(analysis_cfg.get("batch_prompt_tokens", 6000))
+        streaming = bool(analysis_cfg.get("streaming", False))
+        required_fields = analysis_cfg.get("stream_required_fields")
+
+        if rate_limiter is None:
+            rate_cfg = get_llm_rate_limit_config()
+            if rate_cfg.get("enabled", False):
+                rate_limiter = RateLimiter.from_config(rate_cfg)
+        self.rate_limiter = rate_limiter
+
         default_headers = {
             "HTTP-Referer": "http://localhost",
             "X-Title": "Crypto Alpha Scout",
         }
-        self.client = OpenAI(
+        # One pooled HTTP/1.1 keep-alive client for every model of the ensemble.
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrent, max_keepalive_connections=max_concurrent),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+        self.client = AsyncOpenAI(
             api_key=key,
             base_url="https://openrouter.ai/api/v1",
             default_headers=default_headers,
+            http_client=self.http_client,
+            # Retries of 429s are paced by the rate limiter, not by the SDK.
+            max_retries=0 if self.rate_limiter is not None else 2,
         )
-        # Use only the primary model
-        self.models = models or ["mistralai/mistral-7b-instruct:free"]
-        self.single = [OpenRouterAnalyzer(self.client, m) for m in self.models]
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        if cache is None:
+            cache_cfg = get_llm_cache_config()
+            if cache_cfg.get("enabled", False):
+                cache = LLMResultCache(
+                    cache_cfg.get("path", "data/llm_cache.db"),
+                    ttl=float(cache_cfg.get("ttl", 86400)),
+                    max_entries=int(cache_cfg.get("max_entries", 5000)),
+                )
+        self.cache = cache
+        # Use only the primary model unless the config lists more.
+        self.models = models or analysis_cfg.get("models") or ["mistralai/mistral-7b-instruct:free"]
+        self.hedge_models = [m for m in analysis_cfg.get("hedge_models") or [] if m not in self.models]
+        self.quorum = min(max(0, int(analysis_cfg.get("quorum", 0))), len(self.models))
+        self.hedging = bool(analysis_cfg.get("hedging", False))
+        self.hedge_percentile = float(analysis_cfg.get("hedge_percentile", 95))
+        self.router = ModelRouter(analysis_cfg.get("health"))
+
+        def build(model: str) -> OpenRouterAnalyzer:
+            # Each model checks the shared cache with its own key.
+            return OpenRouterAnalyzer(
+                self.client,
+                model,
+                cache=self.cache,
+                semaphore=self.semaphore,
+                timeout=self.timeout,
+                rate_limiter=self.rate_limiter,
+                batch_size=batch_size,
+                batch_prompt_tokens=batch_prompt_tokens,
+                streaming=streaming,
+                required_fields=required_fields,
+                health=self.router.health(model),
+            )
+
+        self.single = [build(m) for m in self.models]
+        self.hedge = [build(m) for m in self.hedge_models]
+
+    async def close(self) -> None:
+        await self.client.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def rate_limit_state(self) -> Dict[str, Any]:
+        return self.rate_limiter.state() if self.rate_limiter is not None else {}
+
+    def model_status(self) -> Dict[str, Any]:
+        """Health, circuit state and rate limits of every configured model."""
+        health = self.router.state()
+        limits = self.rate_limit_state()
+        return {
+            model: {
+                "role": "primary" if model in self.models else "hedge",
+                "health": health.get(model, {}),
+                "rate_limit": limits.get(model, {}),
+            }
+            for model in self.models + self.hedge_models
+        }
+
+    def remaining_budget(self) -> Optional[int]:
+        """
+        Requests still allowed today by the best-off model of the ensemble;
+        None means the budget is unknown or unlimited.
+        """
+        if self.rate_limiter is None:
+            return None
+        remaining = [self.rate_limiter.remaining_today(m) for m in self.models + self.hedge_models]
+        if any(r is None for r in remaining):
+            return None
+        return max(remaining)
+
+    def plan_batches(self, projects: Sequence[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        return self.single[0].plan_batches(projects)
+
+    async def probe(self, analyzer: OpenRouterAnalyzer) -> Optional[str]:
+        """
+        Sends PROBE_PROMPT to a model whose cooldown is over and records the
+        outcome, which closes or reopens its circuit. None when the probe
+        was not sent (already claimed by routed traffic, or no quota left).
+        """
+        if not analyzer.health.allow():
+            return None
+        try:
+            completion = await analyzer._complete(PROBE_PROMPT, max_tokens=PROBE_MAX_TOKENS, kind="probe")
+            text = completion.choices[0].message.content or ""
+            outcome = OK if extract_json(text).ok else PARSE_ERROR
+        except QuotaExhausted as e:
+            logger.info("Probe of %s skipped: %s", analyzer.model, e)
+            analyzer.health.release()
+            return None
+        except asyncio.CancelledError:
+            analyzer.health.release()
+            raise
+        except Exception as e:
+            logger.warning("Probe of %s failed: %r", analyzer.model, e)
+            outcome = ERROR
+        analyzer.health.record(outcome)
+        return outcome
+
+    async def probe_due(self) -> Dict[str, str]:
+        """Probes every model whose half-open probe is due: {model: outcome}."""
+        due = set(self.router.due())
+        analyzers = [analyzer for analyzer in self.single + self.hedge if analyzer.model in due]
+        outcomes = await asyncio.gather(*(self.probe(analyzer) for analyzer in analyzers))
+        return {analyzer.model: outcome for analyzer, outcome in zip(analyzers, outcomes) if outcome is not None}
+
+    async def run_probes(self) -> None:
+        """
+        Probes open models every `probe_interval` seconds until cancelled,
+        so a recovered model rejoins even when no request is routed to it.
+        """
+        while True:
+            await asyncio.sleep(self.router.probe_interval)
+            try:
+                await self.probe_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Model probes failed: %r", e)
 
     async def analyze_project(self, project: Dict[str, Any]) -> Dict[str, Any]:
-        # Run all models in parallel
-        tasks = [s.analyze_project(project) for s in self.single]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Run all models in parallel, up to the quorum
+        results = await self._race(
+            lambda analyzer: analyzer.analyze_project(project),
+            lambda result: not result.get("is_fallback"),
+            kind="single",
+        )
+        return self._aggregate(project, results)
+
+    async def analyze_batch(self, projects: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Batched analysis by every model, aggregated per project id."""
+        per_model = await self._race(
+            lambda analyzer: analyzer.analyze_batch(projects),
+            lambda result: any(not r.get("is_fallback") for r in result.values()),
+            kind="batch",
+        )
+        return {
+            project["id"]: self._aggregate(project, [r.get(project["id"]) for r in per_model])
+            for project in projects
+        }
+
+    async def _race(
+        self,
+        call: Callable[[OpenRouterAnalyzer], Awaitable[Any]],
+        usable: Callable[[Any], bool],
+        kind: str,
+    ) -> List[Any]:
+        """
+        Runs `call` on the primary models picked by the health router and
+        collects usable results until the quorum is met (all of them when
+        quorum is 0). Models with an open circuit are not called at all.
 
+        Hedges are launched at most once per primary request, either when it
+        fails or when it is still running after the model's p95 latency; a
+        hedge that answers counts towards the quorum like any other model.
+        Requests still running when the quorum is met are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        primaries, spares = self.router.route(
+            [(analyzer.model, analyzer) for analyzer in self.single + self.hedge], len(self.single)
+        )
+        if not primaries:
+            logger.warning("No healthy OpenRouter models, skipping the request")
+            return []
+        spare = spares if self.hedging else []
+        quorum = min(self.quorum, len(primaries)) if self.quorum else len(primaries)
+        owners: Dict[asyncio.Task, OpenRouterAnalyzer] = {}
+        # Running task -> loop time at which it gets hedged (None: no deadline).
+        deadlines: Dict[asyncio.Task, Optional[float]] = {}
+        unhedged: Set[asyncio.Task] = set()
+        results: List[Any] = []
+
+        def launch(analyzer: OpenRouterAnalyzer, primary: bool) -> None:
+            task = asyncio.create_task(call(analyzer))
+            owners[task] = analyzer
+            p95 = analyzer.latency[kind].percentile(self.hedge_percentile) if spare and primary else None
+            deadlines[task] = loop.time() + p95 if p95 is not None else None
+            if primary:
+                unhedged.add(task)
+
+        def hedge(task: asyncio.Task, reason: str) -> None:
+            deadlines[task] = None
+            if task in unhedged and spare:
+                unhedged.discard(task)
+                backup = spare.pop(0)
+                logger.info("Hedging %s (%s) with %s", owners[task].model, reason, backup.model)
+                launch(backup, primary=False)
+
+        for analyzer in primaries:
+            launch(analyzer, primary=True)
+        try:
+            while deadlines and len(results) < quorum:
+                now = loop.time()
+                waits = [d - now for d in deadlines.values() if d is not None]
+                done, _ = await asyncio.wait(
+                    set(deadlines),
+                    timeout=max(0.0, min(waits)) if waits else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None and isinstance(task.result(), dict) and usable(task.result()):
+                        results.append(task.result())
+                    else:
+                        hedge(task, "failed")
+                    deadlines.pop(task, None)
+                now = loop.time()
+                for task, deadline in list(deadlines.items()):
+                    if deadline is not None and deadline <= now:
+                        hedge(task, f"slower than p{self.hedge_percentile:g}")
+        finally:
+            stragglers: Set[asyncio.Task] = set(deadlines)
+            for task in stragglers:
+                task.cancel()
+            if stragglers:
+                await asyncio.gather(*stragglers, return_exceptions=True)
+        return results
+
+    def _aggregate(self, project: Dict[str, Any], results: List[Any]) -> Dict[str, Any]:
         parsed = []
         for r in results:
-            if isinstance(r, dict):
+            # Skip models that were throttled or failed instead of averaging their stub.
+            if isinstance(r, dict) and not r.get("is_fallback"):
                 parsed.append(r)
 
         if not parsed:
@@ -238,12 +919,4 @@ class EnsembleOpenRouterAnalyzer:
             merged["buy_links"] = []
             merged["where_to_buy"] = "unknown"
 
-        # If risk mentions low liquidity / unknown TVL -> cap score to 5 and verdict max HOLD
-        risk_text = str(merged.get("main_risk", "")).lower()
-        tvl = project.get("metrics", {}).get("tvl", 0) or 0
-        if "ликвид" in risk_text or tvl < 100_000:
-            merged["score"] = min(merged["score"], 5.0)
-            if merged["verdict"] in {"BUY", "STRONG_BUY"}:
-                merged["verdict"] = "HOLD"
-
-        return merged
+        return cap_low_liquidity(merged, project)
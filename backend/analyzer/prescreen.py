@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.analyzer.model_health import ERROR, OK, PARSE_ERROR
+from backend.analyzer.ollama_analyzer import verdict_for
+from backend.analyzer.openrouter_analyzer import OpenRouterAnalyzer, cache_text, fallback_analysis
+from backend.analyzer.prompts_v2 import DEFI_PROJECT_PROMPT, GENERIC_PROMPT, NFT_PROJECT_PROMPT
+from backend.analyzer.rate_limiter import QuotaExhausted
+from backend.analyzer.result_parser import safe_load_json
+from backend.config import get_llm_models
+
+logger = logging.getLogger(__name__)
+
+# safe_load_json sources that carry no real score from the model.
+UNSCORED_SOURCES = {"empty", "fallback", "quoted_string", "score_key_only"}
+PROMPTS = {"nft": NFT_PROJECT_PROMPT, "defi": DEFI_PROJECT_PROMPT, "generic": GENERIC_PROMPT}
+
+
+def select_prompt(project: Dict[str, Any]) -> Tuple[str, str]:
+    """(prompt kind, filled number-only prompt) for a project."""
+    category = str(project.get("category") or "")
+    metrics = project.get("metrics") or {}
+    description = (project.get("description") or "")[:500]
+    name = project.get("name", "Unknown")
+    if "nft" in category.lower():
+        raw = project.get("raw_data") or {}
+        return "nft", PROMPTS["nft"].format(
+            name=name,
+            description=description,
+            artist=raw.get("artist") or "unknown",
+            utility=category or "unknown",
+        )
+    # GitHub candidates carry metrics.tvl = 0.0 too; TVL means something only for DeFi.
+    if project.get("source") == "defillama" or float(metrics.get("tvl") or 0) > 0:
+        audits = metrics.get("audits") or 0
+        return "defi", PROMPTS["defi"].format(
+            name=name,
+            description=description,
+            tvl=f"${float(metrics.get('tvl') or 0):,.0f}",
+            audit_status=f"{audits} audit(s)" if audits else "not audited",
+        )
+    return "generic", PROMPTS["generic"].format(
+        name=name,
+        description=description,
+        source=project.get("source", "unknown"),
+        category=category or "unknown",
+    )
+
+
+class Prescreener:
+    """
+    First, cheap tier of the analysis cascade.
+
+    A small fast model scores every candidate with the number-only prompts
+    of prompts_v2 and a few tokens of output; only candidates at or above
+    `cutoff` go on to the full PROMPT_TEMPLATE analysis of the ensemble.
+    A candidate the model could not score (error, quota, unparsable answer)
+    is passed on rather than dropped, so the cascade never rejects a
+    project it knows nothing about. Requests go through the analyzer's
+    rate limiter, semaphore and cache like any other call.
+    """
+
+    def __init__(
+        self,
+        analyzer: OpenRouterAnalyzer,
+        cutoff: float = 6.0,
+        max_tokens: int = 8,
+        max_projects: Optional[int] = None,
+    ):
+        self.analyzer = analyzer
+        self.cutoff = float(cutoff)
+        self.max_tokens = max(1, int(max_tokens))
+        # Candidates screened per cycle (None: all of them).
+        self.max_projects = int(max_projects) if max_projects else None
+
+    @classmethod
+    def from_config(cls, ensemble: Any) -> Optional["Prescreener"]:
+        """
+        Prescreener from llm.analysis.prescreen, or None when it is disabled.
+        It shares the ensemble's HTTP client, rate limiter, cache and model
+        health, so a model used in both tiers is paced and tracked once.
+        """
+        cfg = get_llm_models().get("analysis", {}).get("prescreen") or {}
+        if not cfg.get("enabled", False):
+            return None
+        model = cfg.get("model") or ensemble.models[0]
+        analyzer = OpenRouterAnalyzer(
+            ensemble.client,
+            model,
+            cache=ensemble.cache,
+            temperature=float(cfg.get("temperature", 0.1)),
+            semaphore=ensemble.semaphore,
+            timeout=float(cfg.get("timeout", 20)),
+            rate_limiter=ensemble.rate_limiter,
+            health=ensemble.router.health(model),
+        )
+        return cls(
+            analyzer,
+            cutoff=cfg.get("cutoff", 6.0),
+            max_tokens=cfg.get("max_tokens", 8),
+            max_projects=cfg.get("max_projects"),
+        )
+
+    @property
+    def model(self) -> str:
+        return self.analyzer.model
+
+    async def score(self, project: Dict[str, Any]) -> Dict[str, Any]:
+        """{"score", "kind", "model"}; score is None when the model gave none."""
+        kind, prompt = select_prompt(project)
+        result: Dict[str, Any] = {"score": None, "kind": kind, "model": self.model}
+        analyzer = self.analyzer
+        loop = asyncio.get_running_loop()
+        cache_key = None
+        if analyzer.cache is not None:
+            # Keyed like the ensemble's cache: the filled prompt carries the exact TVL.
+            key_text = cache_text(project, PROMPTS[kind])
+            cache_key = analyzer.cache.make_key(self.model, key_text, analyzer.temperature, self.max_tokens)
+            cached = await loop.run_in_executor(None, analyzer.cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            completion = await analyzer._complete(prompt, max_tokens=self.max_tokens)
+            text = completion.choices[0].message.content or ""
+        except QuotaExhausted as e:
+            logger.warning("Prescreen skipped for %s: %s", project.get("name"), e)
+            analyzer.health.release()
+            return result
+        except asyncio.CancelledError:
+            analyzer.health.release()
+            raise
+        except Exception as e:
+            logger.warning("Prescreen of %s failed (%s): %r", project.get("name"), self.model, e)
+            analyzer.health.record(ERROR)
+            return result
+
+        parsed = safe_load_json(text)
+        if parsed.get("source") in UNSCORED_SOURCES:
+            logger.debug("Prescreen answer without a score from %s: %r", self.model, text[:100])
+            analyzer.health.record(PARSE_ERROR)
+            return result
+        analyzer.health.record(OK)
+        result["score"] = max(1.0, min(10.0, float(parsed["score"])))
+        if cache_key is not None:
+            await loop.run_in_executor(None, analyzer.cache.put, cache_key, self.model, result)
+        return result
+
+    async def screen(
+        self, projects: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Scores all projects concurrently and splits them into (passed,
+        rejected). Each project gets a "prescreen" entry; passed projects
+        are ordered by prescreen score, unscored ones last, ties keeping
+        the incoming (priority) order.
+        """
+        scores = await asyncio.gather(*(self.score(project) for project in projects))
+        passed: List[Tuple[float, int, Dict[str, Any]]] = []
+        rejected: List[Dict[str, Any]] = []
+        for order, (project, result) in enumerate(zip(projects, scores)):
+            project["prescreen"] = result
+            score: Optional[float] = result.get("score")
+            if score is None or score >= self.cutoff:
+                passed.append((-(score if score is not None else 0.0), order, project))
+            else:
+                rejected.append(project)
+        passed.sort(key=lambda x: x[:2])
+        logger.info(
+            "Prescreen (%s, cutoff %.1f): %s of %s passed",
+            self.model, self.cutoff, len(passed), len(projects),
+        )
+        return [project for _, _, project in passed], rejected
+
+
+def prescreen_analysis(project: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored result for a project the cascade stopped at the first tier."""
+    screen = project.get("prescreen") or {}
+    score = float(screen.get("score") or 1.0)
+    result = fallback_analysis(project)
+    result.pop("is_fallback")
+    result.update(
+        {
+            "score": score,
+            "verdict": verdict_for(score),
+            "summary": f"Prescreen {score:.1f}/10 by {screen.get('model')}: below the deep-analysis cutoff",
+            "realistic_growth": "unknown",
+            "main_risk": "unknown",
+            "plan": "no deep analysis",
+            "prescreen": screen,
+            "is_prescreen": True,
+            "backend": "prescreen",
+        }
+    )
+    return result
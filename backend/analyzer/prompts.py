@@ -1,8 +1,11 @@
 # Упрощенные промпты: просим только число 1-10
-ANALYST_PROMPT = """Score this project 1-10.\n\nName: {name}\nCategory: {category}\nSource: {source}\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
+# Те же поля проекта, что и в промпте OpenRouter (OpenRouterAnalyzer._prompt_fields)
+_PROJECT = """Name: {name}\nCategory: {category}\nSource: {source}\nTVL (USD): {tvl:,.0f}\nTVL momentum: {momentum}\nDescription: {description}\nWebsite: {url}\nToken: {token_symbol}"""
 
-RISK_PROMPT = """Risk level 1-10 for this project.\n\nName: {name}\nCategory: {category}\nSource: {source}\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
+ANALYST_PROMPT = """Score this project 1-10.\n\n""" + _PROJECT + """\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
 
-TECH_PROMPT = """Technical strength 1-10 for this project.\n\nName: {name}\nCategory: {category}\nSource: {source}\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
+RISK_PROMPT = """Risk level 1-10 for this project.\n\n""" + _PROJECT + """\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
 
-CHAIRMAN_PROMPT = """Final investment score 1-10 for this project.\n\nName: {name}\nCategory: {category}\nSource: {source}\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
+TECH_PROMPT = """Technical strength 1-10 for this project.\n\n""" + _PROJECT + """\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
+
+CHAIRMAN_PROMPT = """Final investment score 1-10 for this project.\n\n""" + _PROJECT + """\n\nReturn ONLY a number between 1 and 10.\n\nNumber:"""
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# A reset further away than this is treated as the daily quota, not the per-minute window.
+DAILY_RESET_THRESHOLD = 3600
+# Multiplicative decrease of the per-minute limit on a 429 without headers.
+RPM_DECREASE = 0.75
+
+
+class QuotaExhausted(RuntimeError):
+    """The daily request budget of a model is used up."""
+
+
+def _utc_day() -> str:
+    return datetime.now(tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _header(headers: Optional[Mapping[str, str]], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    return value
+
+
+def _parse_reset(value: Optional[str], now: float) -> Optional[float]:
+    """X-RateLimit-Reset: epoch ms (OpenRouter), epoch seconds or delta seconds."""
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if number > 1e12:
+        return number / 1000
+    if number > 1e9:
+        return number
+    return now + number
+
+
+def _parse_retry_after(value: Optional[str], now: float) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return now + float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class ModelLimiter:
+    """
+    Rate-limit state of one model.
+
+    Starts from the configured per-minute and per-day limits and adapts them
+    from X-RateLimit-* headers and 429 responses: Retry-After (or the reset
+    header) blocks the model until that moment, otherwise a jittered
+    exponential backoff is applied and the per-minute limit is cut by
+    RPM_DECREASE; a later X-RateLimit-Limit header restores it.
+    """
+
+    def __init__(self, model: str, rpm: int, rpd: Optional[int], backoff_base: float, backoff_max: float):
+        self.model = model
+        self.rpm = max(1, int(rpm))
+        self.rpd = rpd
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.day = _utc_day()
+        self.used_today = 0
+        self.blocked_until = 0.0
+        self.daily_reset_at: Optional[float] = None
+        self.failures = 0
+        self.throttled = 0
+        self._window: Deque[float] = deque()
+        self._lock = asyncio.Lock()
+
+    def _roll_day(self, now: float) -> None:
+        day = _utc_day()
+        if day != self.day or (self.daily_reset_at and now >= self.daily_reset_at):
+            self.day = day
+            self.used_today = 0
+            self.daily_reset_at = None
+
+    def remaining_today(self) -> Optional[int]:
+        self._roll_day(time.time())
+        if self.daily_reset_at:
+            return 0
+        if self.rpd is None:
+            return None
+        return max(0, self.rpd - self.used_today)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.time()
+                remaining = self.remaining_today()
+                if remaining == 0:
+                    raise QuotaExhausted(f"daily quota of {self.model} exhausted")
+                wait = self.blocked_until - now
+                while self._window and self._window[0] <= now - 60:
+                    self._window.popleft()
+                if len(self._window) >= self.rpm:
+                    wait = max(wait, self._window[0] + 60 - now)
+                if wait <= 0:
+                    self._window.append(now)
+                    self.used_today += 1
+                    return
+                await asyncio.sleep(wait)
+
+    def on_response(self, headers: Optional[Mapping[str, str]]) -> None:
+        now = time.time()
+        self.failures = 0
+        limit = _header(headers, "X-RateLimit-Limit")
+        remaining = _header(headers, "X-RateLimit-Remaining")
+        reset_at = _parse_reset(_header(headers, "X-RateLimit-Reset"), now)
+        if limit and reset_at and reset_at - now <= DAILY_RESET_THRESHOLD:
+            try:
+                self.rpm = max(1, int(float(limit)))
+            except ValueError:
+                pass
+        if remaining is not None and reset_at:
+            try:
+                exhausted = float(remaining) <= 0
+            except ValueError:
+                exhausted = False
+            if exhausted:
+                self._block(reset_at, now)
+
+    def on_rate_limited(self, headers: Optional[Mapping[str, str]]) -> float:
+        """Registers a 429 and returns how long the model is blocked for."""
+        now = time.time()
+        self.throttled += 1
+        until = _parse_retry_after(_header(headers, "Retry-After"), now)
+        if until is None:
+            until = _parse_reset(_header(headers, "X-RateLimit-Reset"), now)
+        if until is None:
+            # No hint from the server: our per-minute guess was too high.
+            self.rpm = max(1, int(self.rpm * RPM_DECREASE))
+            delay = min(self.backoff_max, self.backoff_base * (2 ** self.failures))
+            until = now + delay * random.uniform(0.5, 1.0)
+        self.failures += 1
+        self._block(until, now)
+        return max(0.0, self.blocked_until - now)
+
+    def _block(self, until: float, now: float) -> None:
+        if until - now > DAILY_RESET_THRESHOLD:
+            logger.warning("Daily quota of %s exhausted until %s", self.model, datetime.fromtimestamp(until))
+            self.daily_reset_at = until
+        else:
+            self.blocked_until = max(self.blocked_until, until)
+
+    def state(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "rpm": self.rpm,
+            "rpd": self.rpd,
+            "used_today": self.used_today,
+            "remaining_today": self.remaining_today(),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+            "daily_reset_at": self.daily_reset_at,
+            "throttled": self.throttled,
+        }
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "day": self.day,
+            "used_today": self.used_today,
+            "rpm": self.rpm,
+            "blocked_until": self.blocked_until,
+            "daily_reset_at": self.daily_reset_at,
+        }
+
+    def restore(self, data: Dict[str, Any]) -> None:
+        self.rpm = int(data.get("rpm", self.rpm))
+        self.blocked_until = float(data.get("blocked_until", 0.0))
+        self.daily_reset_at = data.get("daily_reset_at")
+        if data.get("day") == self.day:
+            self.used_today = int(data.get("used_today", 0))
+        self._roll_day(time.time())
+
+
+class RateLimiter:
+    """
+    Shared registry of per-model limiters.
+
+    Daily usage and learned limits are persisted to `state_path`, so a
+    restart (or a cron-style run of backend/main.py) does not forget how
+    much of today's free quota is already spent.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 20,
+        requests_per_day: Optional[int] = 50,
+        backoff_base: float = 2.0,
+        backoff_max: float = 60.0,
+        max_attempts: int = 3,
+        state_path: Optional[str] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_day = requests_per_day
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max(1, int(max_attempts))
+        self.state_path = state_path
+        self._models: Dict[str, ModelLimiter] = {}
+        self._saved = self._load()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "RateLimiter":
+        return cls(
+            requests_per_minute=int(cfg.get("requests_per_minute", 20)),
+            requests_per_day=cfg.get("requests_per_day", 50),
+            backoff_base=float(cfg.get("backoff_base", 2.0)),
+            backoff_max=float(cfg.get("backoff_max", 60.0)),
+            max_attempts=int(cfg.get("max_attempts", 3)),
+            state_path=cfg.get("state_path"),
+        )
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning("Cannot read rate limit state %s: %s", self.state_path, e)
+            return {}
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        data = dict(self._saved)
+        data.update({model: limiter.dump() for model, limiter in self._models.items()})
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning("Cannot save rate limit state %s: %s", self.state_path, e)
+
+    def get(self, model: str) -> ModelLimiter:
+        limiter = self._models.get(model)
+        if limiter is None:
+            limiter = ModelLimiter(
+                model,
+                self.requests_per_minute,
+                self.requests_per_day,
+                self.backoff_base,
+                self.backoff_max,
+            )
+            if model in self._saved:
+                limiter.restore(self._saved[model])
+            self._models[model] = limiter
+        return limiter
+
+    def remaining_today(self, model: str) -> Optional[int]:
+        return self.get(model).remaining_today()
+
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        return {model: limiter.state() for model, limiter in self._models.items()}
@@ -1,7 +1,12 @@
-import json
 import re
 from typing import Dict, Any
 
+from backend.analyzer.json_extract import extract_json, score_from
+
+
+def _verdict(score: float) -> str:
+    return "BUY" if score >= 7 else "HOLD" if score >= 5 else "AVOID"
+
 
 def safe_load_json(text: str) -> Dict[str, Any]:
     """Парсит любой ответ LLM. Всегда возвращает словарь со score/verdict."""
@@ -18,30 +23,25 @@ def safe_load_json(text: str) -> Dict[str, Any]:
             return {"score": 5, "score_numeric": 5, "verdict": "HOLD", "source": "score_key_only"}
         return {"score": 5, "score_numeric": 5, "verdict": "HOLD", "source": "quoted_string"}
 
-    # Пытаемся распарсить JSON
-    if text.startswith("{") and text.endswith("}"):
-        try:
-            data = json.loads(text)
-            score = None
-            for k, v in data.items():
-                if "score" in k.lower():
-                    if isinstance(v, (int, float)):
-                        score = float(v)
-                        break
-            if score is not None:
-                verdict = "BUY" if score >= 7 else "HOLD" if score >= 5 else "AVOID"
-                out = {"score": score, "score_numeric": score, "verdict": verdict, "source": "json"}
-                out.update(data)
-                return out
-        except Exception:
-            pass
+    # Пытаемся распарсить JSON (с починкой типичных поломок ответа модели)
+    extraction = extract_json(text)
+    if extraction.ok:
+        data = extraction.data
+        score, _ = score_from(data)
+        if score is not None:
+            score = max(1.0, min(10.0, score))
+            out = {"verdict": _verdict(score)}
+            out.update(data)
+            out.update({"score": score, "score_numeric": score, "source": "json"})
+            if extraction.repairs:
+                out["repairs"] = extraction.repairs
+            return out
 
     # Ищем число 1-10 в тексте
-    match = re.search(r"\b(10|[1-9])\b", text)
+    match = re.search(r"\b(10|[1-9])(?:[.,](\d+))?\b", text)
     if match:
-        score = float(match.group(1))
-        verdict = "BUY" if score >= 7 else "HOLD" if score >= 5 else "AVOID"
-        return {"score": score, "score_numeric": score, "verdict": verdict, "source": "number"}
+        score = min(10.0, float(f"{match.group(1)}.{match.group(2) or 0}"))
+        return {"score": score, "score_numeric": score, "verdict": _verdict(score), "source": "number"}
 
     # Fallback
     return {"score": 5, "score_numeric": 5, "verdict": "HOLD", "source": "fallback"}
@@ -0,0 +1,103 @@
+import json
+from typing import Any, Dict, Iterable, List, Sequence
+
+
+class IncrementalJsonObject:
+    """
+    Incremental parser for the first top-level JSON object in a token stream.
+
+    Text before the opening "{" (prose, ``` fences) is ignored. Every
+    top-level field is decoded as soon as its value is closed by "," or "}",
+    so callers can act on finished fields while the model is still writing
+    the rest, and a truncated response still yields the fields it completed.
+    Each character is scanned once.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = -1
+        self._key = None
+        self._value_start = -1
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consumes a chunk and returns the keys completed by it."""
+        if self.complete or not chunk:
+            return []
+        self._text += chunk
+        text = self._text
+        done: List[str] = []
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start < 0 and self._key_start >= 0:
+                        self._key = self._decode_key(text[self._key_start : i + 1])
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start < 0:
+                    self._key_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close_value(text, i, done)
+                    self.complete = True
+                    i += 1
+                    break
+            elif self._depth == 1:
+                if ch == ":" and self._value_start < 0 and self._key is not None:
+                    self._value_start = i + 1
+                elif ch == ",":
+                    self._close_value(text, i, done)
+            i += 1
+        self._pos = i
+        return done
+
+    @staticmethod
+    def _decode_key(raw: str) -> str:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw.strip('"')
+
+    def _close_value(self, text: str, end: int, done: List[str]) -> None:
+        if self._key is not None and self._value_start >= 0:
+            raw = text[self._value_start : end].strip()
+            try:
+                self.fields[self._key] = json.loads(raw)
+                done.append(self._key)
+            except ValueError:
+                pass
+        self._key = None
+        self._key_start = -1
+        self._value_start = -1
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+
+def parse_required_fields(spec: Iterable[str]) -> List[Sequence[str]]:
+    """["score|rating", "verdict"] -> [("score", "rating"), ("verdict",)]."""
+    return [tuple(part.strip() for part in str(item).split("|") if part.strip()) for item in spec]
+
+
+def has_required_fields(fields: Dict[str, Any], required: Sequence[Sequence[str]]) -> bool:
+    """True when every group has at least one of its alternative keys present."""
+    return all(any(key in fields for key in group) for group in required)
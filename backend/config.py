@@ -42,16 +42,46 @@ def get_llm_models() -> Dict[str, Any]:
     }
 
 
+def get_ollama_config() -> Dict[str, Any]:
+    cfg = load_config()
+    return cfg.get("llm", {}).get("ollama", {})
+
+
+def get_llm_cache_config() -> Dict[str, Any]:
+    cfg = load_config()
+    return cfg.get("llm", {}).get("cache", {})
+
+
+def get_llm_rate_limit_config() -> Dict[str, Any]:
+    cfg = load_config()
+    return cfg.get("llm", {}).get("rate_limit", {})
+
+
+def get_fork_index_config() -> Dict[str, Any]:
+    cfg = load_config()
+    return cfg.get("llm", {}).get("fork_index", {})
+
+
 def get_scanner_config() -> Dict[str, Any]:
     cfg = load_config()
     return cfg.get("scanner", {})
 
 
+def get_pipeline_config() -> Dict[str, Any]:
+    cfg = load_config()
+    return cfg.get("pipeline", {})
+
+
 def get_notifications_config() -> Dict[str, Any]:
     cfg = load_config()
     return cfg.get("notifications", {})
 
 
+def get_database_config() -> Dict[str, Any]:
+    cfg = load_config()
+    return cfg.get("database", {})
+
+
 def get_db_path() -> str:
     cfg = load_config()
     db = cfg.get("database", {})
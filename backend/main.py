@@ -2,13 +2,16 @@ import asyncio
 import logging
 import sys
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.append(str(ROOT))
 
+from backend.analyzer.fork_index import ForkIndex, inherit_analysis
+from backend.analyzer.ollama_analyzer import OllamaCouncilAnalyzer
 from backend.analyzer.openrouter_analyzer import EnsembleOpenRouterAnalyzer
+from backend.analyzer.prescreen import Prescreener
 from backend.scanner.crypto_scanner import CryptoTracker
 from backend.telegram_client import send_message
 
@@ -60,7 +63,7 @@ def format_message(project: Dict[str, Any], analysis: Dict[str, Any]) -> str:
 {plan}
 
 ⚠️ *Main risk:* {main_risk}
-🤖 *Model:* OpenRouter
+🤖 *Model:* {analysis.get("backend", "OpenRouter")}
 """
     return msg.strip()
 
@@ -68,7 +71,6 @@ def format_message(project: Dict[str, Any], analysis: Dict[str, Any]) -> str:
 async def main():
     logger.info("🚀 Crypto Scanner (OpenRouter)")
 
-    scanner = CryptoTracker()
     try:
         analyzer = EnsembleOpenRouterAnalyzer()
     except Exception as e:
@@ -76,23 +78,100 @@ async def main():
         await send_message("⚠️ OPENROUTER_API_KEY not configured.")
         return
 
-    scan_result = await scanner.run_full_scan()
-    projects = scan_result.get("projects", [])
-    if not projects:
-        logger.warning("No projects found.")
-        return
-
-    logger.info("Found %s projects to analyze.", len(projects))
-
-    # limit to 1 project per run to save free-model daily quota
-    for idx, project in enumerate(projects[:1], 1):
-        logger.info("Analyzing %s/%s: %s", idx, min(1, len(projects)), project.get("name"))
-        analysis = await analyzer.analyze_project(project)
-        message = format_message(project, analysis)
-        await send_message(message)
-        await asyncio.sleep(1)
-
-    logger.info("Analysis complete.")
+    local = OllamaCouncilAnalyzer.from_config()
+    fork_index = ForkIndex.from_config()
+    try:
+        if local is not None:
+            await local.start()
+        await run_cycle(analyzer, local, Prescreener.from_config(analyzer), fork_index)
+    finally:
+        await analyzer.close()
+        if local is not None:
+            await local.close()
+        if fork_index is not None:
+            logger.info("Fork index: %s", fork_index.stats())
+            fork_index.close()
+
+    logger.info("Analysis complete. LLM cache: %s", analyzer.cache_stats() or "disabled")
+    logger.info("Rate limits: %s", analyzer.rate_limit_state() or "disabled")
+
+
+async def run_cycle(
+    analyzer: EnsembleOpenRouterAnalyzer,
+    local: Optional[OllamaCouncilAnalyzer] = None,
+    prescreener: Optional[Prescreener] = None,
+    fork_index: Optional[ForkIndex] = None,
+):
+    async with CryptoTracker() as scanner:
+        scan_result = await scanner.run_full_scan()
+        projects = scan_result.get("projects", [])
+        if not projects:
+            logger.warning("No new or changed projects found.")
+            return
+
+        logger.info(
+            "Found %s projects to analyze (%s unchanged skipped).",
+            len(projects),
+            scan_result.get("unchanged_skipped", 0),
+        )
+
+        if prescreener is not None:
+            # Cheap number-only scoring first; only the promising few get the full prompt.
+            pool = projects[: prescreener.max_projects or len(projects)]
+            projects, rejected = await prescreener.screen(pool)
+            scanner.commit_processed(rejected)
+
+        if fork_index is not None:
+            # Forks of an already analysed project reuse its analysis.
+            rest = []
+            for project in projects:
+                match = fork_index.match(project)
+                if match is None:
+                    rest.append(project)
+                    continue
+                analysis = inherit_analysis(project, match)
+                logger.info(
+                    "%s is a fork of %s (similarity %.2f), score %s reused",
+                    project.get("name"), match["name"], match["similarity"], analysis.get("score"),
+                )
+                # Reported like a fresh analysis; the snapshot is committed only after that.
+                await send_message(format_message(project, analysis))
+                scanner.commit_processed([project])
+            projects = rest
+
+        # Analyse as many projects as today's free-model quota allows,
+        # several projects per request.
+        done = 0
+        for batch in analyzer.plan_batches(projects):
+            if analyzer.remaining_budget() == 0 and local is None:
+                logger.warning(
+                    "Daily OpenRouter quota exhausted, %s projects left for the next run.",
+                    len(projects) - done,
+                )
+                break
+            logger.info(
+                "Analyzing %s-%s/%s: %s",
+                done + 1,
+                done + len(batch),
+                len(projects),
+                ", ".join(str(p.get("name")) for p in batch),
+            )
+            analyses = await analyzer.analyze_batch(batch)
+            if local is not None:
+                # Whatever OpenRouter could not answer goes to the local council.
+                for project in batch:
+                    if analyses.get(project["id"], {"is_fallback": True}).get("is_fallback"):
+                        analyses[project["id"]] = await local.analyze_project(project)
+            done += len(batch)
+            for project in batch:
+                analysis = analyses.get(project["id"])
+                if not analysis or analysis.get("is_fallback"):
+                    # Leave the project in the snapshot diff so it is retried later.
+                    continue
+                await send_message(format_message(project, analysis))
+                scanner.commit_processed([project])
+                if fork_index is not None:
+                    fork_index.add(project, analysis)
 
 
 if __name__ == "__main__":
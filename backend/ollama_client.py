@@ -0,0 +1,271 @@
+"""Асинхронный клиент Ollama: один пул соединений и планировщик памяти моделей.
+
+Модели остаются загруженными между запросами благодаря `keep_alive`.
+Планировщик следит, чтобы суммарный размер одновременно загруженных моделей
+не превышал бюджет RAM/VRAM: для новой модели он выгружает простаивающие
+(давно не использованные первыми), но никогда не трогает модель, которая
+сейчас генерирует. Поэтому совет из нескольких моделей не перезагружает их
+друг за другом на каждом проекте.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+import aiohttp
+
+from backend.config import get_ollama_config
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+# Загруженная модель занимает больше файла весов: KV-кэш и буферы контекста.
+LOAD_OVERHEAD = 1.2
+# Размер модели, которой нет в /api/tags (ещё не скачана или переименована).
+UNKNOWN_MODEL_SIZE = 4 * GB
+
+
+def detect_memory_budget(share: float = 0.6) -> Optional[int]:
+    """Доля MemTotal из /proc/meminfo; None, если определить не удалось."""
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(int(line.split()[1]) * 1024 * share)
+    except (OSError, ValueError, IndexError):
+        return None
+    return None
+
+
+class ModelMemoryScheduler:
+    """Учёт загруженных моделей в пределах бюджета памяти (budget=None — без лимита)."""
+
+    def __init__(self, budget: Optional[int]):
+        self.budget = budget
+        # модель -> занимаемые байты
+        self.resident: Dict[str, int] = {}
+        # модель -> число запросов в работе
+        self.active: Dict[str, int] = {}
+        self.last_used: Dict[str, float] = {}
+        self.evictions = 0
+        # модели, для которых идёт запрос выгрузки
+        self.unloading: Set[str] = set()
+        self._cond = asyncio.Condition()
+
+    def used(self) -> int:
+        return sum(self.resident.values())
+
+    def fits(self, size: int) -> bool:
+        return self.budget is None or self.used() + size <= self.budget
+
+    async def acquire(self, model: str, size: int, unload: Callable[[str], Awaitable[None]]) -> None:
+        """Ждёт, пока модель можно держать в памяти, и помечает её занятой.
+
+        Вытесняемые модели снимаются с учёта под блокировкой, а HTTP-запросы
+        выгрузки идут уже без неё: остальные запросы не ждут сеть.
+        """
+        evicted: List[str] = []
+        async with self._cond:
+            # Модель, которую сейчас выгружают, грузить заново рано.
+            while model in self.unloading or (model not in self.resident and not self.fits(size)):
+                if model in self.unloading:
+                    await self._cond.wait()
+                    continue
+                idle = sorted(
+                    (m for m in self.resident if not self.active.get(m)),
+                    key=lambda m: self.last_used.get(m, 0.0),
+                )
+                victims, freed = [], 0
+                for victim in idle:
+                    if self.budget - self.used() + freed >= size:
+                        break
+                    victims.append(victim)
+                    freed += self.resident[victim]
+                # Модель больше всего бюджета грузится одна, когда остальные простаивают.
+                if self.budget - self.used() + freed >= size or len(victims) == len(self.resident):
+                    for victim in victims:
+                        logger.info(f"Выгружаю {victim}, чтобы освободить память под {model}")
+                        del self.resident[victim]
+                        self.unloading.add(victim)
+                        self.evictions += 1
+                    evicted = victims
+                    break
+                await self._cond.wait()
+            self.resident.setdefault(model, size)
+            self.active[model] = self.active.get(model, 0) + 1
+            self.last_used[model] = time.monotonic()
+        if not evicted:
+            return
+        try:
+            for victim in evicted:
+                await unload(victim)
+        finally:
+            async with self._cond:
+                self.unloading.difference_update(evicted)
+                self._cond.notify_all()
+
+    async def release(self, model: str) -> None:
+        async with self._cond:
+            self.active[model] = max(0, self.active.get(model, 1) - 1)
+            self.last_used[model] = time.monotonic()
+            self._cond.notify_all()
+
+    def sync(self, loaded: Dict[str, int]) -> None:
+        """Подстраивается под фактически загруженные модели из /api/ps."""
+        for model in list(self.resident):
+            if model not in loaded and not self.active.get(model):
+                del self.resident[model]
+        self.resident.update(loaded)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "budget_gb": round(self.budget / GB, 2) if self.budget else None,
+            "used_gb": round(self.used() / GB, 2),
+            "resident": sorted(self.resident),
+            "active": {m: n for m, n in self.active.items() if n},
+            "evictions": self.evictions,
+        }
+
+
+class OllamaClient:
+    """Клиент HTTP API Ollama (/api/generate, /api/tags, /api/ps) поверх одной aiohttp-сессии."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        keep_alive: Optional[str] = None,
+        memory_budget_gb: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+    ):
+        cfg = get_ollama_config()
+        self.base_url = (base_url or cfg.get("base_url") or "http://localhost:11434").rstrip("/")
+        self.keep_alive = keep_alive or cfg.get("keep_alive", "30m")
+        self.timeout = float(timeout or cfg.get("timeout", 120))
+        self.max_connections = int(max_connections or cfg.get("max_connections", 4))
+        budget_gb = memory_budget_gb if memory_budget_gb is not None else cfg.get("memory_budget_gb")
+        budget = int(float(budget_gb) * GB) if budget_gb else detect_memory_budget()
+        self.scheduler = ModelMemoryScheduler(budget)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sizes: Optional[Dict[str, int]] = None
+
+    async def open(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["OllamaClient"]:
+        """Открывает пул на время блока; уже открытый пул не закрывает."""
+        owned = self._session is None or self._session.closed
+        await self.open()
+        try:
+            yield self
+        finally:
+            if owned:
+                await self.close()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        await self.open()
+        async with self._session.request(
+            method,
+            f"{self.base_url}{path}",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=timeout or self.timeout),
+        ) as response:
+            if response.status != 200:
+                text = await response.text()
+                raise RuntimeError(f"Ollama {path}: HTTP {response.status}: {text[:200]}")
+            return await response.json(content_type=None)
+
+    async def list_models(self) -> List[Dict[str, Any]]:
+        data = await self._request("GET", "/api/tags")
+        return data.get("models") or []
+
+    async def loaded_models(self) -> Dict[str, int]:
+        """Загруженные сейчас модели и занимаемая ими память (/api/ps)."""
+        data = await self._request("GET", "/api/ps")
+        return {m["name"]: int(m.get("size") or 0) for m in data.get("models") or [] if m.get("name")}
+
+    async def model_size(self, model: str) -> int:
+        if model in self.scheduler.resident:
+            return self.scheduler.resident[model]
+        if self._sizes is None:
+            try:
+                self._sizes = {m["name"]: int(m.get("size") or 0) for m in await self.list_models()}
+            except Exception as e:
+                logger.warning(f"Не удалось получить список моделей Ollama: {e}")
+                self._sizes = {}
+        size = self._sizes.get(model)
+        return int(size * LOAD_OVERHEAD) if size else UNKNOWN_MODEL_SIZE
+
+    async def _unload(self, model: str) -> None:
+        try:
+            await self._request("POST", "/api/generate", {"model": model, "keep_alive": 0})
+        except Exception as e:
+            logger.warning(f"Не удалось выгрузить {model}: {e}")
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Полный (не потоковый) ответ модели; модель остаётся загруженной на keep_alive."""
+        size = await self.model_size(model)
+        await self.scheduler.acquire(model, size, self._unload)
+        try:
+            payload: Dict[str, Any] = {
+                "model": model,
+                "prompt": prompt,
+                "stream": False,
+                "keep_alive": self.keep_alive,
+            }
+            if options:
+                payload["options"] = options
+            data = await self._request("POST", "/api/generate", payload, timeout)
+            return data.get("response", "")
+        finally:
+            await self.scheduler.release(model)
+
+    async def warm_up(self, models: Iterable[str]) -> List[str]:
+        """Заранее загружает модели, пока они помещаются в бюджет без вытеснения.
+
+        Запрос без prompt только загружает модель и продлевает keep_alive.
+        """
+        try:
+            self.scheduler.sync(await self.loaded_models())
+        except Exception as e:
+            logger.warning(f"Не удалось получить загруженные модели Ollama: {e}")
+        warmed: List[str] = []
+        for model in dict.fromkeys(m for m in models if m):
+            size = await self.model_size(model)
+            if model not in self.scheduler.resident and not self.scheduler.fits(size):
+                logger.info(f"Прогрев {model} пропущен: не помещается в бюджет памяти")
+                continue
+            await self.scheduler.acquire(model, size, self._unload)
+            try:
+                start = time.monotonic()
+                await self._request("POST", "/api/generate", {"model": model, "keep_alive": self.keep_alive})
+                logger.info(f"Модель {model} загружена за {time.monotonic() - start:.1f}s")
+                warmed.append(model)
+            except Exception as e:
+                logger.warning(f"Не удалось прогреть {model}: {e}")
+                self.scheduler.resident.pop(model, None)
+            finally:
+                await self.scheduler.release(model)
+        return warmed
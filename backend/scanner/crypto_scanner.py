@@ -1,109 +1,251 @@
+import asyncio
 import logging
-from typing import Any, Dict, List
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
 
 import aiohttp
 
+from backend.config import get_scanner_config
+from backend.scanner.http_cache import ResponseCache, conditional_headers
+from backend.scanner.priority import PriorityScorer
+from backend.scanner.snapshot import SnapshotStore
+from backend.scanner.sources import ScanSource, build_sources
+from backend.scanner.timeseries import TvlSeriesStore
+
 logger = logging.getLogger(__name__)
 
 
+def _dedupe_key(project: Dict[str, Any]) -> Optional[str]:
+    """Нормализованный URL проекта (хост без www + путь) для склейки между источниками."""
+    url = (project.get("url") or "").strip()
+    if not url:
+        return None
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/').lower()}" or None
+
+
+def merge_projects(batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Склеивает кандидатов разных источников в один поток без дублей.
+
+    Дубликат определяется по id, а между разными источниками — ещё и по
+    нормализованному URL. Побеждает первый (более приоритетный) источник,
+    недостающие ссылки дописываются из остальных, а в `sources` перечисляются
+    все источники, где проект встретился.
+    """
+    merged: List[Dict[str, Any]] = []
+    index: Dict[str, Dict[str, Any]] = {}
+    for batch in batches:
+        for project in batch:
+            keys = [project["id"]]
+            url_key = _dedupe_key(project)
+            if url_key:
+                keys.append(url_key)
+            existing = index.get(project["id"])
+            if existing is None and url_key in index:
+                # Внутри одного источника общий URL не дубль (Uniswap V2/V3 и т.п.).
+                candidate = index[url_key]
+                if candidate.get("source") != project.get("source"):
+                    existing = candidate
+            if existing is None:
+                project.setdefault("sources", [project.get("source")])
+                merged.append(project)
+                existing = project
+            else:
+                for key, val in (project.get("links") or {}).items():
+                    existing.setdefault("links", {}).setdefault(key, val)
+                if project.get("source") not in existing["sources"]:
+                    existing["sources"].append(project.get("source"))
+            for k in keys:
+                index.setdefault(k, existing)
+    return merged
+
+
 class CryptoTracker:
-    """Сканер источников (пока только DeFi Llama)."""
-
-    def __init__(self):
-        self.defillama_url = "https://api.llama.fi/protocols"
-
-    async def _make_request(self, url: str) -> Any:
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    logger.error(f"HTTP {response.status} для {url}")
-            except Exception as e:
-                logger.error(f"Ошибка запроса {url}: {e}")
+    """Сканер источников из `scanner.sources` (см. backend.scanner.sources).
+
+    Держит одну пуловую aiohttp-сессию на всё время жизни и дисковый кэш
+    ответов с условными запросами, общие для всех источников. Источники
+    опрашиваются параллельно, каждый под своим лимитом и таймаутом.
+    Закрывать через `close()` или `async with`.
+    """
+
+    def __init__(self, scan_cfg: Optional[Dict[str, Any]] = None):
+        if scan_cfg is None:
+            scan_cfg = get_scanner_config()
+        http_cfg = scan_cfg.get("http", {})
+        self.timeout = float(http_cfg.get("timeout", 10))
+        self.pool_size = int(http_cfg.get("pool_size", 10))
+        cache_dir = http_cfg.get("cache_dir")
+        self.cache = ResponseCache(cache_dir, http_cfg.get("cache_ttl", 0)) if cache_dir else None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        delta_cfg = scan_cfg.get("delta") or {}
+        self.snapshot: Optional[SnapshotStore] = None
+        if delta_cfg.get("enabled", False):
+            self.snapshot = SnapshotStore(
+                delta_cfg.get("snapshot_path", "data/scan_snapshot.json"),
+                float(delta_cfg.get("tvl_change_threshold", 0.1)),
+            )
+
+        series_cfg = scan_cfg.get("timeseries") or {}
+        self.series: Optional[TvlSeriesStore] = None
+        if series_cfg.get("enabled", False):
+            self.series = TvlSeriesStore(series_cfg.get("path", "data/tvl_series"))
+
+        priority_cfg = scan_cfg.get("priority") or {}
+        self.scorer: Optional[PriorityScorer] = None
+        if priority_cfg.get("enabled", False):
+            self.scorer = PriorityScorer(priority_cfg)
+        self.max_projects = int(scan_cfg.get("max_projects_per_scan", 20))
+
+        self.sources: List[ScanSource] = build_sources(self, scan_cfg)
+
+    async def __aenter__(self) -> "CryptoTracker":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(
+        self,
+        url: str,
+        decode: Optional[Callable[[aiohttp.ClientResponse], Awaitable[Any]]] = None,
+        cache_key: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        """GET через дисковый кэш с условными запросами.
+
+        `decode` превращает ответ 200 в кэшируемый payload (по умолчанию
+        `response.json()`); `cache_key` нужен, если payload — не сырое тело.
+        """
+        key = cache_key or url
+        loop = asyncio.get_running_loop()
+        meta = None
+        if self.cache:
+            meta = await loop.run_in_executor(None, self.cache.get_meta, key)
+            if meta and self.cache.is_fresh(meta):
+                logger.info(f"Кэш свежий, запрос пропущен: {url}")
+                return await loop.run_in_executor(None, self.cache.load_payload, key)
+
+        request_headers = dict(headers or {})
+        request_headers.update(conditional_headers(meta))
+        try:
+            session = self.get_session()
+            async with session.get(url, headers=request_headers) as response:
+                if response.status == 304 and meta:
+                    logger.info(f"304 Not Modified, данные из кэша: {url}")
+                    await loop.run_in_executor(None, self.cache.touch, meta)
+                    return await loop.run_in_executor(None, self.cache.load_payload, key)
+                if response.status == 200:
+                    data = await (decode(response) if decode else response.json())
+                    if self.cache:
+                        await loop.run_in_executor(
+                            None,
+                            self.cache.put,
+                            key,
+                            data,
+                            response.headers.get("ETag"),
+                            response.headers.get("Last-Modified"),
+                        )
+                    return data
+                logger.error(f"HTTP {response.status} для {url}")
+        except Exception as e:
+            logger.error(f"Ошибка запроса {url}: {e}")
+
+        if meta:
+            logger.warning(f"Используем устаревший кэш для {url}")
+            return await loop.run_in_executor(None, self.cache.load_payload, key)
         return None
 
-    async def scan_defi_llama(self) -> List[Dict[str, Any]]:
-        """Отбираем малые/новые проекты DeFi Llama."""
-        projects: List[Dict[str, Any]] = []
-        data = await self._make_request(self.defillama_url)
-        if not data:
-            return projects
-
-        for protocol in data:
-            try:
-                name = (protocol.get("name") or "").strip()
-                if not name or len(name) < 2:
-                    continue
-
-                tvl = float(protocol.get("tvl", 0) or 0)
-                category = (protocol.get("category") or "").lower()
-                slug = protocol.get("slug", "")
-
-                exclude_categories = {
-                    "bridge",
-                    "stablecoin",
-                    "cex",
-                    "services",
-                    "ponzi",
-                    "reserve currency",
-                    "algo-stables",
-                    "farm",
-                    "indexes",
-                    "derivatives",
-                    "synthetics",
-                }
-                allowed_categories = {"defi", "dex", "lending", "yield", "infrastructure", "nft", "gaming"}
-                tvl_valid = 50_000 < tvl < 1_000_000
-                growth_valid = float(protocol.get("change_7d", 0) or 0) > 0
-                category_valid = category in allowed_categories
-                has_links = protocol.get("url") and protocol.get("url").strip()
-
-                if not (tvl_valid and category_valid and has_links and growth_valid):
-                    continue
-
-                links = {}
-                for key in ["url", "twitter", "github", "telegram", "discord"]:
-                    val = protocol.get(key)
-                    if val:
-                        links[key] = val
-
-                change_7d = float(protocol.get("change_7d", 0) or 0)
-                token_symbol = protocol.get("tokenSymbol") or protocol.get("symbol")
-
-                project = {
-                    "id": f"defillama_{slug}",
-                    "name": name,
-                    "description": protocol.get("description", f"{category.capitalize()} protocol"),
-                    "category": category.capitalize(),
-                    "source": "defillama",
-                    "url": protocol.get("url", ""),
-                    "token_symbol": token_symbol,
-                    "links": links,
-                    "metrics": {
-                        "tvl": tvl,
-                        "tvl_change_7d": change_7d,
-                        "chain": protocol.get("chain", "Multi-Chain"),
-                        "audits": len(protocol.get("audit_links", []) or []),
-                        "is_audited": len(protocol.get("audit_links", []) or []) > 0,
-                    },
-                    "raw_data": protocol,
-                }
-                projects.append(project)
-            except Exception as e:
-                logger.debug(f"Пропускаем {protocol.get('name', 'unknown')}: {e}")
-                continue
-
-        projects.sort(key=lambda x: x["metrics"]["tvl"])
-        projects = projects[:15]
-        logger.info(f"Отобрано {len(projects)} качественных проектов")
+    async def _scan_source(self, source: ScanSource) -> List[Dict[str, Any]]:
+        start = time.monotonic()
+        projects = await asyncio.wait_for(source.scan(), timeout=source.timeout)
+        logger.info(f"{source.name}: {len(projects)} кандидатов за {time.monotonic() - start:.1f}s")
         return projects
 
-    async def run_full_scan(self) -> Dict[str, Any]:
-        logger.info("Сканирование DeFi Llama...")
-        projects = await self.scan_defi_llama()
+    def commit_processed(self, projects: List[Dict[str, Any]]) -> None:
+        """Фиксирует обработанные проекты в снимке, чтобы не отдавать их повторно."""
+        if not projects:
+            return
+        if self.snapshot is not None:
+            self.snapshot.commit(projects)
+        if self.scorer is not None:
+            self.scorer.forget(p["id"] for p in projects)
+
+    async def scan_candidates(self) -> Dict[str, Any]:
+        """Опрашивает источники, объединяет кандидатов и отбрасывает неизменившиеся."""
+        logger.info(f"Сканирование источников: {', '.join(s.name for s in self.sources) or 'нет'}")
+        results = await asyncio.gather(
+            *(self._scan_source(source) for source in self.sources),
+            return_exceptions=True,
+        )
+
+        batches: List[List[Dict[str, Any]]] = []
+        source_counts: Dict[str, int] = {}
+        source_errors: Dict[str, str] = {}
+        for source, result in zip(self.sources, results):
+            if isinstance(result, BaseException):
+                reason = "timeout" if isinstance(result, asyncio.TimeoutError) else str(result)
+                logger.error(f"Источник {source.name} не ответил: {reason}")
+                source_errors[source.name] = reason
+                result = []
+            source_counts[source.name] = len(result)
+            batches.append(result)
+
+        candidates = merge_projects(batches)
+        if self.series is not None:
+            tvl_sources = {source.name for source in self.sources if source.tracks_tvl}
+            with_tvl = [p for p in candidates if p.get("source") in tvl_sources]
+            await asyncio.get_running_loop().run_in_executor(None, self.series.update_projects, with_tvl)
+
+        unchanged_skipped = 0
+        if self.snapshot is not None:
+            changed = self.snapshot.diff(candidates)
+            unchanged_skipped = len(candidates) - len(changed)
+            logger.info(f"Дельта: {len(changed)} новых/изменённых, {unchanged_skipped} без изменений")
+            candidates = changed
+        return {
+            "candidates": candidates,
+            "source_counts": source_counts,
+            "source_errors": source_errors,
+            "unchanged_skipped": unchanged_skipped,
+        }
+
+    def prioritize(self, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Top-K кандидатов по приоритету (или отбор каждого источника)."""
+        projects: List[Dict[str, Any]] = []
+        if self.scorer is not None:
+            projects = self.scorer.select_top(candidates, self.max_projects)
+        else:
+            for source in self.sources:
+                projects.extend(source.select([p for p in candidates if p.get("source") == source.name]))
+
         if projects:
-            logger.info(f"Найдено {len(projects)} проектов")
+            logger.info(f"Отобрано {len(projects)} проектов")
         else:
             logger.warning("Проекты не найдены")
-        return {"projects": projects, "source_counts": {"defillama": len(projects)}}
+        return projects
+
+    async def run_full_scan(self) -> Dict[str, Any]:
+        scan = await self.scan_candidates()
+        projects = self.prioritize(scan.pop("candidates"))
+        return {"projects": projects, **scan}
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Дисковый кэш HTTP-ответов для условных запросов (ETag / Last-Modified).
+
+    Для каждого ключа хранятся два файла: маленький `.meta.json` с валидаторами
+    и временем последней проверки и `.body.json` с уже декодированным payload.
+    Ответ 304 переписывает только meta, а после рестарта холодный запрос не нужен.
+    """
+
+    def __init__(self, directory: str, ttl: float = 0):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.{suffix}.json")
+
+    def get_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        meta = self._read(self._path(key, "meta"))
+        if not meta or meta.get("key") != key:
+            return None
+        if not os.path.exists(self._path(key, "body")):
+            return None
+        return meta
+
+    def load_payload(self, key: str) -> Any:
+        return self._read(self._path(key, "body"))
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        return self.ttl > 0 and time.time() - float(meta.get("checked_at", 0)) < self.ttl
+
+    def put(
+        self,
+        key: str,
+        payload: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        meta = {
+            "key": key,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": now,
+            "checked_at": now,
+        }
+        # Сначала тело, потом meta: meta без тела считается промахом.
+        self._write(self._path(key, "body"), payload)
+        self._write(self._path(key, "meta"), meta)
+
+    def touch(self, meta: Dict[str, Any]) -> None:
+        """Отмечает запись как подтверждённую сервером (ответ 304)."""
+        meta["checked_at"] = time.time()
+        self._write(self._path(meta["key"], "meta"), meta)
+
+    def _read(self, path: str) -> Any:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Повреждённая запись кэша {path}: {e}")
+            return None
+
+    def _write(self, path: str, data: Any) -> None:
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Не удалось записать кэш {path}: {e}")
+
+
+def conditional_headers(meta: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Заголовки условного GET по сохранённым валидаторам."""
+    headers: Dict[str, str] = {}
+    if not meta:
+        return headers
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
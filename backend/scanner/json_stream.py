@@ -0,0 +1,91 @@
+"""Инкрементальный разбор JSON-массива верхнего уровня по кускам байтов.
+
+Позволяет обрабатывать элементы большого ответа по одному, не держа в памяти
+ни весь текст, ни весь декодированный список.
+"""
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, List
+
+_WHITESPACE = " \t\n\r"
+# Символы, из которых может продолжиться число верхнего уровня.
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JsonArrayStream:
+    """Разбивает поток байтов вида `[elem, elem, ...]` на декодированные элементы.
+
+    Каждый элемент декодируется `json.JSONDecoder.raw_decode` (C-сканер), как
+    только он целиком оказался в буфере; недочитанный хвост ждёт следующего куска.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._started = False
+        self._done = False
+        # Длина хвоста, до которой не стоит повторять raw_decode недочитанного
+        # элемента: удвоение делает разбор линейным при любых размерах кусков.
+        self._retry_len = 0
+
+    @staticmethod
+    def _touches_end(buf: str, end: int) -> bool:
+        while end < len(buf) and buf[end] in _NUMBER_CHARS:
+            end += 1
+        return end == len(buf)
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[Any]:
+        self._buf += self._utf8.decode(chunk, final)
+        if not final and len(self._buf) < self._retry_len:
+            return []
+        self._retry_len = 0
+        items: List[Any] = []
+        pos = 0
+        buf = self._buf
+        while not self._done:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not self._started:
+                if buf[pos] != "[":
+                    raise ValueError("Ожидался JSON-массив")
+                self._started = True
+                pos += 1
+                continue
+            if buf[pos] == ",":
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                self._done = True
+                pos += 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                self._retry_len = 2 * (len(buf) - pos)
+                break
+            if not final and buf[pos] not in "{[\"" and self._touches_end(buf, end):
+                # Число или литерал на границе куска может быть недочитан:
+                # "-5." + "5e3" или "1" + "e5" декодировались бы по первой части.
+                self._retry_len = len(buf) - pos + 1
+                break
+            items.append(item)
+            pos = end
+        self._buf = buf[pos:]
+        if final and not self._done:
+            raise ValueError("JSON-массив оборван")
+        return items
+
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """Асинхронно отдаёт элементы JSON-массива по мере поступления байтов."""
+    stream = JsonArrayStream()
+    async for chunk in chunks:
+        for item in stream.feed(chunk):
+            yield item
+    for item in stream.feed(b"", final=True):
+        yield item
@@ -0,0 +1,146 @@
+"""Дешёвый детерминированный приоритет кандидатов перед LLM-анализом.
+
+Каждый компонент нормирован в [0, 1] и взвешивается весами из
+`scanner.priority.weights`. К сумме добавляется бонус ожидания: кандидат,
+который уже появлялся, но так и не был проанализирован, получает
+`aging_per_hour` за каждый час ожидания, поэтому никто не голодает.
+Отбор top-K — ограниченная куча размера K (O(n log K)).
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.scanner.protocol_filter import LINK_KEYS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {
+    "traction": 0.2,
+    "momentum": 0.3,
+    "audits": 0.15,
+    "links": 0.15,
+    "novelty": 0.2,
+}
+
+
+def _log_scale(value: float, low: float, high: float) -> float:
+    if value <= low:
+        return 0.0
+    if value >= high:
+        return 1.0
+    return (math.log(value) - math.log(low)) / (math.log(high) - math.log(low))
+
+
+class PriorityScorer:
+    """Считает `project["priority"]` и выбирает top-K с учётом ожидания."""
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        cfg = cfg or {}
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(cfg.get("weights") or {})
+        self.tvl_range = tuple(cfg.get("tvl_range") or (50_000, 1_000_000))
+        self.stars_range = tuple(cfg.get("stars_range") or (10, 5_000))
+        self.aging_per_hour = float(cfg.get("aging_per_hour", 0.01))
+        self.state_path = cfg.get("state_path")
+        # id -> время, когда кандидат впервые встал в очередь
+        self._waiting: Dict[str, float] = self._load()
+
+    def _load(self) -> Dict[str, float]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать состояние приоритетов {self.state_path}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            directory = os.path.dirname(self.state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._waiting, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить состояние приоритетов {self.state_path}: {e}")
+
+    def components(self, project: Dict[str, Any]) -> Dict[str, float]:
+        metrics = project.get("metrics", {})
+        if metrics.get("stars"):
+            traction = _log_scale(float(metrics["stars"]), *self.stars_range)
+        else:
+            traction = _log_scale(float(metrics.get("tvl", 0) or 0), *self.tvl_range)
+
+        momentum = metrics.get("momentum") or {}
+        change = momentum.get("change_7d")
+        if change is None:
+            change = float(metrics.get("tvl_change_7d", 0) or 0) / 100
+        # tanh сглаживает выбросы: +50% за неделю уже почти максимум.
+        growth = 0.5 + 0.5 * math.tanh(2 * change)
+        drawdown = momentum.get("drawdown_30d") or 0.0
+        momentum_score = max(0.0, growth + 0.5 * drawdown)
+
+        links = project.get("links") or {}
+        link_score = sum(1 for key in LINK_KEYS if links.get(key)) / len(LINK_KEYS)
+
+        delta = project.get("delta") or {}
+        novelty = {"new": 1.0, "changed": 0.5}.get(delta.get("status"), 0.0)
+
+        return {
+            "traction": round(traction, 4),
+            "momentum": round(momentum_score, 4),
+            "audits": 1.0 if metrics.get("is_audited") else 0.0,
+            "links": round(link_score, 4),
+            "novelty": novelty,
+        }
+
+    def score(self, project: Dict[str, Any], now: float) -> float:
+        components = self.components(project)
+        base = sum(self.weights.get(name, 0.0) * value for name, value in components.items())
+        waiting_hours = (now - self._waiting.get(project["id"], now)) / 3600
+        total = base + self.aging_per_hour * waiting_hours
+        project["priority"] = {
+            "score": round(total, 4),
+            "base": round(base, 4),
+            "waiting_hours": round(waiting_hours, 2),
+            "components": components,
+        }
+        return total
+
+    def select_top(self, projects: Iterable[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """K кандидатов с наибольшим приоритетом, по убыванию приоритета.
+
+        Все кандидаты встают в очередь ожидания; снимаются с неё после
+        успешного анализа (см. `forget`) или когда перестают быть кандидатами.
+        """
+        now = time.time()
+        heap: List[tuple] = []
+        seen = set()
+        for seq, project in enumerate(projects):
+            seen.add(project["id"])
+            self._waiting.setdefault(project["id"], now)
+            # seq разрывает ничьи и не даёт heapq сравнивать словари
+            item = (self.score(project, now), -seq, project)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+        # Выпавшие из кандидатов больше не ждут.
+        self._waiting = {pid: ts for pid, ts in self._waiting.items() if pid in seen}
+        self._save()
+        return [item[2] for item in sorted(heap, key=lambda x: x[:2], reverse=True)]
+
+    def forget(self, project_ids: Iterable[str]) -> None:
+        """Снимает проанализированные проекты с очереди ожидания."""
+        for project_id in project_ids:
+            self._waiting.pop(project_id, None)
+        self._save()
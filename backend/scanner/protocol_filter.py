@@ -0,0 +1,207 @@
+"""Отбор и проекция протоколов DeFi Llama в формат проекта сканера.
+
+Все предикаты берутся из `scanner.filters` в config.yaml. Для полного списка
+протоколов фильтр колоночный: числовые поля загружаются в массивы NumPy,
+категории кодируются целыми числами, и первичный отбор сводится к нескольким
+векторным операциям над булевыми масками. Для потокового режима есть
+поэлементная версия тех же предикатов (`ProtocolFilter.matches`).
+"""
+import hashlib
+import json
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+LINK_KEYS = ("url", "twitter", "github", "telegram", "discord")
+
+# Поля протокола, которые сохраняются в raw_data в потоковом режиме.
+PROJECTED_FIELDS = (
+    "name",
+    "slug",
+    "category",
+    "description",
+    "chain",
+    "chains",
+    "tvl",
+    "change_1d",
+    "change_7d",
+    "symbol",
+    "tokenSymbol",
+    "gecko_id",
+    "audit_links",
+    "listedAt",
+) + LINK_KEYS
+
+# Значения по умолчанию повторяют прежние захардкоженные пороги сканера.
+DEFAULT_FILTERS: Dict[str, Any] = {
+    "min_project_age_days": 0,
+    "min_name_length": 2,
+    "require_url": True,
+    "max_candidates": 15,
+    "numeric": {
+        "tvl": {"gt": 50_000, "lt": 1_000_000},
+        "change_7d": {"gt": 0},
+    },
+    "categories": ["DeFi", "Dex", "Lending", "Yield", "Infrastructure", "NFT", "Gaming"],
+    "exclude_categories": [
+        "Bridge",
+        "Stablecoin",
+        "CEX",
+        "Services",
+        "Ponzi",
+        "Reserve Currency",
+        "Algo-Stables",
+        "Farm",
+        "Indexes",
+        "Derivatives",
+        "Synthetics",
+    ],
+}
+
+_COMPARATORS = {
+    "gt": (np.greater, lambda a, b: a > b),
+    "gte": (np.greater_equal, lambda a, b: a >= b),
+    "lt": (np.less, lambda a, b: a < b),
+    "lte": (np.less_equal, lambda a, b: a <= b),
+}
+
+
+def _float(value: Any) -> float:
+    return float(value or 0)
+
+
+def _text(value: Any) -> str:
+    return str(value).strip() if value else ""
+
+
+def _safe_float(value: Any) -> float:
+    """Число или NaN: NaN не проходит ни одно сравнение, как раньше исключение."""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class ProtocolFilter:
+    """Набор предикатов отбора кандидатов, объявленный в `scanner.filters`."""
+
+    def __init__(self, filters_cfg: Optional[Dict[str, Any]] = None):
+        cfg = dict(DEFAULT_FILTERS)
+        cfg.update({k: v for k, v in (filters_cfg or {}).items() if v is not None})
+        self.min_name_length = int(cfg["min_name_length"])
+        self.require_url = bool(cfg["require_url"])
+        self.max_candidates = int(cfg["max_candidates"])
+        self.min_age_seconds = float(cfg["min_project_age_days"]) * 86400
+        self.numeric: Dict[str, Dict[str, float]] = {}
+        for field, bounds in (cfg["numeric"] or {}).items():
+            unknown = set(bounds) - set(_COMPARATORS)
+            if unknown:
+                raise ValueError(f"Неизвестные операторы для {field}: {sorted(unknown)}")
+            self.numeric[field] = {op: float(val) for op, val in bounds.items()}
+        excluded = {c.lower() for c in cfg["exclude_categories"] or []}
+        self.categories = frozenset(c.lower() for c in cfg["categories"] or []) - excluded
+        self.signature = hashlib.sha256(
+            json.dumps(cfg, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+
+    # ---------- поэлементная проверка (потоковый режим) ---------- #
+    def matches(self, protocol: Dict[str, Any], now: Optional[float] = None) -> bool:
+        if len(_text(protocol.get("name"))) < self.min_name_length:
+            return False
+        if _text(protocol.get("category")).lower() not in self.categories:
+            return False
+        for field, bounds in self.numeric.items():
+            value = _safe_float(protocol.get(field))
+            for op, bound in bounds.items():
+                if not _COMPARATORS[op][1](value, bound):
+                    return False
+        if self.require_url and not _text(protocol.get("url")):
+            return False
+        if self.min_age_seconds > 0:
+            listed_at = _safe_float(protocol.get("listedAt"))
+            if not listed_at <= (now or time.time()) - self.min_age_seconds:
+                return False
+        return True
+
+    # ---------- колоночная проверка (весь список) ---------- #
+    def mask(self, protocols: List[Dict[str, Any]], now: Optional[float] = None) -> np.ndarray:
+        """Булева маска прошедших фильтр протоколов."""
+        n = len(protocols)
+        names = np.fromiter(
+            (len(_text(p.get("name"))) for p in protocols), dtype=np.int64, count=n
+        )
+        mask = names >= self.min_name_length
+
+        vocab: Dict[str, int] = {}
+        codes = np.fromiter(
+            (vocab.setdefault(_text(p.get("category")).lower(), len(vocab)) for p in protocols),
+            dtype=np.int64,
+            count=n,
+        )
+        allowed = np.zeros(len(vocab), dtype=bool)
+        for category, code in vocab.items():
+            allowed[code] = category in self.categories
+        if n:
+            mask &= allowed[codes]
+
+        for field, bounds in self.numeric.items():
+            column = np.fromiter((_safe_float(p.get(field)) for p in protocols), dtype=np.float64, count=n)
+            for op, bound in bounds.items():
+                mask &= _COMPARATORS[op][0](column, bound)
+
+        if self.require_url:
+            mask &= np.fromiter((bool(_text(p.get("url"))) for p in protocols), dtype=bool, count=n)
+
+        if self.min_age_seconds > 0:
+            listed_at = np.fromiter((_safe_float(p.get("listedAt")) for p in protocols), dtype=np.float64, count=n)
+            mask &= listed_at <= (now or time.time()) - self.min_age_seconds
+        return mask
+
+    def select(self, protocols: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Протоколы, прошедшие фильтр, в исходном порядке."""
+        return [protocols[i] for i in np.flatnonzero(self.mask(protocols))]
+
+
+def to_project(protocol: Dict[str, Any], keep_raw: bool = True) -> Dict[str, Any]:
+    """Проекция протокола в проект. При keep_raw=False raw_data урезается до PROJECTED_FIELDS."""
+    name = (protocol.get("name") or "").strip()
+    category = (protocol.get("category") or "").lower()
+    slug = protocol.get("slug", "")
+    audits = len(protocol.get("audit_links", []) or [])
+
+    links = {}
+    for key in LINK_KEYS:
+        val = protocol.get(key)
+        if val:
+            links[key] = val
+
+    if keep_raw:
+        raw_data = protocol
+    else:
+        raw_data = {key: protocol[key] for key in PROJECTED_FIELDS if key in protocol}
+
+    return {
+        "id": f"defillama_{slug}",
+        "name": name,
+        "description": protocol.get("description", f"{category.capitalize()} protocol"),
+        "category": category.capitalize(),
+        "source": "defillama",
+        "url": protocol.get("url", ""),
+        "token_symbol": protocol.get("tokenSymbol") or protocol.get("symbol"),
+        "links": links,
+        "metrics": {
+            "tvl": _float(protocol.get("tvl")),
+            "tvl_change_7d": _float(protocol.get("change_7d")),
+            "chain": protocol.get("chain", "Multi-Chain"),
+            "audits": audits,
+            "is_audited": audits > 0,
+        },
+        "raw_data": raw_data,
+    }
+
+
+def select_smallest(projects: Iterable[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Оставляет limit проектов с наименьшим TVL."""
+    return sorted(projects, key=lambda x: x["metrics"]["tvl"])[:limit]
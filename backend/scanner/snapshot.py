@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# Поля проекта, изменение которых требует повторного анализа.
+FINGERPRINT_FIELDS = ("name", "category", "description", "url", "token_symbol", "links")
+FINGERPRINT_METRICS = ("chain", "audits")
+
+
+def fingerprint(project: Dict[str, Any]) -> str:
+    """Хэш содержимого проекта без быстро меняющихся чисел (TVL, change_7d)."""
+    metrics = project.get("metrics", {})
+    payload = {key: project.get(key) for key in FINGERPRINT_FIELDS}
+    payload.update({f"metrics.{key}": metrics.get(key) for key in FINGERPRINT_METRICS})
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SnapshotStore:
+    """Персистентный снимок последних обработанных проектов (ключ — id проекта).
+
+    `diff` отдаёт только новые и существенно изменившиеся проекты, а `commit`
+    фиксирует проекты после успешной обработки: если анализ упал, проект
+    всплывёт снова в следующем цикле.
+    """
+
+    def __init__(self, path: str, tvl_change_threshold: float = 0.1):
+        self.path = path
+        self.tvl_change_threshold = tvl_change_threshold
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать снимок {self.path}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _tvl_changed(self, old_tvl: float, new_tvl: float) -> bool:
+        if not old_tvl:
+            return bool(new_tvl)
+        return abs(new_tvl - old_tvl) / abs(old_tvl) >= self.tvl_change_threshold
+
+    def diff(self, projects: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Новые и существенно изменившиеся проекты; в каждый добавляется `delta`."""
+        changed: List[Dict[str, Any]] = []
+        for project in projects:
+            entry = self._entries.get(project["id"])
+            if entry is None:
+                project["delta"] = {"status": "new", "reasons": []}
+                changed.append(project)
+                continue
+
+            reasons = []
+            if entry.get("hash") != fingerprint(project):
+                reasons.append("content")
+            tvl = float(project.get("metrics", {}).get("tvl", 0) or 0)
+            if self._tvl_changed(float(entry.get("tvl", 0) or 0), tvl):
+                reasons.append("tvl")
+            if reasons:
+                project["delta"] = {
+                    "status": "changed",
+                    "reasons": reasons,
+                    "previous_tvl": entry.get("tvl"),
+                }
+                changed.append(project)
+        return changed
+
+    def commit(self, projects: Iterable[Dict[str, Any]]) -> None:
+        """Запоминает проекты как обработанные и сохраняет снимок на диск."""
+        now = time.time()
+        for project in projects:
+            self._entries[project["id"]] = {
+                "hash": fingerprint(project),
+                "tvl": float(project.get("metrics", {}).get("tvl", 0) or 0),
+                "updated_at": now,
+            }
+        try:
+            self._save()
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок {self.path}: {e}")
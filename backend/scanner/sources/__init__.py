@@ -0,0 +1,38 @@
+"""Подключаемые источники кандидатов для CryptoTracker."""
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Type
+
+from backend.scanner.sources.base import ScanSource, TokenBucket
+from backend.scanner.sources.defillama import DefiLlamaSource
+from backend.scanner.sources.github import GitHubSource
+
+if TYPE_CHECKING:
+    from backend.scanner.crypto_scanner import CryptoTracker
+
+logger = logging.getLogger(__name__)
+
+SOURCES: Dict[str, Type[ScanSource]] = {
+    DefiLlamaSource.name: DefiLlamaSource,
+    GitHubSource.name: GitHubSource,
+}
+
+
+def build_sources(tracker: "CryptoTracker", scan_cfg: Dict[str, Any]) -> List[ScanSource]:
+    """Создаёт включённые в `scanner.sources` источники в порядке приоритета."""
+    sources: List[ScanSource] = []
+    for name, cfg in (scan_cfg.get("sources") or {}).items():
+        cfg = dict(cfg or {})
+        if not cfg.get("enabled", False):
+            continue
+        source_cls = SOURCES.get(name)
+        if source_cls is None:
+            logger.warning(f"Источник {name} включён, но не реализован — пропускаем")
+            continue
+        if name == DefiLlamaSource.name:
+            cfg.setdefault("filters", scan_cfg.get("filters"))
+        sources.append(source_cls(tracker, cfg))
+    sources.sort(key=lambda source: source.priority)
+    return sources
+
+
+__all__ = ["SOURCES", "ScanSource", "TokenBucket", "build_sources", "DefiLlamaSource", "GitHubSource"]
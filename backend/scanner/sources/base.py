@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from backend.scanner.crypto_scanner import CryptoTracker
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket: не более `rate` запросов за `per` секунд с запасом `burst`."""
+
+    def __init__(self, rate: float, per: float = 60.0, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.per = float(per)
+        self.capacity = float(burst if burst is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+
+class ScanSource(ABC):
+    """Источник кандидатов для сканера.
+
+    Каждый источник работает со своим token bucket (`api_rate_limit` запросов
+    в минуту) и семафором (`max_concurrency`), а HTTP-сессию и дисковый кэш
+    берёт у трекера. `scan` отдаёт все найденные кандидаты, `select` — урезает
+    их до квоты источника после дельта-фильтра.
+    """
+
+    name = ""
+    # При дедупликации побеждает источник с меньшим priority.
+    priority = 100
+    # Источник отдаёт реальный TVL, который стоит писать во временной ряд.
+    tracks_tvl = False
+
+    def __init__(self, tracker: "CryptoTracker", cfg: Dict[str, Any]):
+        self.tracker = tracker
+        self.cfg = cfg
+        self.timeout = float(cfg.get("timeout", 60))
+        rate = cfg.get("api_rate_limit")
+        self.bucket = TokenBucket(float(rate)) if rate else None
+        self._semaphore = asyncio.Semaphore(int(cfg.get("max_concurrency", 4)))
+
+    async def fetch_json(self, url: str, **kwargs) -> Any:
+        """HTTP GET через кэш трекера с учётом лимитов источника."""
+        async with self._semaphore:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            return await self.tracker.fetch(url, **kwargs)
+
+    @abstractmethod
+    async def scan(self) -> List[Dict[str, Any]]:
+        """Все кандидаты источника в формате проекта сканера."""
+
+    def select(self, projects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return projects
@@ -0,0 +1,62 @@
+import logging
+from typing import Any, Dict, List
+
+from backend.scanner.json_stream import iter_json_array
+from backend.scanner.protocol_filter import ProtocolFilter, select_smallest, to_project
+from backend.scanner.sources.base import ScanSource
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class DefiLlamaSource(ScanSource):
+    """Малые растущие протоколы из https://api.llama.fi/protocols."""
+
+    name = "defillama"
+    priority = 0
+    tracks_tvl = True
+
+    def __init__(self, tracker, cfg: Dict[str, Any]):
+        super().__init__(tracker, cfg)
+        self.url = cfg.get("url", "https://api.llama.fi/protocols")
+        self.streaming = bool(cfg.get("streaming", False))
+        self.filter = ProtocolFilter(cfg.get("filters"))
+
+    async def scan(self) -> List[Dict[str, Any]]:
+        if self.streaming:
+            # Отфильтрованный список зависит от порогов — они входят в ключ кэша.
+            return await self.fetch_json(
+                self.url,
+                decode=self._decode_stream,
+                cache_key=f"{self.url}#candidates:{self.filter.signature}",
+            ) or []
+
+        projects: List[Dict[str, Any]] = []
+        data = await self.fetch_json(self.url)
+        if data:
+            for protocol in self.filter.select(data):
+                try:
+                    projects.append(to_project(protocol))
+                except Exception as e:
+                    logger.debug(f"Пропускаем {protocol.get('name', 'unknown')}: {e}")
+        return projects
+
+    async def _decode_stream(self, response) -> List[Dict[str, Any]]:
+        """Потоковый режим: протоколы разбираются по одному прямо из тела ответа.
+
+        В памяти остаются только прошедшие фильтр проекты с урезанным raw_data.
+        В кэш кладётся уже отфильтрованный список, поэтому 304 и свежий кэш
+        тоже не требуют разбора всего массива.
+        """
+        projects: List[Dict[str, Any]] = []
+        async for protocol in iter_json_array(response.content.iter_chunked(STREAM_CHUNK_SIZE)):
+            try:
+                if self.filter.matches(protocol):
+                    projects.append(to_project(protocol, keep_raw=False))
+            except Exception as e:
+                logger.debug(f"Пропускаем {protocol.get('name', 'unknown')}: {e}")
+        return projects
+
+    def select(self, projects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return select_smallest(projects, self.filter.max_candidates)
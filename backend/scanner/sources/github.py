@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+from urllib.parse import urlencode
+
+from backend.scanner.sources.base import ScanSource
+
+logger = logging.getLogger(__name__)
+
+# Поля репозитория, которые сохраняются в raw_data.
+REPO_FIELDS = (
+    "full_name",
+    "description",
+    "html_url",
+    "homepage",
+    "topics",
+    "language",
+    "stargazers_count",
+    "forks_count",
+    "open_issues_count",
+    "created_at",
+    "pushed_at",
+)
+
+TOPIC_CATEGORIES = (
+    ("nft", "NFT"),
+    ("gaming", "Gaming"),
+    ("defi", "DeFi"),
+    ("dex", "Dex"),
+    ("lending", "Lending"),
+)
+
+
+class GitHubSource(ScanSource):
+    """Свежие крипто-репозитории из GitHub Search API.
+
+    Без токена GitHub разрешает 10 поисковых запросов в минуту — отсюда
+    `api_rate_limit` в конфиге. Токен берётся из GITHUB_TOKEN.
+    """
+
+    name = "github"
+
+    def __init__(self, tracker, cfg: Dict[str, Any]):
+        super().__init__(tracker, cfg)
+        self.api_url = cfg.get("api_url", "https://api.github.com/search/repositories")
+        self.queries = cfg.get("queries") or ["topic:defi", "topic:web3", "topic:nft"]
+        self.created_within_days = int(cfg.get("created_within_days", 30))
+        self.min_stars = int(cfg.get("min_stars", 10))
+        self.max_results = int(cfg.get("max_results", 10))
+        self.headers = {"Accept": "application/vnd.github+json"}
+        token = os.getenv("GITHUB_TOKEN")
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def _query_url(self, query: str) -> str:
+        since = (datetime.now(tz=timezone.utc) - timedelta(days=self.created_within_days)).date()
+        params = {
+            "q": f"{query} created:>={since.isoformat()} stars:>={self.min_stars}",
+            "sort": "stars",
+            "order": "desc",
+            "per_page": self.max_results,
+        }
+        return f"{self.api_url}?{urlencode(params)}"
+
+    async def scan(self) -> List[Dict[str, Any]]:
+        responses = await asyncio.gather(
+            *(self.fetch_json(self._query_url(q), headers=self.headers) for q in self.queries),
+            return_exceptions=True,
+        )
+        projects: Dict[str, Dict[str, Any]] = {}
+        for query, data in zip(self.queries, responses):
+            if isinstance(data, BaseException):
+                logger.error(f"GitHub запрос '{query}' не удался: {data}")
+                continue
+            for repo in (data or {}).get("items", []):
+                try:
+                    project = self._to_project(repo)
+                except Exception as e:
+                    logger.debug(f"Пропускаем {repo.get('full_name', 'unknown')}: {e}")
+                    continue
+                projects.setdefault(project["id"], project)
+        return list(projects.values())
+
+    def _to_project(self, repo: Dict[str, Any]) -> Dict[str, Any]:
+        topics = [t.lower() for t in repo.get("topics") or []]
+        category = next((cat for topic, cat in TOPIC_CATEGORIES if topic in topics), "Infrastructure")
+        homepage = (repo.get("homepage") or "").strip()
+        links = {"github": repo["html_url"]}
+        if homepage:
+            links["url"] = homepage
+        return {
+            "id": f"github_{repo['full_name'].replace('/', '_').lower()}",
+            "name": repo.get("name") or repo["full_name"],
+            "description": repo.get("description") or f"{category} repository",
+            "category": category,
+            "source": "github",
+            "url": homepage or repo["html_url"],
+            "token_symbol": None,
+            "links": links,
+            "metrics": {
+                "tvl": 0.0,
+                "tvl_change_7d": 0.0,
+                "chain": "unknown",
+                "audits": 0,
+                "is_audited": False,
+                "stars": int(repo.get("stargazers_count", 0) or 0),
+                "forks": int(repo.get("forks_count", 0) or 0),
+            },
+            "raw_data": {key: repo[key] for key in REPO_FIELDS if key in repo},
+        }
+
+    def select(self, projects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(projects, key=lambda x: x["metrics"]["stars"], reverse=True)[: self.max_results]
@@ -0,0 +1,194 @@
+"""Хранилище временных рядов TVL с инкрементально считаемыми признаками динамики.
+
+Для каждого проекта ряд (timestamp, tvl) дописывается в свой бинарный
+append-only файл, а в памяти держится только окно последних `window_days`
+дней в `array('d')`. Признаки (изменение за 1/7/30 дней, наклон и
+волатильность за 7 дней, просадка от максимума за 30 дней) обновляются за
+амортизированное O(1) на точку: скользящие суммы, указатели на лаговые точки
+и монотонная очередь для максимума.
+"""
+import logging
+import math
+import os
+import re
+import struct
+import time
+from array import array
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+CHANGE_WINDOWS = {"change_1d": DAY, "change_7d": 7 * DAY, "change_30d": 30 * DAY}
+TREND_WINDOW = 7 * DAY
+_RECORD = struct.Struct("<dd")
+# Окно в памяти сжимается, когда вытесненный префикс занимает больше половины.
+_COMPACT_MIN = 256
+
+
+class _Series:
+    """Окно ряда одного проекта и скользящие агрегаты по нему."""
+
+    __slots__ = (
+        "ts", "tvl", "ret", "lags", "trend_start", "peak_start", "peaks",
+        "t0", "n", "st", "sy", "stt", "sty", "nr", "sr", "srr",
+    )
+
+    def __init__(self):
+        self.ts = array("d")
+        self.tvl = array("d")
+        # ret[i] — лог-доходность от точки i-1 к i (NaN, если не определена)
+        self.ret = array("d")
+        self.lags = {name: -1 for name in CHANGE_WINDOWS}
+        self.trend_start = 0
+        self.peak_start = 0
+        self.peaks: deque = deque()
+        self._reset_sums()
+
+    def _reset_sums(self) -> None:
+        self.t0 = self.ts[self.trend_start] if len(self.ts) > self.trend_start else 0.0
+        self.n = self.st = self.sy = self.stt = self.sty = 0.0
+        self.nr = self.sr = self.srr = 0.0
+
+    def _add(self, i: int, sign: float) -> None:
+        t = (self.ts[i] - self.t0) / DAY
+        y = self.tvl[i]
+        self.n += sign
+        self.st += sign * t
+        self.sy += sign * y
+        self.stt += sign * t * t
+        self.sty += sign * t * y
+
+    def _add_ret(self, i: int, sign: float) -> None:
+        r = self.ret[i]
+        if not math.isnan(r):
+            self.nr += sign
+            self.sr += sign * r
+            self.srr += sign * r * r
+
+    def append(self, ts: float, tvl: float) -> bool:
+        if len(self.ts) and ts <= self.ts[-1]:
+            return False
+        i = len(self.ts)
+        prev = self.tvl[-1] if i else 0.0
+        self.ts.append(ts)
+        self.tvl.append(tvl)
+        self.ret.append(math.log(tvl / prev) if prev > 0 and tvl > 0 else math.nan)
+
+        if self.n == 0:
+            self.t0 = ts
+        self._add(i, 1.0)
+        if i > self.trend_start:
+            self._add_ret(i, 1.0)
+        # Вытесняем из 7-дневного окна точки старше ts - 7d.
+        while self.ts[self.trend_start] <= ts - TREND_WINDOW:
+            self._add(self.trend_start, -1.0)
+            self.trend_start += 1
+            self._add_ret(self.trend_start, -1.0)
+
+        for name, window in CHANGE_WINDOWS.items():
+            p = self.lags[name]
+            while p + 1 < len(self.ts) and self.ts[p + 1] <= ts - window:
+                p += 1
+            self.lags[name] = p
+
+        # Максимум за 30 дней: монотонно убывающая очередь индексов.
+        self.peak_start = max(self.lags["change_30d"], 0)
+        while self.peaks and self.tvl[self.peaks[-1]] <= tvl:
+            self.peaks.pop()
+        self.peaks.append(i)
+        while self.peaks[0] < self.peak_start:
+            self.peaks.popleft()
+
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self) -> None:
+        cut = min(self.peak_start, self.trend_start)
+        if cut < _COMPACT_MIN or cut * 2 < len(self.ts):
+            return
+        self.ts = self.ts[cut:]
+        self.tvl = self.tvl[cut:]
+        self.ret = self.ret[cut:]
+        self.lags = {name: max(p - cut, -1) for name, p in self.lags.items()}
+        self.trend_start -= cut
+        self.peak_start -= cut
+        self.peaks = deque(i - cut for i in self.peaks)
+        # Пересчёт сумм заодно сбрасывает накопленную ошибку округления.
+        self._reset_sums()
+        for i in range(self.trend_start, len(self.ts)):
+            self._add(i, 1.0)
+            if i > self.trend_start:
+                self._add_ret(i, 1.0)
+
+    def features(self) -> Dict[str, Any]:
+        if not len(self.ts):
+            return {"samples": 0}
+        last = self.tvl[-1]
+        out: Dict[str, Any] = {"samples": len(self.ts) - min(self.peak_start, self.trend_start)}
+        for name, p in self.lags.items():
+            base = self.tvl[p] if p >= 0 else 0.0
+            out[name] = round(last / base - 1, 6) if base > 0 else None
+
+        denom = self.n * self.stt - self.st * self.st
+        out["slope_7d"] = round((self.n * self.sty - self.st * self.sy) / denom, 2) if self.n >= 2 and denom > 0 else None
+        if self.nr >= 2:
+            var = max(self.srr / self.nr - (self.sr / self.nr) ** 2, 0.0)
+            out["volatility_7d"] = round(math.sqrt(var), 6)
+        else:
+            out["volatility_7d"] = None
+        peak = self.tvl[self.peaks[0]]
+        out["drawdown_30d"] = round(last / peak - 1, 6) if peak > 0 else None
+        return out
+
+
+def _safe_name(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+class TvlSeriesStore:
+    """Append-only ряды TVL по ключу проекта с признаками в `metrics["momentum"]`."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self._series: Dict[str, _Series] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{_safe_name(key)}.bin")
+
+    def _load(self, key: str) -> _Series:
+        series = _Series()
+        path = self._path(key)
+        if os.path.exists(path):
+            raw = array("d")
+            with open(path, "rb") as f:
+                data = f.read()
+            raw.frombytes(data[: len(data) - len(data) % _RECORD.size])
+            for i in range(0, len(raw), 2):
+                series.append(raw[i], raw[i + 1])
+        self._series[key] = series
+        return series
+
+    def append(self, key: str, tvl: float, ts: Optional[float] = None) -> Dict[str, Any]:
+        ts = time.time() if ts is None else ts
+        series = self._series.get(key) or self._load(key)
+        if series.append(ts, float(tvl)):
+            with open(self._path(key), "ab") as f:
+                f.write(_RECORD.pack(ts, float(tvl)))
+        return series.features()
+
+    def features(self, key: str) -> Dict[str, Any]:
+        series = self._series.get(key) or self._load(key)
+        return series.features()
+
+    def update_projects(self, projects: Iterable[Dict[str, Any]], ts: Optional[float] = None) -> None:
+        """Дописывает текущий TVL проектов и кладёт признаки в metrics["momentum"]."""
+        ts = time.time() if ts is None else ts
+        for project in projects:
+            metrics = project.setdefault("metrics", {})
+            try:
+                metrics["momentum"] = self.append(project["id"], float(metrics.get("tvl", 0) or 0), ts)
+            except Exception as e:
+                logger.warning(f"Не удалось обновить ряд TVL {project.get('id')}: {e}")
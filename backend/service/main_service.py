@@ -1,16 +1,25 @@
 import asyncio
-import json
 import sqlite3
 import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import schedule
 
-from backend.analyzer.openrouter_analyzer import OpenRouterAnalyzer
+from backend.analyzer.fork_index import ForkIndex, inherit_analysis
+from backend.analyzer.ollama_analyzer import OllamaCouncilAnalyzer
+from backend.analyzer.openrouter_analyzer import EnsembleOpenRouterAnalyzer
+from backend.analyzer.prescreen import Prescreener, prescreen_analysis
 from backend.analyzer.strategy_generator import StrategyGenerator
-from backend.config import get_db_path, get_notifications_config, get_scanner_config
+from backend.config import get_notifications_config, get_pipeline_config, get_scanner_config
 from backend.scanner.crypto_scanner import CryptoTracker
+from backend.scanner.snapshot import fingerprint
+from backend.service.pipeline import Pipeline
+from backend.storage.backup import BackupService
+from backend.storage.database import Database
+from backend.storage import blobs
+from backend.storage.migrations import analysis_columns, apply_migrations
+from backend.storage.retention import EventRetention
 from backend.telegram_client import send_message as send_telegram_message
 
 
@@ -21,83 +30,158 @@ class CryptoAlphaService:
 
     def __init__(self):
         self.tracker = CryptoTracker()
-        self.analyzer = OpenRouterAnalyzer()
+        # Одна connection-писатель и пул читателей на весь процесс.
+        self.db = Database.from_config()
+        # Фоновый перенос старых events в архив (None — выключен).
+        self.retention = EventRetention.from_config(self.db)
+        # Онлайн-бэкапы базы каждые database.backup_interval (None — выключены).
+        self.backups = BackupService.from_config()
+        self._maintenance_tasks: List[asyncio.Task] = []
+        self.analyzer = EnsembleOpenRouterAnalyzer()
+        # Каскад: дешёвая оценка числом до полного анализа (None — выключен).
+        self.prescreener = Prescreener.from_config(self.analyzer)
+        # Форки уже проанализированных проектов наследуют их анализ (None — выключено).
+        self.fork_index = ForkIndex.from_config()
+        # Локальный совет Ollama подхватывает проекты, на которые не хватило квоты.
+        self.local_analyzer = OllamaCouncilAnalyzer.from_config()
+        self._local_started = False
         self.strategy_gen = StrategyGenerator()
         self.notifications_cfg = get_notifications_config()
         self.scan_cfg = get_scanner_config()
+        self.pipeline_cfg = get_pipeline_config()
         self.running = False
+        self._schema_checked = False
 
     # ---------------- DB helpers ---------------- #
-    def _open_db(self):
-        return sqlite3.connect(get_db_path())
-
-    async def get_unanalyzed_projects(self) -> List[Dict[str, Any]]:
-        conn = self._open_db()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT * FROM projects
-            WHERE status = 'new'
-            ORDER BY discovered_at DESC
-            LIMIT 50
-            """
-        )
-        rows = cursor.fetchall()
-        conn.close()
+    async def _db(self) -> Database:
+        """Хранилище с применёнными миграциями схемы (один раз за процесс)."""
+        if not self._schema_checked:
+            applied = await self.db.write(apply_migrations)
+            if applied:
+                print(f"Схема БД обновлена до версии {applied[-1]}")
+            self._schema_checked = True
+        return self.db
 
-        projects: List[Dict[str, Any]] = []
-        for row in rows:
-            item = dict(row)
-            try:
-                item["raw_data"] = json.loads(item.get("raw_data") or "{}")
-            except Exception:
-                item["raw_data"] = {}
-            projects.append(item)
-        return projects
+    async def save_projects(self, projects: List[Dict[str, Any]]) -> Set[str]:
+        """Одной транзакцией сохраняет результаты сканирования (upsert по id).
+
+        discovered_at ставится только при первой вставке. Проанализированный
+        проект снова получает status='new', если изменился его content_hash или
+        сканер пометил его как существенно изменившийся (delta).
+        Возвращает id проектов, которым нужен анализ.
+        """
+        if not projects:
+            return set()
+        now = datetime.now(tz=timezone.utc).isoformat()
+        # raw_data сжимается до очереди писателя; в строке остаётся ссылка на blob.
+        packed = [blobs.pack(project.get("raw_data") or {}) for project in projects]
+        rows = [
+            (
+                project["id"],
+                project.get("name"),
+                project.get("category"),
+                project.get("source"),
+                project.get("description"),
+                now,
+                raw.ref,
+                fingerprint(project),
+                1 if (project.get("delta") or {}).get("status") == "changed" else 0,
+            )
+            for project, raw in zip(projects, packed)
+        ]
+        ids = [row[0] for row in rows]
+
+        def upsert(conn: sqlite3.Connection) -> Set[str]:
+            for raw in packed:
+                blobs.store(conn, raw)
+            conn.executemany(
+                """
+                INSERT INTO projects (id, name, category, source, description,
+                                      discovered_at, raw_ref, content_hash, status)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, 'new')
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    category = excluded.category,
+                    source = excluded.source,
+                    description = excluded.description,
+                    raw_ref = excluded.raw_ref,
+                    status = CASE
+                        WHEN projects.content_hash IS NOT excluded.content_hash OR ?9 THEN 'new'
+                        ELSE projects.status
+                    END,
+                    content_hash = excluded.content_hash
+                """,
+                rows,
+            )
+            placeholders = ",".join("?" for _ in ids)
+            return {
+                row[0]
+                for row in conn.execute(
+                    f"SELECT id FROM projects WHERE status = 'analyzed' AND id IN ({placeholders})",
+                    ids,
+                )
+            }
+
+        db = await self._db()
+        analyzed = await db.write(upsert)
+        return set(ids) - analyzed
 
     async def save_analysis(self, project_id: str, analysis: Dict[str, Any]):
-        conn = self._open_db()
-        cursor = conn.cursor()
         score = analysis.get("score", 0)
         verdict = analysis.get("verdict")
-        try:
-            cursor.execute(
-                """
+        # Один blob на анализ: на него ссылаются и projects, и events.
+        packed = blobs.pack(analysis)
+        columns = analysis_columns(analysis)
+        timestamp = datetime.now(tz=timezone.utc).isoformat()
+
+        def update(conn: sqlite3.Connection) -> None:
+            ref = blobs.store(conn, packed)
+            conn.execute(
+                f"""
                 UPDATE projects
                 SET status = 'analyzed',
-                    llm_analysis = ?,
+                    analysis_ref = ?,
                     confidence_score = ?,
-                    verdict = ?
+                    verdict = ?,
+                    {", ".join(f"{column} = ?" for column in columns)}
                 WHERE id = ?
                 """,
-                (json.dumps(analysis), score, verdict, project_id),
+                (ref, score, verdict, *columns.values(), project_id),
             )
-            cursor.execute(
+            conn.execute(
                 """
-                INSERT INTO events (project_id, event_type, event_data, timestamp)
+                INSERT INTO events (project_id, event_type, data_ref, timestamp)
                 VALUES (?, ?, ?, ?)
                 """,
-                (
-                    project_id,
-                    "llm_analysis_completed",
-                    json.dumps(analysis),
-                    datetime.now(tz=timezone.utc).isoformat(),
-                ),
+                (project_id, "llm_analysis_completed", ref, timestamp),
             )
-            conn.commit()
+
+        try:
+            db = await self._db()
+            await db.write(update)
         except Exception as e:
+            # Вызывающий не должен фиксировать проект в снимке: анализ не сохранён.
             print(f"Error saving analysis: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
+            raise
 
     # ---------------- Notifications ---------------- #
     async def _notify_error(self, message: str):
         await send_telegram_message(f"⚠️ Ошибка: {message}")
 
-    async def _notify_scan_complete(self):
-        await send_telegram_message("✅ Сканирование завершено.")
+    async def _notify_scan_complete(self, stats: Dict[str, Any]):
+        stages = stats.get("stages", {})
+        analyzed = stages.get("persist", {}).get("processed", 0)
+        skipped = stats.get("no_answer", 0)
+        errors = sum(stage.get("errors", 0) for stage in stages.values())
+        screened = stats.get("prescreen")
+        prescreen = (
+            f" Префильтр пропустил {screened['passed']} из {screened['screened']}." if screened else ""
+        )
+        forks = f" Форков с унаследованным анализом: {stats['forks']}." if stats.get("forks") else ""
+        await send_telegram_message(
+            f"✅ Сканирование завершено за {stats.get('elapsed', 0):.1f}s: "
+            f"проанализировано {analyzed}, без ответа LLM {skipped}, ошибок {errors}.{prescreen}{forks}"
+        )
 
     async def should_notify(self, analysis: Dict[str, Any]) -> bool:
         telegram_cfg = self.notifications_cfg.get("telegram", {})
@@ -129,41 +213,185 @@ class CryptoAlphaService:
         )
         await bot.send_project_analysis(project, analysis)
 
-    # ---------------- Core workflow ---------------- #
-    async def scan_and_analyze(self):
-        print(f"[{datetime.now()}] start cycle")
-        await send_telegram_message("⏳ Старт цикла сканирования")
+    # ---------------- Pipeline stages ---------------- #
+    def _build_pipeline(self) -> Pipeline:
+        """scan -> prioritize -> analyze (N воркеров) -> strategy -> persist -> notify.
+
+        Элемент на входе — словарь цикла: scan опрашивает источники,
+        prioritize отбирает top-K, сохраняет проекты, применяет префильтр и
+        форки и раздаёт пачки (один запрос к модели на пачку); analyze
+        раздаёт дальше по одному проекту. Счётчики цикла копятся в том же
+        словаре. Размеры очередей и число воркеров каждой стадии задаются в
+        секции `pipeline` конфига.
+        """
+        cfg = self.pipeline_cfg
+        workers = cfg.get("workers", {})
+        return (
+            Pipeline(queue_size=cfg.get("queue_size", 10))
+            .add_stage("scan", self._stage_scan)
+            .add_stage("prioritize", self._stage_prioritize, fan_out=True)
+            .add_stage("analyze", self._stage_analyze, workers.get("analyze", 4), fan_out=True)
+            .add_stage("strategy", self._stage_strategy, workers.get("strategy", 1))
+            .add_stage("persist", self._stage_persist, workers.get("persist", 1))
+            .add_stage("notify", self._stage_notify, workers.get("notify", 1))
+        )
+
+    async def start(self):
+        """Открывает хранилище, запускает ретенцию, бэкапы, пробы моделей и пул Ollama (один раз)."""
+        await self._db()
+        if not self._maintenance_tasks:
+            for job in (self.retention, self.backups):
+                if job is not None:
+                    self._maintenance_tasks.append(asyncio.create_task(job.run_forever()))
+            router = self.analyzer.router
+            if router.enabled and router.probe_interval > 0:
+                self._maintenance_tasks.append(asyncio.create_task(self.analyzer.run_probes()))
+        if self.local_analyzer is not None and not self._local_started:
+            self._local_started = True
+            warmed = await self.local_analyzer.start()
+            print(f"Ollama: прогреты модели {', '.join(warmed) or '-'}")
+
+    async def close(self):
+        for task in self._maintenance_tasks:
+            task.cancel()
+        await asyncio.gather(*self._maintenance_tasks, return_exceptions=True)
+        self._maintenance_tasks = []
+        await self.tracker.close()
+        await self.db.close()
+        await self.analyzer.close()
+        if self.local_analyzer is not None:
+            await self.local_analyzer.close()
+        if self.fork_index is not None:
+            self.fork_index.close()
 
+    async def _stage_scan(self, cycle: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.time()
         try:
-            scan_start = time.time()
-            scan_result = await self.tracker.run_full_scan()
-            projects = scan_result.get("projects") or []
-            await send_telegram_message(f"📊 Источники просканированы за {time.time() - scan_start:.1f}s")
+            cycle["scan"] = await self.tracker.scan_candidates()
+        except Exception as e:
+            await self._notify_error(f"Ошибка сканирования: {e}")
+            raise
+        await send_telegram_message(f"📊 Источники просканированы за {time.time() - start:.1f}s")
+        return cycle
 
+    async def _stage_prioritize(self, cycle: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Top-K, сохранение, префильтр и форки; на выходе — пачки для анализа."""
+        try:
+            projects = self.tracker.prioritize(cycle["scan"]["candidates"])
+            pending = await self.save_projects(projects)
+            # Уже проанализированные и не изменившиеся — не отдавать их снова.
+            self.tracker.commit_processed([p for p in projects if p["id"] not in pending])
+            projects = [p for p in projects if p["id"] in pending]
             if not projects:
+                cycle["empty"] = True
                 await send_telegram_message("⚠️ Новых проектов не найдено")
-                return
+                return None
+
+            if self.prescreener is not None:
+                pool = projects[: self.prescreener.max_projects or len(projects)]
+                projects, rejected = await self.prescreener.screen(pool)
+                # Отсеянные сохраняются с оценкой префильтра и не проверяются до изменения.
+                saved = []
+                for project in rejected:
+                    try:
+                        await self.save_analysis(project["id"], prescreen_analysis(project))
+                    except Exception:
+                        continue  # не сохранён — остаётся в diff и будет отсеян в следующем цикле
+                    saved.append(project)
+                self.tracker.commit_processed(saved)
+                cycle["prescreen"] = {"screened": len(pool), "passed": len(projects)}
+
+            if self.fork_index is not None:
+                projects, cycle["forks"] = await self._reuse_fork_analyses(projects)
+        except Exception as e:
+            await self._notify_error(f"Ошибка отбора проектов: {e}")
+            raise
+
+        limit = self.scan_cfg.get("max_projects_per_scan", 20)
+        return [{"cycle": cycle, "batch": batch} for batch in self.analyzer.plan_batches(projects[:limit])]
+
+    async def _stage_analyze(self, item: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        cycle, batch = item["cycle"], item["batch"]
+        try:
+            analyses = await self.analyzer.analyze_batch(batch)
+            if self.local_analyzer is not None:
+                rest = [p for p in batch if analyses.get(p["id"], {"is_fallback": True}).get("is_fallback")]
+                if rest:
+                    local = await asyncio.gather(*(self.local_analyzer.analyze_project(p) for p in rest))
+                    analyses.update({p["id"]: a for p, a in zip(rest, local)})
+        except Exception as e:
+            cycle["no_answer"] += len(batch)
+            names = ", ".join(str(p.get("name")) for p in batch)
+            await self._notify_error(f"Ошибка анализа {names}: {e}")
+            raise
+        # Не сохраняем заглушки: такие проекты останутся 'new' и попадут в следующий цикл.
+        items = []
+        for project in batch:
+            analysis = analyses.get(project["id"], {"is_fallback": True})
+            if analysis.get("is_fallback"):
+                cycle["no_answer"] += 1
+            else:
+                items.append({"project": project, "analysis": analysis})
+        return items or None
 
-            limit = self.scan_cfg.get("max_projects_per_scan", 20)
-            total = min(limit, len(projects))
-            delay_between = self.scan_cfg.get("delay_between", 1)
+    async def _stage_strategy(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        analysis = item["analysis"]
+        analysis["strategy"] = self.strategy_gen.generate_strategy(item["project"], analysis.get("score", 0))
+        return item
 
-            for idx, project in enumerate(projects[:limit], 1):
-                await send_telegram_message(f"🔎 Анализ {idx}/{total}: {project.get('name')}")
-                try:
-                    analysis = await self.analyzer.analyze_project(project)
-                    strategy = self.strategy_gen.generate_strategy(project, analysis.get("score", 0))
-                    analysis["strategy"] = strategy
+    async def _stage_persist(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        # Снимок фиксируется только после записи: ошибка save_analysis
+        # пропускает commit_processed, и проект придёт снова в следующем скане.
+        await self.save_analysis(item["project"]["id"], item["analysis"])
+        self.tracker.commit_processed([item["project"]])
+        if self.fork_index is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.fork_index.add, item["project"], item["analysis"])
+        return item
 
-                    await self.save_analysis(project["id"], analysis)
+    async def _reuse_fork_analyses(self, projects: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Сохраняет форкам анализ их оригинала и уведомляет о них; возвращает проекты для полного анализа и число форков."""
+        loop = asyncio.get_running_loop()
+        rest, forks = [], []
+        for project in projects:
+            match = await loop.run_in_executor(None, self.fork_index.match, project)
+            if match is None:
+                rest.append(project)
+                continue
+            print(f"{project.get('name')}: форк {match['name']} (сходство {match['similarity']:.2f})")
+            analysis = inherit_analysis(project, match)
+            try:
+                await self.save_analysis(project["id"], analysis)
+            except Exception:
+                continue  # не сохранён — остаётся в diff до следующего цикла
+            if await self.should_notify(analysis):
+                await self.send_notification(project, analysis)
+            forks.append(project)
+        self.tracker.commit_processed(forks)
+        return rest, len(forks)
 
-                    if await self.should_notify(analysis):
-                        await self.send_notification(project, analysis)
-                except Exception as e:
-                    await self._notify_error(f"Ошибка анализа {project.get('name')}: {e}")
-                await asyncio.sleep(delay_between)
+    async def _stage_notify(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if await self.should_notify(item["analysis"]):
+            await self.send_notification(item["project"], item["analysis"])
+        return item
 
-            await self._notify_scan_complete()
+    # ---------------- Core workflow ---------------- #
+    async def scan_and_analyze(self):
+        print(f"[{datetime.now()}] start cycle")
+        await send_telegram_message("⏳ Старт цикла сканирования")
+
+        try:
+            # Хранилище, фоновое обслуживание и Ollama готовы до первой стадии.
+            await self.start()
+            cycle: Dict[str, Any] = {"no_answer": 0, "forks": 0}
+            stats = await self._build_pipeline().run([cycle])
+            if "scan" not in cycle or cycle.get("empty"):
+                return
+            stats["no_answer"] = cycle["no_answer"]
+            stats["forks"] = cycle["forks"]
+            if "prescreen" in cycle:
+                stats["prescreen"] = cycle["prescreen"]
+            await self._notify_scan_complete(stats)
         except Exception as e:
             print(f"Error in cycle: {e}")
             await self._notify_error(str(e))
@@ -171,6 +399,7 @@ class CryptoAlphaService:
     async def run_scheduled(self):
         """Асинхронный планировщик без вложенных asyncio.run."""
         interval = max(int(self.scan_cfg.get("interval", 1800)), 60)
+        await self.start()
         while True:
             await self.scan_and_analyze()
             await asyncio.sleep(interval)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Awaitable[Optional[Any]]]
+
+_DONE = object()
+
+
+class Stage:
+    """Стадия конвейера: `workers` корутин обрабатывают элементы из входной очереди.
+
+    Стадия с `fan_out=True` возвращает список: каждый его элемент уходит на
+    следующую стадию отдельно (например, пачка проектов -> по проекту).
+    """
+
+    def __init__(self, name: str, handler: Handler, workers: int = 1, fan_out: bool = False):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.fan_out = fan_out
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_time = 0.0
+
+
+class Pipeline:
+    """Цепочка стадий asyncio, связанных ограниченными очередями.
+
+    Полная очередь блокирует предыдущую стадию (backpressure), поэтому в
+    памяти одновременно находится не больше `queue_size` элементов на стык.
+    Обработчик возвращает элемент для следующей стадии или None, чтобы
+    снять элемент с конвейера; исключение логируется и снимает только
+    этот элемент.
+    """
+
+    def __init__(self, queue_size: int = 10):
+        self.queue_size = max(1, int(queue_size))
+        self.stages: List[Stage] = []
+
+    def add_stage(self, name: str, handler: Handler, workers: int = 1, fan_out: bool = False) -> "Pipeline":
+        self.stages.append(Stage(name, handler, workers, fan_out))
+        return self
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            start = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.errors += 1
+                logger.error("Стадия %s: ошибка обработки: %s", stage.name, e, exc_info=True)
+                continue
+            finally:
+                stage.busy_time += time.monotonic() - start
+            if result is None:
+                stage.dropped += 1
+                continue
+            stage.processed += 1
+            if outbox is not None:
+                for out in result if stage.fan_out else (result,):
+                    await outbox.put(out)
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        await asyncio.gather(*(self._worker(stage, inbox, outbox) for _ in range(stage.workers)))
+        if outbox is not None:
+            next_stage = self.stages[self.stages.index(stage) + 1]
+            for _ in range(next_stage.workers):
+                await outbox.put(_DONE)
+
+    async def run(self, items: Iterable[Any]) -> Dict[str, Any]:
+        """Прогоняет элементы через все стадии и возвращает статистику по стадиям."""
+        if not self.stages:
+            return {}
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        tasks = [
+            asyncio.create_task(
+                self._run_stage(stage, queues[i], queues[i + 1] if i + 1 < len(queues) else None)
+            )
+            for i, stage in enumerate(self.stages)
+        ]
+        start = time.monotonic()
+        try:
+            for item in items:
+                await queues[0].put(item)
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return {
+            "elapsed": time.monotonic() - start,
+            "stages": {
+                stage.name: {
+                    "workers": stage.workers,
+                    "processed": stage.processed,
+                    "dropped": stage.dropped,
+                    "errors": stage.errors,
+                    "busy_time": round(stage.busy_time, 3),
+                }
+                for stage in self.stages
+            },
+        }
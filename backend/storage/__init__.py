@@ -0,0 +1 @@
+"""Хранилище SQLite."""
@@ -0,0 +1,192 @@
+"""Онлайн-бэкапы SQLite через backup API.
+
+Копия снимается с работающей базы, без остановки записи: отдельная
+connection открывает читающую транзакцию (снимок WAL) и копирует страницы
+порциями по `pages` с паузой `pause` между шагами. Пока держится снимок,
+копия согласована, а писатели не ждут — в WAL читатель им не мешает, лишь
+checkpoint не заходит дальше снимка до конца копирования. Без снимка любая
+запись перезапускала бы копирование с начала.
+
+Готовая копия сжимается gzip, проверяется (распаковка во временный файл и
+PRAGMA integrity_check) и только после этого попадает в каталог под своим
+именем; хранятся последние `keep` копий.
+"""
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.config import get_database_config, get_db_path
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 1024 * 1024
+
+
+def verify_backup(path: str) -> str:
+    """Результат PRAGMA integrity_check для копии (.db или .db.gz); "ok" — копия цела."""
+    tmp_path = None
+    try:
+        if path.endswith(".gz"):
+            fd, tmp_path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(path) or ".")
+            with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as src:
+                shutil.copyfileobj(src, out, _CHUNK)
+        conn = sqlite3.connect(f"file:{tmp_path or path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+        return "; ".join(str(row[0]) for row in rows)
+    except (OSError, EOFError, zlib.error, sqlite3.Error) as e:
+        return f"error: {e}"
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class BackupService:
+    """Периодические онлайн-бэкапы одного файла базы (см. описание модуля)."""
+
+    def __init__(
+        self,
+        db_path: str,
+        backup_dir: str = "backups",
+        interval: float = 86400,
+        keep: int = 7,
+        pages: int = 256,
+        pause: float = 0.005,
+        compress: bool = True,
+    ):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.interval = max(60.0, float(interval))
+        self.keep = max(1, int(keep))
+        self.pages = max(1, int(pages))
+        self.pause = max(0.0, float(pause))
+        self.compress = compress
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0]
+        self.last: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_config(cls) -> Optional["BackupService"]:
+        """Бэкапы из секции database; None, если backup_interval = 0."""
+        cfg = get_database_config()
+        interval = float(cfg.get("backup_interval", 86400))
+        if interval <= 0:
+            return None
+        return cls(
+            get_db_path(),
+            backup_dir=cfg.get("backup_dir", "backups"),
+            interval=interval,
+            keep=int(cfg.get("backup_keep", 7)),
+            pages=int(cfg.get("backup_pages", 256)),
+            pause=float(cfg.get("backup_pause", 0.005)),
+            compress=bool(cfg.get("backup_compress", True)),
+        )
+
+    def backups(self) -> List[str]:
+        """Существующие копии, от старых к новым (имя содержит время)."""
+        return sorted(glob.glob(os.path.join(self.backup_dir, f"{self.prefix}_*.db*")))
+
+    def _copy(self, dest_path: str) -> int:
+        """Постраничная копия из снимка; возвращает число страниц."""
+        src = sqlite3.connect(self.db_path, isolation_level=None)
+        src.execute("PRAGMA query_only = ON")
+        dest = sqlite3.connect(dest_path, isolation_level=None)
+        total = 0
+
+        def progress(status: int, remaining: int, count: int) -> None:
+            nonlocal total
+            total = count
+            if remaining and self.pause:
+                time.sleep(self.pause)
+
+        try:
+            # Читающая транзакция фиксирует снимок WAL на всё время копирования.
+            src.execute("BEGIN")
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            src.backup(dest, pages=self.pages, progress=progress)
+            src.execute("COMMIT")
+            # Копия — самостоятельный файл без -wal/-shm, восстановление простым копированием.
+            dest.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dest.close()
+            src.close()
+        return total
+
+    def create(self) -> Dict[str, Any]:
+        """Снимает, сжимает и проверяет копию, затем удаляет лишние старые (блокирующий)."""
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(self.db_path)
+        os.makedirs(self.backup_dir, exist_ok=True)
+        started = time.time()
+        name = f"{self.prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        final_path = os.path.join(self.backup_dir, name + (".gz" if self.compress else ""))
+        fd, raw_path = tempfile.mkstemp(suffix=".db.part", dir=self.backup_dir)
+        os.close(fd)
+        tmp_path = raw_path
+        try:
+            pages = self._copy(raw_path)
+            if self.compress:
+                tmp_path = raw_path + ".gz"
+                with open(raw_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as out:
+                    shutil.copyfileobj(src, out, _CHUNK)
+                os.remove(raw_path)
+            check = verify_backup(tmp_path)
+            if check != "ok":
+                raise RuntimeError(f"integrity_check: {check}")
+            os.replace(tmp_path, final_path)
+        finally:
+            for path in (raw_path, tmp_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        removed = self.rotate()
+        self.last = {
+            "path": final_path,
+            "pages": pages,
+            "size": os.path.getsize(final_path),
+            "seconds": round(time.time() - started, 2),
+            "removed": removed,
+            "at": time.time(),
+        }
+        logger.info(
+            f"Бэкап {final_path}: страниц {pages}, {self.last['size'] // 1024} КиБ "
+            f"за {self.last['seconds']}s, удалено старых {len(removed)}"
+        )
+        return self.last
+
+    def rotate(self) -> List[str]:
+        """Удаляет копии сверх последних `keep`."""
+        existing = self.backups()
+        stale = existing[: max(0, len(existing) - self.keep)]
+        for path in stale:
+            os.remove(path)
+        return stale
+
+    def _due_in(self) -> float:
+        """Секунд до следующей копии с учётом последней копии на диске (переживает перезапуск)."""
+        existing = self.backups()
+        if not existing:
+            return 0.0
+        return max(0.0, os.path.getmtime(existing[-1]) + self.interval - time.time())
+
+    async def run_forever(self) -> None:
+        """Копия каждые `interval` секунд в пуле потоков до отмены задачи."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._due_in())
+            try:
+                await loop.run_in_executor(None, self.create)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Бэкап {self.db_path} не создан: {e}")
+                await asyncio.sleep(min(self.interval, 600))
@@ -0,0 +1,109 @@
+"""Контентно-адресуемое хранилище JSON-payload'ов в таблице blobs.
+
+Большие JSON (raw_data проекта, анализ LLM) не хранятся в строках projects
+и events: строка держит ссылку — 128-битный blake2b канонического JSON
+(32 hex-символа, ссылка повторяется в каждой строке), а сам payload
+лежит один раз в blobs, сжатый zstd (если установлен `zstandard`) или zlib.
+Одинаковый анализ в projects и в events, неизменившийся raw_data между
+сканами — одна запись. Кодек хранится при каждом blob, поэтому базу,
+записанную с zstd, можно читать и там, где доступен только zlib, пока в ней
+нет zstd-блобов.
+
+Запросы списков blobs не читают; сжатые байты подтягиваются JOIN'ом только
+туда, где payload отдаётся, и распаковываются через `load_object`.
+"""
+import hashlib
+import json
+import sqlite3
+import zlib
+from typing import Any, Dict, NamedTuple, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен, zlib есть всегда
+    zstandard = None
+
+CODEC = "zstd" if zstandard is not None else "zlib"
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Удаляет blobs, на которые больше нет ссылок (после ретенции и обновлений).
+GC_SQL = """
+    DELETE FROM blobs WHERE hash NOT IN (
+        SELECT raw_ref FROM projects WHERE raw_ref IS NOT NULL
+        UNION SELECT analysis_ref FROM projects WHERE analysis_ref IS NOT NULL
+        UNION SELECT data_ref FROM events WHERE data_ref IS NOT NULL
+    )
+"""
+
+
+class Packed(NamedTuple):
+    ref: str
+    codec: str
+    size: int
+    data: bytes
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, ZLIB_LEVEL)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("blob сжат zstd, а пакет zstandard не установлен")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"неизвестный кодек blob: {codec}")
+
+
+def pack(value: Any) -> Optional[Packed]:
+    """Канонический JSON значения, его хеш и сжатые байты; None для None.
+
+    Сжатие — чистый CPU, его можно делать до очереди писателя.
+    """
+    if value is None:
+        return None
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return Packed(hashlib.blake2b(raw, digest_size=16).hexdigest(), CODEC, len(raw), _compress(raw, CODEC))
+
+
+def store(conn: sqlite3.Connection, packed: Optional[Packed]) -> Optional[str]:
+    """Сохраняет blob, если такого ещё нет; возвращает ссылку для строки."""
+    if packed is None:
+        return None
+    conn.execute(
+        "INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+        packed,
+    )
+    return packed.ref
+
+
+def put(conn: sqlite3.Connection, value: Any) -> Optional[str]:
+    return store(conn, pack(value))
+
+
+def unpack(codec: Optional[str], data: Optional[bytes]) -> Any:
+    if data is None:
+        return None
+    return json.loads(_decompress(data, codec))
+
+
+def get(conn: sqlite3.Connection, ref: Optional[str]) -> Any:
+    """Распакованное значение по ссылке; None, если ссылки или blob нет."""
+    if not ref:
+        return None
+    row = conn.execute("SELECT codec, data FROM blobs WHERE hash = ?", (ref,)).fetchone()
+    return unpack(row[0], row[1]) if row else None
+
+
+def load_object(codec: Optional[str], data: Optional[bytes]) -> Dict[str, Any]:
+    """JSON-объект из сжатых байт запроса; {} для пустого или нечитаемого blob."""
+    try:
+        loaded = unpack(codec, data)
+    except (ValueError, RuntimeError, zlib.error):
+        loaded = None
+    return loaded if isinstance(loaded, dict) else {}
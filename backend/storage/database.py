@@ -0,0 +1,278 @@
+"""Асинхронный доступ к SQLite: WAL, один писатель и пул читателей.
+
+Все записи идут через одну долгоживущую connection в отдельном потоке.
+Корутины кладут операции в asyncio.Queue, а задача-писатель забирает всё,
+что успело накопиться (до `write_batch` операций), и применяет одной
+транзакцией — под нагрузкой коммитов столько, сколько пачек, а не записей.
+Каждая операция выполняется в своём SAVEPOINT, так что ошибка одной не
+откатывает соседние. Команды, которым транзакция мешает (VACUUM,
+incremental_vacuum, checkpoint), идут через `exclusive` — в той же очереди,
+но отдельно от пачек. Чтение идёт через небольшой пул connection в своём
+пуле потоков; в режиме WAL читатели не ждут писателя. Event loop на диск
+не блокируется ни при записи, ни при чтении.
+"""
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from backend.config import get_database_config, get_db_path
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Общие для писателя и читателей настройки; synchronous=NORMAL в WAL не теряет
+# целостность, а лишь последние коммиты при отключении питания.
+PRAGMAS: Dict[str, Any] = {
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # КиБ
+    "mmap_size": 128 * 1024 * 1024,
+}
+
+_STOP = object()
+
+
+class Database:
+    """Хранилище поверх одного файла SQLite (см. описание модуля)."""
+
+    def __init__(
+        self,
+        path: str,
+        readers: int = 4,
+        write_batch: int = 100,
+        pragmas: Optional[Dict[str, Any]] = None,
+    ):
+        self.path = path
+        self.readers = max(1, int(readers))
+        self.write_batch = max(1, int(write_batch))
+        self.pragmas = {**PRAGMAS, **(pragmas or {})}
+        self.stats_counters = {"writes": 0, "batches": 0, "max_batch": 0, "reads": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._write_executor: Optional[ThreadPoolExecutor] = None
+        self._read_executor: Optional[ThreadPoolExecutor] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_config(cls) -> "Database":
+        cfg = get_database_config()
+        return cls(
+            get_db_path(),
+            readers=int(cfg.get("readers", 4)),
+            write_batch=int(cfg.get("write_batch", 100)),
+            pragmas=cfg.get("pragmas"),
+        )
+
+    # ---------------- Жизненный цикл ---------------- #
+    @property
+    def started(self) -> bool:
+        return self._writer_task is not None and not self._writer_task.done()
+
+    async def start(self) -> None:
+        """Открывает писателя и пул читателей; повторный вызов ничего не делает."""
+        if self.started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.started:
+                return
+            loop = asyncio.get_running_loop()
+            self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+            self._read_executor = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="sqlite-reader")
+            self._writer = await loop.run_in_executor(self._write_executor, self._open_writer)
+            for _ in range(self.readers):
+                conn = await loop.run_in_executor(self._read_executor, self._open_reader)
+                self._all_readers.append(conn)
+                self._pool.put(conn)
+            self._queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._write_loop())
+            logger.info(f"SQLite {self.path}: WAL, читателей {self.readers}, пачка записи до {self.write_batch}")
+
+    async def close(self) -> None:
+        """Дописывает очередь и закрывает все connection."""
+        if self._writer_task is not None:
+            if not self._writer_task.done():
+                await self._queue.put(_STOP)
+                await self._writer_task
+            self._writer_task = None
+        loop = asyncio.get_running_loop()
+        if self._writer is not None:
+            await loop.run_in_executor(self._write_executor, self._writer.close)
+            self._writer = None
+        while self._all_readers:
+            conn = self._all_readers.pop()
+            conn.close()
+        self._pool = queue.Queue()
+        for executor in (self._write_executor, self._read_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._write_executor = self._read_executor = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _open_writer(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        if str(mode).lower() != "wal":
+            logger.warning(f"SQLite {self.path}: WAL недоступен, режим журнала {mode}")
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        conn = self._connect()
+        conn.execute("PRAGMA query_only = ON")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ---------------- Запись ---------------- #
+    async def write(self, op: Callable[[sqlite3.Connection], T]) -> T:
+        """Выполняет op(conn) в потоке писателя внутри общей транзакции и ждёт коммита."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, future, False))
+        return await future
+
+    async def exclusive(self, op: Callable[[sqlite3.Connection], T]) -> T:
+        """Выполняет op(conn) в потоке писателя вне транзакции, между пачками.
+
+        Для обслуживания (VACUUM, PRAGMA incremental_vacuum, wal_checkpoint):
+        записи, поставленные раньше, уже зафиксированы, поставленные позже
+        ждут окончания op.
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((op, future, True))
+        return await future
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Одна команда записи; возвращает число изменённых строк."""
+        return await self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        rows = list(rows)
+        return await self.write(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    async def _write_loop(self) -> None:
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            batch: List[Tuple[Callable, asyncio.Future]] = []
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif item[2]:
+                    # Всё, что встало в очередь до exclusive-операции, фиксируется раньше неё.
+                    await self._commit_batch(batch)
+                    batch = []
+                    await self._run_exclusive(item[0], item[1])
+                else:
+                    batch.append(item[:2])
+                if stop or len(batch) >= self.write_batch or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: List[Tuple[Callable, asyncio.Future]]) -> None:
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self._write_executor, self._apply, [op for op, _ in batch])
+        except Exception as e:
+            logger.error(f"SQLite: транзакция из {len(batch)} записей не зафиксирована: {e}")
+            results = [(False, e)] * len(batch)
+        for (_, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    async def _run_exclusive(self, op: Callable[[sqlite3.Connection], Any], future: asyncio.Future) -> None:
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._write_executor, self._apply_exclusive, op)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def _apply_exclusive(self, op: Callable[[sqlite3.Connection], T]) -> T:
+        conn = self._writer
+        try:
+            return op(conn)
+        finally:
+            # op не должна оставлять открытую транзакцию следующей пачке.
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+    def _apply(self, ops: List[Callable[[sqlite3.Connection], Any]]) -> List[Tuple[bool, Any]]:
+        """Поток писателя: все операции пачки — одна транзакция, каждая в своём SAVEPOINT."""
+        conn = self._writer
+        results: List[Tuple[bool, Any]] = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for op in ops:
+                conn.execute("SAVEPOINT op")
+                try:
+                    results.append((True, op(conn)))
+                    conn.execute("RELEASE op")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append((False, e))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        counters = self.stats_counters
+        counters["writes"] += len(ops)
+        counters["batches"] += 1
+        counters["max_batch"] = max(counters["max_batch"], len(ops))
+        return results
+
+    # ---------------- Чтение ---------------- #
+    async def read(self, op: Callable[[sqlite3.Connection], T]) -> T:
+        """Выполняет op(conn) на свободной connection из пула читателей."""
+        await self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, self._read, op)
+
+    def _read(self, op: Callable[[sqlite3.Connection], T]) -> T:
+        conn = self._pool.get()
+        try:
+            self.stats_counters["reads"] += 1
+            return op(conn)
+        finally:
+            self._pool.put(conn)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        return await self.read(lambda conn: [dict(row) for row in conn.execute(sql, params).fetchall()])
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        def op(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            row = conn.execute(sql, params).fetchone()
+            return dict(row) if row is not None else None
+
+        return await self.read(op)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.stats_counters, "queued": self._queue.qsize() if self._queue is not None else 0}
@@ -0,0 +1,365 @@
+"""Версионные миграции схемы SQLite.
+
+Номер применённой миграции хранится в PRAGMA user_version. При старте
+по порядку применяются все миграции с большим номером — вместе с повышением
+версии в одной транзакции, поэтому повторный запуск ничего не меняет, а
+упавшая миграция не оставляет схему наполовину обновлённой.
+Миграции пишутся так, чтобы переживать базы, созданные до появления
+runner'а (CREATE ... IF NOT EXISTS, проверка колонок перед ALTER).
+"""
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.storage import blobs
+
+logger = logging.getLogger(__name__)
+
+# Поля анализа, вынесенные из JSON llm_analysis в индексируемые колонки.
+ANALYSIS_COLUMNS = {
+    "token_symbol": "$.token_symbol",
+    "where_to_buy": "$.where_to_buy",
+    "risk": "$.main_risk",
+}
+# ALTER TABLE ... ADD COLUMN ... GENERATED появился в SQLite 3.31.
+GENERATED_COLUMNS = sqlite3.sqlite_version_info >= (3, 31, 0)
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")]
+
+
+def _m001_base_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            category TEXT,
+            source TEXT,
+            description TEXT,
+            discovered_at TIMESTAMP,
+            raw_data TEXT,
+            status TEXT DEFAULT 'new',
+            llm_analysis TEXT,
+            confidence_score REAL,
+            verdict TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id TEXT,
+            event_type TEXT,
+            event_data TEXT,
+            timestamp TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+        """
+    )
+
+
+def _m002_content_hash(conn: sqlite3.Connection) -> None:
+    if "content_hash" not in _columns(conn, "projects"):
+        conn.execute("ALTER TABLE projects ADD COLUMN content_hash TEXT")
+
+
+def _m003_indexes(conn: sqlite3.Connection) -> None:
+    # новые проекты: WHERE status = 'new' ORDER BY discovered_at DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_discovered ON projects (status, discovered_at)")
+    # /projects: ORDER BY discovered_at DESC LIMIT ? — покрывающий, таблица не читается
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_projects_discovered_cover ON projects (
+            discovered_at, id, name, category, source, confidence_score, verdict, status
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_project_time ON events (project_id, timestamp)")
+
+
+def _analysis_expr(path: str) -> str:
+    # Битый JSON в старых строках не должен ломать ни чтение, ни индекс.
+    return f"CASE WHEN json_valid(llm_analysis) THEN json_extract(llm_analysis, '{path}') END"
+
+
+def _m004_analysis_columns(conn: sqlite3.Connection) -> None:
+    existing = _columns(conn, "projects")
+    for column, path in ANALYSIS_COLUMNS.items():
+        if column in existing:
+            continue
+        if GENERATED_COLUMNS:
+            conn.execute(
+                f"ALTER TABLE projects ADD COLUMN {column} TEXT GENERATED ALWAYS AS ({_analysis_expr(path)}) VIRTUAL"
+            )
+        else:
+            # Старый SQLite: обычная колонка, которую поддерживает триггер.
+            conn.execute(f"ALTER TABLE projects ADD COLUMN {column} TEXT")
+            conn.execute(f"UPDATE projects SET {column} = {_analysis_expr(path)}")
+    if not GENERATED_COLUMNS:
+        assignments = ", ".join(f"{column} = {_analysis_expr(path)}" for column, path in ANALYSIS_COLUMNS.items())
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_projects_analysis_columns
+            AFTER UPDATE OF llm_analysis ON projects
+            BEGIN
+                UPDATE projects SET {assignments} WHERE id = NEW.id;
+            END
+            """
+        )
+    for column in ANALYSIS_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_projects_{column} ON projects ({column})")
+
+
+def _m005_events_time(conn: sqlite3.Connection) -> None:
+    # Ретенция: «самые старые сверх max_records» — ORDER BY timestamp.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_events_time ON events (timestamp, id)")
+
+
+def analysis_columns(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Значения индексируемых колонок анализа (как json_extract по ANALYSIS_COLUMNS)."""
+    values = {}
+    for column, path in ANALYSIS_COLUMNS.items():
+        value = analysis.get(path[2:])
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        elif isinstance(value, bool):
+            value = int(value)
+        values[column] = value
+    return values
+
+
+def _as_text(value: Any) -> Any:
+    """Значение так, как его вернёт TEXT-колонка (числа хранятся строкой)."""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return value
+
+
+def check_analysis_columns(conn: sqlite3.Connection, after: int = 0, limit: int = 500) -> List[Tuple[int, str, Any]]:
+    """Сверяет с blob колонки анализа у строк из analysis_dirty (seq > after).
+
+    Только чтение: запускается на читателе, распаковка не держит писателя.
+    Возвращает (seq, id, значения колонок или None, если расхождения нет).
+    """
+    columns = list(ANALYSIS_COLUMNS)
+    selected = ", ".join(f"p.{column}" for column in columns)
+    rows = conn.execute(
+        f"""
+        SELECT d.seq, d.id, p.id IS NOT NULL, {selected}, b.codec, b.data
+        FROM analysis_dirty d
+        LEFT JOIN projects p ON p.id = d.id
+        LEFT JOIN blobs b ON b.hash = p.analysis_ref
+        WHERE d.seq > ?
+        ORDER BY d.seq
+        LIMIT ?
+        """,
+        (after, limit),
+    ).fetchall()
+    checked = []
+    for seq, row_id, exists, *rest in rows:
+        *current, codec, data = rest
+        expected = None
+        if exists:
+            try:
+                analysis = blobs.unpack(codec, data)
+            except (ValueError, RuntimeError, zlib.error):
+                analysis = None  # blob не читается здесь (нет zstandard) — судить не по чему
+            else:
+                values = analysis_columns(analysis if isinstance(analysis, dict) else {})
+                if [_as_text(value) for value in values.values()] != current:
+                    expected = values
+        checked.append((seq, row_id, expected))
+    return checked
+
+
+def fix_analysis_columns(conn: sqlite3.Connection, checked: List[Tuple[int, str, Any]]) -> int:
+    """Применяет результат check_analysis_columns; возвращает число исправленных строк.
+
+    Строку, отмеченную заново после проверки (seq сменился), не трогаем —
+    её проверит следующий проход.
+    """
+    assignments = ", ".join(f"{column} = ?" for column in ANALYSIS_COLUMNS)
+    fixed = 0
+    for seq, row_id, expected in checked:
+        if not conn.execute("DELETE FROM analysis_dirty WHERE seq = ?", (seq,)).rowcount or expected is None:
+            continue
+        conn.execute(f"UPDATE projects SET {assignments} WHERE id = ?", (*expected.values(), row_id))
+        # Собственное исправление строку заново не отмечает.
+        conn.execute("DELETE FROM analysis_dirty WHERE id = ?", (row_id,))
+        fixed += 1
+    return fixed
+
+
+def _loads(text: Optional[str]) -> Any:
+    try:
+        return json.loads(text) if text else None
+    except ValueError:
+        return None
+
+
+def _m006_blobs(conn: sqlite3.Connection) -> None:
+    # JSON уходит в blobs, строки держат ссылки. Колонки анализа становятся
+    # обычными: generated-колонка не может читать blob. Их пишет save_analysis
+    # вместе с analysis_ref; расхождения ловит миграция 7.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        """
+    )
+    fields = "id, name, category, source, description, discovered_at, status, confidence_score, verdict, content_hash"
+    analysis = ", ".join(ANALYSIS_COLUMNS)
+    conn.execute(
+        f"""
+        CREATE TABLE projects_v6 (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            category TEXT,
+            source TEXT,
+            description TEXT,
+            discovered_at TIMESTAMP,
+            status TEXT DEFAULT 'new',
+            confidence_score REAL,
+            verdict TEXT,
+            content_hash TEXT,
+            {", ".join(f"{column} TEXT" for column in ANALYSIS_COLUMNS)},
+            raw_ref TEXT,
+            analysis_ref TEXT
+        )
+        """
+    )
+    placeholders = ", ".join("?" for _ in range(len(fields.split(",")) + len(ANALYSIS_COLUMNS) + 2))
+    for row in conn.execute(f"SELECT {fields}, raw_data, llm_analysis FROM projects").fetchall():
+        *values, raw_data, llm_analysis = row
+        parsed = _loads(llm_analysis)
+        # Колонки считаются из того же JSON, что уходит в blob.
+        values.extend(analysis_columns(parsed if isinstance(parsed, dict) else {}).values())
+        # Пустой raw_data остаётся без ссылки (NULL), а не пустым объектом.
+        values.append(blobs.put(conn, _loads(raw_data)))
+        values.append(blobs.put(conn, parsed))
+        conn.execute(
+            f"INSERT INTO projects_v6 ({fields}, {analysis}, raw_ref, analysis_ref) VALUES ({placeholders})",
+            values,
+        )
+    conn.execute("DROP TABLE projects")
+    conn.execute("ALTER TABLE projects_v6 RENAME TO projects")
+    _m003_indexes(conn)
+    for column in ANALYSIS_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_projects_{column} ON projects ({column})")
+
+    if "data_ref" not in _columns(conn, "events"):
+        conn.execute("ALTER TABLE events ADD COLUMN data_ref TEXT")
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, event_data FROM events WHERE id > ? AND event_data IS NOT NULL ORDER BY id LIMIT 1000",
+            (last_id,),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, event_data in rows:
+            value = _loads(event_data)
+            if value is not None:  # непарсящийся текст остаётся в event_data как есть
+                updates.append((blobs.put(conn, value), row_id))
+        conn.executemany("UPDATE events SET data_ref = ?, event_data = NULL WHERE id = ?", updates)
+        last_id = rows[-1][0]
+
+
+def _m007_analysis_dirty(conn: sqlite3.Connection) -> None:
+    # Колонки анализа с миграции 6 не выводятся из blob самим SQLite.
+    # Триггеры отмечают строки, где менялись ссылка или колонки, и обслуживание
+    # сверяет только их, а не весь projects. Повторная отметка даёт новый seq.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS analysis_dirty (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    watched = ", ".join(["analysis_ref", *ANALYSIS_COLUMNS])
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_projects_analysis_dirty
+        AFTER UPDATE OF {watched} ON projects
+        BEGIN
+            INSERT OR REPLACE INTO analysis_dirty (id) VALUES (NEW.id);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_projects_analysis_dirty_insert
+        AFTER INSERT ON projects WHEN NEW.analysis_ref IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO analysis_dirty (id) VALUES (NEW.id);
+        END
+        """
+    )
+    # Строки, перенесённые миграцией 6, проверяются один раз.
+    conn.execute("INSERT OR IGNORE INTO analysis_dirty (id) SELECT id FROM projects WHERE analysis_ref IS NOT NULL")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "base schema", _m001_base_schema),
+    (2, "projects.content_hash", _m002_content_hash),
+    (3, "status/discovered_at and events indexes", _m003_indexes),
+    (4, "indexed columns from llm_analysis", _m004_analysis_columns),
+    (5, "events.timestamp index for retention", _m005_events_time),
+    (6, "compressed content-addressed blobs for raw_data and analyses", _m006_blobs),
+    (7, "analysis_dirty: rows whose analysis columns need a check", _m007_analysis_dirty),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """Применяет недостающие миграции в текущей транзакции; возвращает их номера.
+
+    Рассчитана на запуск внутри транзакции вызывающего (Database.write) или
+    через migrate_path.
+    """
+    current = schema_version(conn)
+    applied = []
+    for version, name, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Миграция {version}: {name}")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    if applied:
+        conn.execute("ANALYZE")
+    return applied
+
+
+def migrate_path(path: str) -> List[int]:
+    """Синхронно обновляет схему файла базы (для скриптов)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            applied = apply_migrations(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return applied
+    finally:
+        conn.close()
@@ -0,0 +1,228 @@
+"""Ретенция таблицы events: архив по месяцам и incremental VACUUM.
+
+save_analysis дописывает в events полный JSON каждого анализа, поэтому
+таблица растёт без ограничений. Фоновое обслуживание держит горячую базу
+маленькой: у каждого проекта остаются последние `keep_per_project` событий,
+а всего — не больше `max_records` (database.max_records). Остальные
+переносятся в сжатые NDJSON-партиции `events-YYYY-MM.ndjson.gz` (по месяцу
+события) и удаляются из базы, после чего освобождённые страницы
+возвращаются файловой системе через PRAGMA incremental_vacuum (старую базу
+в auto_vacuum=INCREMENTAL переводит разовый полный VACUUM, он блокирует базу
+и включается только явно: database.vacuum_convert). Payload
+событий лежит в blobs (см. blobs.py): в архив пишется распакованный JSON, а
+blobs без ссылок удаляются тем же проходом. Тот же проход сверяет с blob
+колонки анализа у строк projects, отмеченных в analysis_dirty: распаковка
+идёт на читателе, писатель только применяет исправления.
+
+Список лишних событий вычисляется один раз за проход (на читателе), затем
+перенос идёт порциями по `batch` id; каждая порция — одна операция
+писателя Database: строки дописываются в архив (с fsync) и удаляются в той
+же транзакции. Если транзакция не зафиксируется, строки останутся в базе и
+попадут в архив повторно — в архиве возможны дубли (по полю id), но не потери.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from backend.config import get_database_config
+from backend.storage import blobs
+from backend.storage.database import Database
+from backend.storage.migrations import check_analysis_columns, fix_analysis_columns
+
+logger = logging.getLogger(__name__)
+
+_MONTH = re.compile(r"^\d{4}-\d{2}")
+
+# Лишние события: сверх последних ?1 у проекта или сверх последних ?2 во всей таблице.
+_EXPIRED_IDS_SQL = """
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY project_id ORDER BY timestamp DESC, id DESC
+        ) AS rn
+        FROM events
+    )
+    WHERE rn > ?1
+    UNION
+    SELECT id FROM (
+        SELECT id FROM events ORDER BY timestamp DESC, id DESC LIMIT -1 OFFSET ?2
+    )
+    ORDER BY id
+"""
+_ROWS_SQL = """
+    SELECT e.id, e.project_id, e.event_type, e.event_data, e.timestamp, b.codec, b.data
+    FROM events e
+    LEFT JOIN blobs b ON b.hash = e.data_ref
+    WHERE e.id IN ({})
+    ORDER BY e.id
+"""
+
+
+def _json_line(row: sqlite3.Row) -> str:
+    row_id, project_id, event_type, event_data, timestamp, codec, blob = row
+    if blob is not None:
+        data = blobs.unpack(codec, blob)
+    else:
+        try:
+            data = json.loads(event_data) if event_data else None
+        except ValueError:
+            data = event_data
+    record = {"id": row_id, "project_id": project_id, "event_type": event_type, "timestamp": timestamp, "event_data": data}
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _partition(timestamp: Any) -> str:
+    match = _MONTH.match(str(timestamp or ""))
+    return match.group(0) if match else "unknown"
+
+
+class EventRetention:
+    """Фоновое обслуживание events поверх Database (см. описание модуля)."""
+
+    def __init__(
+        self,
+        db: Database,
+        archive_dir: str = "data/archive",
+        keep_per_project: int = 20,
+        max_records: int = 10000,
+        batch: int = 2000,
+        interval: float = 3600,
+        vacuum_convert: bool = False,
+    ):
+        self.db = db
+        self.archive_dir = archive_dir
+        self.keep_per_project = max(1, int(keep_per_project))
+        self.max_records = max(1, int(max_records))
+        self.batch = max(1, int(batch))
+        self.interval = max(60.0, float(interval))
+        # Разрешён ли полный VACUUM для перевода базы в auto_vacuum=INCREMENTAL.
+        self.vacuum_convert = bool(vacuum_convert)
+        self.totals = {"runs": 0, "archived": 0, "blobs_removed": 0, "freed_pages": 0, "columns_fixed": 0}
+        self._vacuum_ready = False
+
+    @classmethod
+    def from_config(cls, db: Database) -> Optional["EventRetention"]:
+        """Обслуживание из секции database; None, если maintenance_interval = 0."""
+        cfg = get_database_config()
+        interval = float(cfg.get("maintenance_interval", 3600))
+        if interval <= 0:
+            return None
+        return cls(
+            db,
+            archive_dir=cfg.get("archive_dir", "data/archive"),
+            keep_per_project=int(cfg.get("events_per_project", 20)),
+            max_records=int(cfg.get("max_records", 10000)),
+            batch=int(cfg.get("archive_batch", 2000)),
+            interval=interval,
+            vacuum_convert=bool(cfg.get("vacuum_convert", False)),
+        )
+
+    # ---------------- Операции писателя ---------------- #
+    def _enable_incremental_vacuum(self, conn: sqlite3.Connection) -> bool:
+        """auto_vacuum=INCREMENTAL; для существующей базы требует разового VACUUM (vacuum_convert)."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        if not self.vacuum_convert:
+            size = os.path.getsize(self.db.path) if os.path.exists(self.db.path) else 0
+            logger.warning(
+                f"SQLite {self.db.path} ({size / 1024 ** 2:.1f} MB) без auto_vacuum=INCREMENTAL: "
+                f"место от удалённых событий не возвращается. Перевод — полный VACUUM с блокировкой "
+                f"базы, включите database.vacuum_convert на окно обслуживания"
+            )
+            return False
+        logger.info(f"SQLite {self.db.path}: перевод в auto_vacuum=INCREMENTAL (полный VACUUM)")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+
+    def _archive_rows(self, rows: List[sqlite3.Row]) -> None:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        by_month: Dict[str, List[str]] = {}
+        for row in rows:
+            by_month.setdefault(_partition(row[4]), []).append(_json_line(row))
+        for month, lines in by_month.items():
+            path = os.path.join(self.archive_dir, f"events-{month}.ndjson.gz")
+            # Каждая дозапись — отдельный gzip member; gzip/zcat читают их подряд.
+            with open(path, "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+                    gz.write("".join(lines).encode("utf-8"))
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def _expired_ids(self, conn: sqlite3.Connection) -> List[int]:
+        return [row[0] for row in conn.execute(_EXPIRED_IDS_SQL, (self.keep_per_project, self.max_records))]
+
+    def _archive_chunk(self, conn: sqlite3.Connection, ids: List[int]) -> int:
+        # Строки могли удалить между чтением списка и этой транзакцией — берём оставшиеся.
+        rows = conn.execute(_ROWS_SQL.format(",".join("?" * len(ids))), ids).fetchall()
+        if not rows:
+            return 0
+        self._archive_rows(rows)
+        conn.executemany("DELETE FROM events WHERE id = ?", [(row[0],) for row in rows])
+        return len(rows)
+
+    @staticmethod
+    def _collect_blobs(conn: sqlite3.Connection) -> int:
+        return conn.execute(blobs.GC_SQL).rowcount
+
+    @staticmethod
+    def _vacuum(conn: sqlite3.Connection) -> int:
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # execute() делает один шаг (одну страницу); executescript — до конца.
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    async def _sync_analysis_columns(self) -> int:
+        """Сверка колонок анализа порциями по `batch` отмеченных строк."""
+        fixed, after = 0, 0
+        while True:
+            checked = await self.db.read(lambda conn: check_analysis_columns(conn, after, self.batch))
+            if not checked:
+                break
+            fixed += await self.db.write(lambda conn: fix_analysis_columns(conn, checked))
+            after = checked[-1][0]
+        return fixed
+
+    # ---------------- Запуск ---------------- #
+    async def run_once(self) -> Dict[str, int]:
+        """Один проход: архив лишних событий, сверка колонок анализа, сборка blobs, затем incremental VACUUM."""
+        if not self._vacuum_ready:
+            await self.db.exclusive(self._enable_incremental_vacuum)
+            self._vacuum_ready = True
+        archived = 0
+        # Новые события только добавляются, поэтому выбранные id остаются лишними до конца прохода.
+        expired = await self.db.read(self._expired_ids)
+        for start in range(0, len(expired), self.batch):
+            chunk = expired[start:start + self.batch]
+            archived += await self.db.write(lambda conn: self._archive_chunk(conn, chunk))
+        fixed = await self._sync_analysis_columns()
+        if fixed:
+            logger.warning(f"Колонки анализа расходились с analysis_ref у {fixed} проектов, исправлено")
+        removed = await self.db.write(self._collect_blobs)
+        freed = await self.db.exclusive(self._vacuum)
+        result = {"archived": archived, "blobs_removed": removed, "freed_pages": freed, "columns_fixed": fixed}
+        self.totals["runs"] += 1
+        for key, value in result.items():
+            self.totals[key] += value
+        if archived or removed or freed:
+            logger.info(
+                f"Ретенция events: в архив {archived}, удалено blobs {removed}, освобождено страниц {freed}"
+            )
+        return result
+
+    async def run_forever(self) -> None:
+        """Обслуживание каждые `interval` секунд до отмены задачи."""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ретенция events не выполнена: {e}")
+            await asyncio.sleep(self.interval)
+
@@ -1,14 +1,13 @@
 import asyncio
 import json
 import logging
-import sqlite3
 from typing import List, Dict, Any
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.config import get_db_path
 from backend.service.main_service import CryptoAlphaService
+from backend.storage.blobs import load_object
 
 app = FastAPI(title="Crypto Alpha Scout")
 
@@ -26,12 +25,6 @@ if not logger.handlers:
     logging.basicConfig(level=logging.INFO)
 
 
-def _db_connection():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 @app.get("/health")
 async def health():
     logger.info("Health check requested")
@@ -40,9 +33,7 @@ async def health():
 
 @app.get("/projects")
 async def list_projects(limit: int = 100) -> List[Dict[str, Any]]:
-    conn = _db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
+    return await service.db.fetchall(
         """
         SELECT id, name, category, source, discovered_at, confidence_score, verdict, status
         FROM projects
@@ -51,35 +42,63 @@ async def list_projects(limit: int = 100) -> List[Dict[str, Any]]:
         """,
         (limit,),
     )
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
 
 
 @app.get("/projects/{project_id}")
-async def get_project(project_id: str) -> Dict[str, Any]:
-    conn = _db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT * FROM projects WHERE id = ?
+async def get_project(project_id: str, raw: bool = False) -> Dict[str, Any]:
+    # raw_data (исходный ответ источника) большой и нужен редко — только по ?raw=true.
+    raw_columns = "r.codec AS raw_codec, r.data AS raw_blob" if raw else "NULL AS raw_codec, NULL AS raw_blob"
+    raw_join = "LEFT JOIN blobs r ON r.hash = p.raw_ref" if raw else ""
+    data = await service.db.fetchone(
+        f"""
+        SELECT p.*, a.codec AS analysis_codec, a.data AS analysis_blob, {raw_columns}
+        FROM projects p
+        LEFT JOIN blobs a ON a.hash = p.analysis_ref
+        {raw_join}
+        WHERE p.id = ?
         """,
         (project_id,),
     )
-    row = cursor.fetchone()
-    conn.close()
-    if not row:
+    if not data:
         return {"error": "not_found"}
-    data = dict(row)
-    try:
-        data["llm_analysis"] = json.loads(data.get("llm_analysis") or "{}")
-    except Exception:
-        data["llm_analysis"] = {}
+    # Ссылки на blobs — внутреннее устройство хранения, наружу не отдаются.
+    data.pop("analysis_ref")
+    has_raw = data.pop("raw_ref") is not None
+    data["llm_analysis"] = load_object(data.pop("analysis_codec"), data.pop("analysis_blob"))
+    raw_codec, raw_blob = data.pop("raw_codec"), data.pop("raw_blob")
+    if raw:
+        # Как и до blobs: raw_data — JSON-текст или null.
+        data["raw_data"] = json.dumps(load_object(raw_codec, raw_blob)) if has_raw else None
     return data
 
 
+@app.get("/models")
+async def model_status() -> Dict[str, Any]:
+    return service.analyzer.model_status()
+
+
+@app.get("/models/local")
+async def local_model_status() -> Dict[str, Any]:
+    if service.local_analyzer is None:
+        return {"enabled": False}
+    return {"enabled": True, **service.local_analyzer.state()}
+
+
 @app.post("/scan")
 async def trigger_scan():
     logger.info("Manual scan requested")
     asyncio.create_task(service.scan_and_analyze())
     return {"status": "scheduled"}
+
+
+@app.on_event("startup")
+async def startup():
+    # Миграции — до первого запроса: get_project читает колонки новой схемы.
+    await service._db()
+    # Прогрев локальных моделей занимает минуты — не задерживаем старт API.
+    asyncio.create_task(service.start())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await service.close()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Онлайн-бэкап базы по настройкам database.* и проверка копий.
+
+Использование:
+    python scripts/backup_database.py                 # снять копию сейчас
+    python scripts/backup_database.py --verify        # проверить все копии
+    python scripts/backup_database.py --verify backups/crypto_projects_20260101_000000.db.gz
+
+Копию можно снимать при работающем сервисе: запись не останавливается.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.config import get_database_config, get_db_path
+from backend.storage.backup import BackupService, verify_backup
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", nargs="*", metavar="PATH", help="проверить копии (по умолчанию все в backup_dir)")
+    args = parser.parse_args()
+
+    cfg = get_database_config()
+    service = BackupService(
+        get_db_path(),
+        backup_dir=cfg.get("backup_dir", "backups"),
+        keep=int(cfg.get("backup_keep", 7)),
+        pages=int(cfg.get("backup_pages", 256)),
+        pause=float(cfg.get("backup_pause", 0.005)),
+        compress=bool(cfg.get("backup_compress", True)),
+    )
+    if args.verify is not None:
+        paths = args.verify or service.backups()
+        if not paths:
+            print(f"Копий в {service.backup_dir} нет")
+            return 1
+        failed = 0
+        for path in paths:
+            result = verify_backup(path)
+            failed += result != "ok"
+            print(f"{path}: {result}")
+        return 1 if failed else 0
+
+    try:
+        info = service.create()
+    except FileNotFoundError:
+        print(f"База не найдена по пути {service.db_path}")
+        return 1
+    print(f"Backup создан: {info['path']} ({info['size'] // 1024} КиБ, {info['seconds']}s)")
+    for path in info["removed"]:
+        print(f"Удалена старая копия: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Бенчмарк разбора /protocols: исходный код сканера против новых путей.
+
+Режимы:
+    baseline — код scan_defi_llama до оптимизаций: весь ответ в json.loads и
+               проверки в цикле по каждому протоколу (копия ниже);
+    full     — json.loads + векторный фильтр ProtocolFilter;
+    stream   — потоковый разбор с фильтрацией каждого элемента.
+
+Использование:
+    python scripts/bench_defillama_stream.py --record data/protocols.json
+    python scripts/bench_defillama_stream.py data/protocols.json
+
+Каждый режим запускается в отдельном процессе, чтобы peak RSS не смешивался.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.config import get_scanner_config
+from backend.scanner.json_stream import iter_json_array
+from backend.scanner.protocol_filter import ProtocolFilter, select_smallest, to_project
+
+DEFILLAMA_URL = "https://api.llama.fi/protocols"
+CHUNK_SIZE = 64 * 1024
+FILTER = ProtocolFilter(get_scanner_config().get("filters"))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss в килобайтах на Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Исходный отбор scan_defi_llama (до потокового разбора и ProtocolFilter), без изменений.
+_BASELINE_EXCLUDE = {
+    "bridge", "stablecoin", "cex", "services", "ponzi", "reserve currency",
+    "algo-stables", "farm", "indexes", "derivatives", "synthetics",
+}
+_BASELINE_ALLOWED = {"defi", "dex", "lending", "yield", "infrastructure", "nft", "gaming"}
+
+
+def _baseline_select(data: list) -> list:
+    projects = []
+    for protocol in data:
+        try:
+            name = (protocol.get("name") or "").strip()
+            if not name or len(name) < 2:
+                continue
+            tvl = float(protocol.get("tvl", 0) or 0)
+            category = (protocol.get("category") or "").lower()
+            slug = protocol.get("slug", "")
+            tvl_valid = 50_000 < tvl < 1_000_000
+            growth_valid = float(protocol.get("change_7d", 0) or 0) > 0
+            category_valid = category in _BASELINE_ALLOWED
+            has_links = protocol.get("url") and protocol.get("url").strip()
+            if not (tvl_valid and category_valid and has_links and growth_valid):
+                continue
+            links = {}
+            for key in ["url", "twitter", "github", "telegram", "discord"]:
+                val = protocol.get(key)
+                if val:
+                    links[key] = val
+            projects.append(
+                {
+                    "id": f"defillama_{slug}",
+                    "name": name,
+                    "description": protocol.get("description", f"{category.capitalize()} protocol"),
+                    "category": category.capitalize(),
+                    "source": "defillama",
+                    "url": protocol.get("url", ""),
+                    "token_symbol": protocol.get("tokenSymbol") or protocol.get("symbol"),
+                    "links": links,
+                    "metrics": {
+                        "tvl": tvl,
+                        "tvl_change_7d": float(protocol.get("change_7d", 0) or 0),
+                        "chain": protocol.get("chain", "Multi-Chain"),
+                        "audits": len(protocol.get("audit_links", []) or []),
+                        "is_audited": len(protocol.get("audit_links", []) or []) > 0,
+                    },
+                    "raw_data": protocol,
+                }
+            )
+        except Exception:
+            continue
+    projects.sort(key=lambda x: x["metrics"]["tvl"])
+    return projects[:15]
+
+
+def run_baseline(path: str) -> dict:
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    result = _baseline_select(data)
+    # Исходный код отдавал проекты только после полного цикла.
+    total = time.perf_counter() - start
+    return {"total_s": total, "first_s": total if result else None, "selected": len(result)}
+
+
+def run_full(path: str) -> dict:
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    projects = [to_project(protocol) for protocol in FILTER.select(data)]
+    first = time.perf_counter() - start if projects else None
+    result = select_smallest(projects, FILTER.max_candidates)
+    return {"total_s": time.perf_counter() - start, "first_s": first, "selected": len(result)}
+
+
+async def _file_chunks(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def _run_stream(path: str) -> dict:
+    start = time.perf_counter()
+    first = None
+    projects = []
+    async for protocol in iter_json_array(_file_chunks(path)):
+        if FILTER.matches(protocol):
+            projects.append(to_project(protocol, keep_raw=False))
+            if first is None:
+                first = time.perf_counter() - start
+    result = select_smallest(projects, FILTER.max_candidates)
+    return {"total_s": time.perf_counter() - start, "first_s": first, "selected": len(result)}
+
+
+def run_stream(path: str) -> dict:
+    return asyncio.run(_run_stream(path))
+
+
+def _child(mode: str, path: str) -> None:
+    baseline = _peak_rss_mb()
+    stats = {"baseline": run_baseline, "full": run_full, "stream": run_stream}[mode](path)
+    stats["peak_rss_mb"] = _peak_rss_mb()
+    stats["baseline_rss_mb"] = baseline
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payload", nargs="?", default="data/protocols.json", help="записанный ответ /protocols")
+    parser.add_argument("--record", action="store_true", help="скачать свежий ответ в payload")
+    parser.add_argument("--mode", choices=["baseline", "full", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        _child(args.mode, args.payload)
+        return
+
+    if args.record:
+        with urllib.request.urlopen(DEFILLAMA_URL, timeout=60) as resp, open(args.payload, "wb") as f:
+            f.write(resp.read())
+        print(f"Записан ответ в {args.payload}")
+
+    size_mb = Path(args.payload).stat().st_size / 1024 / 1024
+    print(f"Payload: {args.payload} ({size_mb:.1f} MB)")
+    print(f"{'mode':<10}{'total, s':>10}{'first, s':>10}{'peak RSS, MB':>14}{'selected':>10}{'vs base':>11}")
+    reference = None
+    for mode in ("baseline", "full", "stream"):
+        out = subprocess.run(
+            [sys.executable, __file__, args.payload, "--mode", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        stats = json.loads(out.stdout.strip().splitlines()[-1])
+        first = f"{stats['first_s']:.3f}" if stats["first_s"] is not None else "-"
+        reference = reference or stats
+        speedup = reference["total_s"] / stats["total_s"] if stats["total_s"] else 0.0
+        print(
+            f"{mode:<10}{stats['total_s']:>10.3f}{first:>10}{stats['peak_rss_mb']:>14.1f}"
+            f"{stats['selected']:>10}{speedup:>10.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
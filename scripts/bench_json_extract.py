@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Бенчмарк и проверка точности извлечения JSON из ответов LLM.
+
+Использование:
+    python scripts/bench_json_extract.py
+    python scripts/bench_json_extract.py --corpus data/llm_responses.jsonl --repeat 200
+
+Корпус — типичные поломки ответов моделей (текст вокруг JSON, ```-блоки,
+висячие запятые, одинарные кавычки, обрыв по max_tokens, "rating": "X.X/10"
+вместо score). Для каждого ответа сравниваются старый разбор
+(жадная регулярка + замена висячих запятых) и extract_json: доля ответов,
+из которых получена верная оценка, и время разбора. Свой корпус — JSONL со
+строками {"text": "...", "score": 7.5}; score=null означает, что оценки в
+ответе нет и парсер должен вернуть заглушку.
+
+Код возврата 1, если extract_json ошибся хотя бы на одном ответе.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from backend.analyzer.json_extract import extract_json, score_from
+
+_FULL = json.dumps(
+    {
+        "research_summary": "Протокол кредитования с растущим TVL.",
+        "strengths": ["аудит", "команда"],
+        "weaknesses": ["конкуренция"],
+        "rating": "7.5/10",
+        "rating_breakdown": {"fundamentals": "2.5/3", "team_tech": "2/3", "market_fit": "1.5/2", "risk_level": "1.5/2"},
+        "verdict": "BUY",
+        "key_risks": ["смарт-контракты"],
+        "token_symbol": "XYZ",
+        "contract_address": "unknown",
+    },
+    ensure_ascii=False,
+    indent=2,
+)
+
+# (ответ модели, ожидаемая оценка или None)
+CORPUS: List[tuple] = [
+    (_FULL, 7.5),
+    ("```json\n" + _FULL + "\n```", 7.5),
+    ("Вот анализ проекта:\n" + _FULL + "\nНадеюсь, это поможет!", 7.5),
+    ('{"score": 8, "verdict": "BUY"}', 8.0),
+    ('{"score": "6.5", "verdict": "HOLD"}', 6.5),
+    ('{"rating": "8/10", "verdict": "BUY",}', 8.0),
+    ('{"rating": "7,5 / 10", "verdict": "BUY"}', 7.5),
+    ('{"rating": "75/100", "verdict": "BUY"}', 7.5),
+    ('{"rating": 6.0, "strengths": ["a", "b",], "verdict": "HOLD"}', 6.0),
+    ("{'rating': '5.5/10', 'verdict': 'HOLD', 'has_token': True}", 5.5),
+    ('{rating: "7/10", verdict: BUY}', 7.0),
+    ('{"rating": "6/10" "verdict": "HOLD"}', 6.0),
+    ('{"research_summary": "Команда называет себя "лидером" рынка", "rating": "4/10"}', 4.0),
+    ('{"research_summary": "Первая строка\nвторая строка", "rating": "6.5/10"}', 6.5),
+    ('{"rating": "7/10", // оценка\n "verdict": "BUY"}', 7.0),
+    ("{“rating”: “8.5/10”, “verdict”: “STRONG_BUY”}", 8.5),
+    ('{"rating": "7/10", "strengths": ["аудит", "команда"}', 7.0),
+    ('{"rating": "6/10", "verdict": "HOLD", "research_summary": "Ответ оборвался на полусло', 6.0),
+    ('{"rating": "9/10", "verdict": "STRONG_BUY", "investment_plan": {"entry_strategy": "ча', 9.0),
+    ('{"rating": "5/10", "verdict": "HOLD", "key_risks": ["регуляторы", "лик', 5.0),
+    ('Для {name} шаблон не заполнен, итог: {"rating": "3/10", "verdict": "SELL"}', 3.0),
+    ('[{"rating": "6/10", "verdict": "HOLD"}]', 6.0),
+    ('{"overall_score": 7, "verdict": "BUY"}', 7.0),
+    ('{"score": "unknown", "rating": "6.5/10"}', 6.5),
+    ('{"verdict": "HOLD", "research_summary": "нет данных"}', None),
+    ("Не могу оценить проект без данных.", None),
+    ("", None),
+]
+
+
+def _legacy_parse(text: str) -> Optional[Dict[str, Any]]:
+    """Прежний OpenRouterAnalyzer._parse_json без нормализации."""
+    try:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if not match:
+            return None
+        json_str = re.sub(r",(\s*[}\]])", r"\1", match.group())
+        try:
+            return json.loads(json_str)
+        except Exception:
+            end_idx = json_str.rfind("}")
+            if end_idx == -1:
+                return None
+            return json.loads(json_str[: end_idx + 1])
+    except Exception:
+        return None
+
+
+def legacy_score(text: str) -> Optional[float]:
+    data = _legacy_parse(text)
+    if not isinstance(data, dict) or "score" not in data:
+        return None
+    try:
+        return float(data["score"])
+    except (TypeError, ValueError):
+        return None
+
+
+def new_score(text: str) -> Optional[float]:
+    extraction = extract_json(text)
+    if not extraction.ok:
+        return None
+    return score_from(extraction.data)[0]
+
+
+def load_corpus(path: Optional[str]) -> List[tuple]:
+    if not path:
+        return CORPUS
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                corpus.append((item["text"], item.get("score")))
+    return corpus
+
+
+def _matches(got: Optional[float], expected: Optional[float]) -> bool:
+    if expected is None:
+        return got is None
+    return got is not None and abs(got - expected) < 0.05
+
+
+def bench(fn, corpus: List[tuple], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, _ in corpus:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="JSONL с полями text и score")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("-v", "--verbose", action="store_true", help="показать починки для каждого ответа")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    failures = []
+    legacy_ok = new_ok = 0
+    repairs: Dict[str, int] = {}
+    for text, expected in corpus:
+        legacy_ok += _matches(legacy_score(text), expected)
+        got = new_score(text)
+        extraction = extract_json(text)
+        for repair in extraction.repairs:
+            repairs[repair] = repairs.get(repair, 0) + 1
+        if _matches(got, expected):
+            new_ok += 1
+        else:
+            failures.append((text, expected, got, extraction))
+        if args.verbose:
+            print(f"{str(got):>6} {extraction.repairs} {text[:60]!r}")
+
+    total = len(corpus)
+    print(f"Ответов в корпусе: {total}")
+    print(f"{'парсер':<14}{'верно':>8}{'доля':>8}{'мкс/ответ':>12}")
+    print(f"{'legacy':<14}{legacy_ok:>8}{legacy_ok / total:>8.0%}{bench(legacy_score, corpus, args.repeat):>12.1f}")
+    print(f"{'extract_json':<14}{new_ok:>8}{new_ok / total:>8.0%}{bench(new_score, corpus, args.repeat):>12.1f}")
+    if repairs:
+        print("Починки: " + ", ".join(f"{k}={v}" for k, v in sorted(repairs.items(), key=lambda kv: -kv[1])))
+    for text, expected, got, extraction in failures:
+        print(f"ОШИБКА: ожидалось {expected}, получено {got} ({extraction!r}): {text[:80]!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,50 +1,20 @@
 #!/usr/bin/env python3
-import os
 import sqlite3
-from backend.config import get_db_path
-
 
-def ensure_dir(path: str):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+from backend.config import get_db_path
+from backend.storage.migrations import migrate_path, schema_version
 
 
 def main():
     db_path = get_db_path()
-    ensure_dir(db_path)
+    applied = migrate_path(db_path)
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS projects (
-            id TEXT PRIMARY KEY,
-            name TEXT,
-            category TEXT,
-            source TEXT,
-            description TEXT,
-            discovered_at TIMESTAMP,
-            raw_data TEXT,
-            status TEXT DEFAULT 'new',
-            llm_analysis TEXT,
-            confidence_score REAL,
-            verdict TEXT
-        )
-        """
-    )
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_id TEXT,
-            event_type TEXT,
-            event_data TEXT,
-            timestamp TIMESTAMP,
-            FOREIGN KEY (project_id) REFERENCES projects (id)
-        )
-        """
-    )
-    conn.commit()
+    version = schema_version(conn)
     conn.close()
-    print(f"База инициализирована по пути {db_path}")
+    if applied:
+        print(f"База инициализирована по пути {db_path}: миграции {', '.join(map(str, applied))}, версия {version}")
+    else:
+        print(f"База {db_path} уже на версии {version}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import asyncio
+
+from backend.storage import blobs
+from backend.storage.database import Database
+from backend.storage.migrations import analysis_columns, migrate_path
+from backend.storage.retention import EventRetention
+
+ANALYSIS = {"score": 8, "token_symbol": "AAA", "where_to_buy": ["Uniswap"], "main_risk": "rug"}
+
+
+def _save(conn, project_id, analysis):
+    """Как save_analysis: ссылка и колонки одним UPDATE."""
+    columns = analysis_columns(analysis)
+    conn.execute(
+        "UPDATE projects SET analysis_ref = ?, token_symbol = ?, where_to_buy = ?, risk = ? WHERE id = ?",
+        (blobs.put(conn, analysis), *columns.values(), project_id),
+    )
+
+
+def _run(path, ops):
+    async def main():
+        db = Database(path)
+        retention = EventRetention(db, batch=2)
+        try:
+            for op in ops:
+                await db.write(op)
+            fixed = await retention._sync_analysis_columns()
+            rows = await db.fetchall("SELECT id, token_symbol, where_to_buy, risk FROM projects ORDER BY id")
+            dirty = await db.fetchall("SELECT id FROM analysis_dirty")
+            return fixed, rows, dirty
+        finally:
+            await db.close()
+
+    return asyncio.run(main())
+
+
+def test_only_marked_rows_are_checked_and_drift_is_repaired(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    migrate_path(path)
+
+    def seed(conn):
+        for pid in ("a", "b", "c"):
+            conn.execute("INSERT INTO projects (id, name) VALUES (?, ?)", (pid, pid))
+            _save(conn, pid, ANALYSIS)
+
+    fixed, _, dirty = _run(path, [seed])
+    assert fixed == 0
+    assert dirty == []
+
+    def drift(conn):
+        conn.execute("UPDATE projects SET token_symbol = 'DRIFT', risk = NULL WHERE id = 'b'")
+
+    fixed, rows, dirty = _run(path, [drift])
+    assert fixed == 1
+    assert dirty == []
+    assert rows[1] == {"id": "b", "token_symbol": "AAA", "where_to_buy": '["Uniswap"]', "risk": "rug"}
+
+
+def test_untouched_rows_are_not_rechecked(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    migrate_path(path)
+
+    def seed(conn):
+        conn.execute("INSERT INTO projects (id, name) VALUES ('a', 'a')")
+        _save(conn, "a", ANALYSIS)
+
+    _run(path, [seed])
+
+    def unrelated(conn):
+        conn.execute("UPDATE projects SET status = 'analyzed', verdict = 'BUY' WHERE id = 'a'")
+        assert conn.execute("SELECT count(*) FROM analysis_dirty").fetchone()[0] == 0
+
+    fixed, _, _ = _run(path, [unrelated])
+    assert fixed == 0
+
+
+def test_deleted_project_leaves_no_mark(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    migrate_path(path)
+
+    def seed(conn):
+        conn.execute("INSERT INTO projects (id, name) VALUES ('a', 'a')")
+        _save(conn, "a", ANALYSIS)
+        conn.execute("DELETE FROM projects WHERE id = 'a'")
+
+    fixed, rows, dirty = _run(path, [seed])
+    assert (fixed, rows, dirty) == (0, [], [])
+
+
+def test_load_object():
+    packed = blobs.pack({"a": 1})
+    assert blobs.load_object(packed.codec, packed.data) == {"a": 1}
+    assert blobs.load_object(None, None) == {}
+    assert blobs.load_object("zlib", b"garbage") == {}
@@ -0,0 +1,108 @@
+import pytest
+
+from backend.analyzer.fork_index import ForkIndex, inherit_analysis
+
+DESCRIPTION = (
+    "{name} is a decentralized exchange with concentrated liquidity pools, "
+    "limit orders and a vote-escrowed governance token that directs emissions "
+    "to the most useful pairs on {chain}"
+)
+ANALYSIS = {
+    "score": 8.5,
+    "verdict": "STRONG_BUY",
+    "summary": "solid DEX",
+    "main_risk": "smart contract",
+    "token_symbol": "ORIG",
+    "contract_address": "0xabc",
+    "where_to_buy": "Uniswap",
+    "has_token": True,
+    "exchanges": ["Uniswap"],
+    "buy_links": ["https://app.uniswap.org"],
+    "strategy": {"entry": 1},
+}
+
+
+def _project(project_id, name, chain="Ethereum", tvl=5_000_000, description=DESCRIPTION):
+    return {
+        "id": project_id,
+        "name": name,
+        "description": description.format(name=name, chain=chain),
+        "metrics": {"tvl": tvl},
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = ForkIndex(str(tmp_path / "fork_index.db"))
+    idx.add(_project("orig", "Velodrome"), ANALYSIS)
+    yield idx
+    idx.close()
+
+
+def test_renamed_fork_on_another_chain_matches(index):
+    match = index.match(_project("fork", "Aerodrome", chain="Base"))
+    assert match is not None
+    assert match["id"] == "orig"
+    assert match["similarity"] >= index.threshold
+    assert "strategy" not in match["analysis"]
+
+
+def test_unrelated_project_does_not_match(index):
+    other = _project(
+        "nft",
+        "PixelCats",
+        description="{name} is a collection of ten thousand hand drawn cats living on {chain} with staking for a play to earn game",
+    )
+    assert index.match(other) is None
+
+
+def test_project_does_not_match_itself(index):
+    assert index.match(_project("orig", "Velodrome")) is None
+
+
+def test_stale_analysis_is_skipped(index):
+    with index._conn:
+        index._conn.execute("UPDATE fork_index SET analyzed_at = analyzed_at - ?", (index.max_age + 60,))
+    assert index.match(_project("fork", "Aerodrome", chain="Base")) is None
+
+
+def test_short_description_is_not_indexed(index):
+    assert index.add(_project("tiny", "Tiny", description="{name} on {chain}"), ANALYSIS) is False
+
+
+@pytest.mark.parametrize("flag", ["is_fallback", "fork_of", "is_prescreen"])
+def test_derived_analyses_are_not_indexed(index, flag):
+    assert index.add(_project("other", "Other"), {**ANALYSIS, flag: True}) is False
+    assert len(index) == 1
+
+
+def test_index_survives_reopen(tmp_path):
+    path = str(tmp_path / "fork_index.db")
+    ForkIndex(path).add(_project("orig", "Velodrome"), ANALYSIS)
+    reopened = ForkIndex(path)
+    try:
+        assert reopened.match(_project("fork", "Aerodrome", chain="Base"))["id"] == "orig"
+    finally:
+        reopened.close()
+
+
+def test_inherited_analysis_resets_own_fields(index):
+    fork = _project("fork", "Aerodrome", chain="Base")
+    fork["token_symbol"] = "AERO"
+    result = inherit_analysis(fork, index.match(fork))
+    assert result["score"] == 8.5
+    assert result["verdict"] == "STRONG_BUY"
+    assert result["token_symbol"] == "AERO"
+    assert result["contract_address"] == "unknown"
+    assert result["where_to_buy"] == "unknown"
+    assert result["has_token"] is False
+    assert result["exchanges"] == [] and result["buy_links"] == []
+    assert result["fork_of"]["id"] == "orig"
+    assert result["backend"] == "fork_index"
+
+
+def test_inherited_analysis_is_capped_by_fork_tvl(index):
+    fork = _project("fork", "Aerodrome", chain="Base", tvl=20_000)
+    result = inherit_analysis(fork, index.match(fork))
+    assert result["score"] == 5.0
+    assert result["verdict"] == "HOLD"
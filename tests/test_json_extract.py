@@ -0,0 +1,118 @@
+import pytest
+
+from backend.analyzer.json_extract import (
+    TRAILING_COMMA,
+    TRUNCATED,
+    extract_json,
+    score_from,
+)
+from backend.analyzer.result_parser import safe_load_json
+from scripts.bench_json_extract import CORPUS
+
+
+def _score(text):
+    extraction = extract_json(text)
+    if not extraction.ok:
+        return None
+    return score_from(extraction.data)[0]
+
+
+@pytest.mark.parametrize("text, expected", CORPUS, ids=[f"corpus{i}" for i in range(len(CORPUS))])
+def test_corpus_score(text, expected):
+    got = _score(text)
+    if expected is None:
+        assert got is None
+    else:
+        assert got == pytest.approx(expected, abs=0.05)
+
+
+def test_clean_answer_needs_no_repairs():
+    extraction = extract_json('Ответ: {"score": 8, "verdict": "BUY"} — готово')
+    assert extraction.ok
+    assert extraction.data == {"score": 8, "verdict": "BUY"}
+    assert extraction.repairs == []
+
+
+@pytest.mark.parametrize(
+    "text, repair",
+    [
+        ('{"rating": "8/10", "verdict": "BUY",}', TRAILING_COMMA),
+        ('{"rating": "6/10", "verdict": "HOLD", "research_summary": "обрыв', TRUNCATED),
+    ],
+)
+def test_repairs_are_reported(text, repair):
+    extraction = extract_json(text)
+    assert extraction.ok
+    assert repair in extraction.repairs
+
+
+def test_fenced_answer():
+    extraction = extract_json('```json\n{"score": 7}\n```')
+    assert extraction.data == {"score": 7}
+
+
+def test_expect_list():
+    assert extract_json('[{"id": "a"}, {"id": "b"}]', expect=list).data == [{"id": "a"}, {"id": "b"}]
+    assert extract_json('text {"id": "a"}', expect=list).ok is False
+
+
+@pytest.mark.parametrize("text", [None, "", "   \n"])
+def test_empty_response(text):
+    extraction = extract_json(text)
+    assert not extraction.ok
+    assert extraction.error == "empty response"
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        ({"score": 8}, (8.0, "score")),
+        ({"score": "unknown", "rating": "6.5/10"}, (6.5, "rating")),
+        ({"rating": "75/100"}, (7.5, "rating")),
+        ({"rating": "7,5 / 10"}, (7.5, "rating")),
+        ({"overall_score": 7}, (7.0, "overall_score")),
+        ({"score": True}, (None, None)),
+        ({"verdict": "HOLD"}, (None, None)),
+    ],
+)
+def test_score_from(data, expected):
+    assert score_from(data) == expected
+
+
+# ---------------- result_parser.safe_load_json ---------------- #
+@pytest.mark.parametrize(
+    "text, source, score",
+    [
+        ("", "empty", 5),
+        ("   ", "empty", 5),
+        ('"scorenumeric"', "score_key_only", 5),
+        ('"hello"', "quoted_string", 5),
+        ('{"rating": "7.5/10", "verdict": "BUY"}', "json", 7.5),
+        ('{"score": 15}', "json", 10.0),
+        ('{"score": 0}', "json", 1.0),
+        ("Score: 7.5/10", "number", 7.5),
+        ("Оценка 7,5", "number", 7.5),
+        ("I think 8", "number", 8.0),
+        ('{"verdict": "HOLD"} maybe 6', "number", 6.0),
+        ("no idea", "fallback", 5),
+    ],
+)
+def test_safe_load_json_source(text, source, score):
+    parsed = safe_load_json(text)
+    assert parsed["source"] == source
+    assert parsed["score"] == pytest.approx(score)
+    assert parsed["score_numeric"] == parsed["score"]
+    assert parsed["verdict"] in {"BUY", "HOLD", "AVOID"}
+
+
+def test_safe_load_json_keeps_fields_and_repairs():
+    parsed = safe_load_json('{"rating": "8/10", "verdict": "STRONG_BUY", "token_symbol": "XYZ",}')
+    assert parsed["source"] == "json"
+    assert parsed["verdict"] == "STRONG_BUY"
+    assert parsed["token_symbol"] == "XYZ"
+    assert parsed["repairs"] == [TRAILING_COMMA]
+
+
+@pytest.mark.parametrize("score, verdict", [("8", "BUY"), ("7", "BUY"), ("5.5", "HOLD"), ("3", "AVOID")])
+def test_safe_load_json_number_verdict(score, verdict):
+    assert safe_load_json(score)["verdict"] == verdict
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from backend.scanner.json_stream import JsonArrayStream
+
+DOC = b'[-5.5e3, 1e5, 0, true, null, {"a": [1, 2]}, "\xd1\x82\xd0\xb5\xd0\xba\xd1\x81\xd1\x82", 12, -0.25]'
+
+
+def _parse(chunks):
+    stream = JsonArrayStream()
+    items = []
+    for chunk in chunks:
+        items.extend(stream.feed(chunk))
+    items.extend(stream.feed(b"", final=True))
+    return items
+
+
+@pytest.mark.parametrize("split", range(1, len(DOC)))
+def test_every_two_way_split(split):
+    assert _parse([DOC[:split], DOC[split:]]) == json.loads(DOC)
+
+
+def test_byte_by_byte():
+    assert _parse([DOC[i:i + 1] for i in range(len(DOC))]) == json.loads(DOC)
+
+
+@pytest.mark.parametrize(
+    "chunks, expected",
+    [
+        ([b"[-5.", b"5e3]"], [-5.5e3]),
+        ([b"[1", b"e5]"], [1e5]),
+        ([b"[12", b"34, 5]"], [1234, 5]),
+        ([b"[-", b"1]"], [-1]),
+        ([b"[tr", b"ue]"], [True]),
+    ],
+)
+def test_number_held_back_at_chunk_boundary(chunks, expected):
+    assert _parse(chunks) == expected
+
+
+def test_number_held_until_next_chunk():
+    stream = JsonArrayStream()
+    assert stream.feed(b"[1, -5.") == [1]
+    assert stream.feed(b"5e3") == []
+    assert stream.feed(b", 2]") == [-5.5e3, 2]
+
+
+def test_truncated_array_raises():
+    with pytest.raises(ValueError):
+        _parse([b"[1, 2"])
+
+
+def test_not_an_array_raises():
+    with pytest.raises(ValueError):
+        _parse([b'{"a": 1}'])
@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.analyzer.model_health import CLOSED, ERROR, HALF_OPEN, OK, OPEN, ModelHealth, ModelRouter
+from backend.analyzer.openrouter_analyzer import EnsembleOpenRouterAnalyzer
+from backend.analyzer.rate_limiter import RateLimiter
+from backend.analyzer.result_cache import LLMResultCache
+
+
+def _opened(health, now=1000.0):
+    for _ in range(health.consecutive_limit):
+        health.record(ERROR, now=now)
+    return health
+
+
+def test_breaker_opens_after_consecutive_failures():
+    health = ModelHealth("m", consecutive_failures=3, cooldown=60)
+    health.record(ERROR, now=1000.0)
+    health.record(ERROR, now=1000.0)
+    assert health.state == CLOSED
+    health.record(ERROR, now=1000.0)
+    assert health.state == OPEN
+    assert health.open_until == 1060.0
+    assert not health.allow(now=1059.0)
+    assert not health.probe_due(now=1059.0)
+
+
+def test_half_open_probe_closes_on_success():
+    health = _opened(ModelHealth("m", cooldown=60))
+    assert health.probe_due(now=1060.0)
+    assert health.allow(now=1060.0)
+    assert health.state == HALF_OPEN
+    # Only one probe at a time.
+    assert not health.allow(now=1060.0)
+    assert not health.probe_due(now=1060.0)
+    health.record(OK, now=1061.0)
+    assert health.state == CLOSED
+    assert health.cooldown == 60
+    assert health.allow(now=1061.0)
+
+
+def test_failed_probe_reopens_with_doubled_cooldown():
+    health = _opened(ModelHealth("m", cooldown=60, max_cooldown=100))
+    assert health.allow(now=1060.0)
+    health.record(ERROR, now=1060.0)
+    assert health.state == OPEN
+    assert health.open_until == 1160.0  # 120s capped at max_cooldown
+    assert health.allow(now=1160.0)
+    health.release()
+    assert health.probe_due(now=1160.0)
+
+
+def test_router_skips_open_models_and_adds_due_probes():
+    router = ModelRouter({"cooldown": 60})
+    _opened(router.health("b"), now=0.0)
+    primaries, spares = router.route([("a", "A"), ("b", "B"), ("c", "C")], primary_count=1)
+    # b's cooldown (from t=0) is long over: it joins as an extra primary.
+    assert primaries == ["A", "B"]
+    assert spares == ["C"]
+    assert router.health("b").state == HALF_OPEN
+    assert router.due() == []
+
+
+class FakeClient:
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer))])
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+
+def _ensemble(tmp_path, answer):
+    ensemble = EnsembleOpenRouterAnalyzer(
+        api_key="test",
+        models=["m1", "m2"],
+        cache=LLMResultCache(str(tmp_path / "cache.db")),
+        rate_limiter=RateLimiter(state_path=None),
+    )
+    client = FakeClient(answer)
+    for analyzer in ensemble.single:
+        analyzer.client = client
+    _opened(ensemble.router.health("m1"), now=0.0)
+    return ensemble, client
+
+
+def test_timer_probe_closes_recovered_model(tmp_path):
+    ensemble, client = _ensemble(tmp_path, '{"ok": true}')
+    assert asyncio.run(ensemble.probe_due()) == {"m1": OK}
+    assert ensemble.router.health("m1").state == CLOSED
+    assert len(client.requests) == 1
+    assert client.requests[0]["max_tokens"] <= 8
+    # Probe latency stays out of the hedging windows.
+    assert len(ensemble.router.health("m1").latency["single"]) == 0
+
+
+def test_timer_probe_reopens_failing_model(tmp_path):
+    ensemble, _ = _ensemble(tmp_path, RuntimeError("503"))
+    health = ensemble.router.health("m1")
+    assert asyncio.run(ensemble.probe_due()) == {"m1": ERROR}
+    assert health.state == OPEN
+    assert health.cooldown == min(health.base_cooldown * 2, health.max_cooldown)
+
+
+def test_timer_probe_leaves_claimed_probe_alone(tmp_path):
+    ensemble, client = _ensemble(tmp_path, '{"ok": true}')
+    assert ensemble.router.health("m1").allow()
+    assert asyncio.run(ensemble.probe_due()) == {}
+    assert client.requests == []
@@ -0,0 +1,222 @@
+import asyncio
+
+from aiohttp import web
+
+from backend.analyzer.ollama_analyzer import OllamaCouncilAnalyzer
+from backend.ollama_client import GB, LOAD_OVERHEAD, OllamaClient
+
+SIZES = {"a": 2 * GB, "b": 2 * GB, "c": 2 * GB}
+
+
+class StubOllama:
+    """Локальный HTTP-сервер с /api/tags, /api/ps и /api/generate."""
+
+    def __init__(self, gen_delay=0.0, unload_delay=0.0):
+        self.gen_delay = gen_delay
+        self.unload_delay = unload_delay
+        self.loaded = set()
+        self.events = []
+        self.payloads = []
+
+    async def tags(self, request):
+        return web.json_response({"models": [{"name": m, "size": s} for m, s in SIZES.items()]})
+
+    async def ps(self, request):
+        return web.json_response({"models": [{"name": m, "size": int(SIZES[m] * LOAD_OVERHEAD)} for m in self.loaded]})
+
+    async def generate(self, request):
+        body = await request.json()
+        self.payloads.append(body)
+        model = body["model"]
+        if body.get("keep_alive") == 0:
+            self.events.append(("unload_start", model))
+            await asyncio.sleep(self.unload_delay)
+            self.loaded.discard(model)
+            self.events.append(("unload", model))
+            return web.json_response({"done": True})
+        self.loaded.add(model)
+        if "prompt" not in body:
+            self.events.append(("warm", model))
+            return web.json_response({"response": "", "done": True})
+        self.events.append(("gen_start", model))
+        await asyncio.sleep(self.gen_delay)
+        self.events.append(("gen", model))
+        return web.json_response({"response": "7", "done": True})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/api/tags", self.tags)
+        app.router.add_get("/api/ps", self.ps)
+        app.router.add_post("/api/generate", self.generate)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        self.url = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def _client(stub, budget_gb=5):
+    return OllamaClient(base_url=stub.url, keep_alive="30m", memory_budget_gb=budget_gb, timeout=5)
+
+
+def _run(coro_fn, **stub_kwargs):
+    async def main():
+        async with StubOllama(**stub_kwargs) as stub:
+            client = _client(stub)
+            try:
+                return stub, client, await coro_fn(stub, client)
+            finally:
+                await client.close()
+
+    return asyncio.run(main())
+
+
+# ---------------- Планировщик памяти ---------------- #
+def test_least_recently_used_idle_model_is_unloaded_before_the_next_load():
+    async def scenario(stub, client):
+        await client.generate("a", "x")
+        await client.generate("b", "x")
+        await client.generate("c", "x")
+
+    stub, client, _ = _run(scenario)
+    order = [e for e in stub.events if e[0] in ("unload", "gen")]
+    assert order == [("gen", "a"), ("gen", "b"), ("unload", "a"), ("gen", "c")]
+    assert client.scheduler.evictions == 1
+    assert sorted(client.scheduler.resident) == ["b", "c"]
+    assert client.scheduler.used() <= client.scheduler.budget
+
+
+def test_busy_model_is_never_evicted():
+    async def scenario(stub, client):
+        await client.generate("a", "x")
+        await client.generate("b", "x")
+        # a генерирует, c нужна память — вытесняется только простаивающая b.
+        await asyncio.gather(client.generate("a", "x"), client.generate("c", "x"))
+
+    stub, client, _ = _run(scenario, gen_delay=0.05)
+    assert ("unload", "a") not in stub.events
+    assert ("unload", "b") in stub.events
+    assert client.scheduler.state()["active"] == {}
+
+
+def test_unload_does_not_block_other_requests():
+    async def scenario(stub, client):
+        await client.generate("a", "x")
+        await client.generate("b", "x")
+        # c вытесняет a (медленная выгрузка), b уже загружена и ждать не должна.
+        await asyncio.gather(client.generate("c", "x"), client.generate("b", "x"))
+
+    stub, client, _ = _run(scenario, unload_delay=0.2)
+    events = stub.events[stub.events.index(("unload_start", "a")):]
+    assert events.index(("gen", "b")) < events.index(("unload", "a"))
+    # c начинает генерацию только после выгрузки a.
+    assert events.index(("unload", "a")) < events.index(("gen_start", "c"))
+
+
+def test_model_being_unloaded_is_not_reacquired_early():
+    async def scenario(stub, client):
+        await client.generate("a", "x")
+        await client.generate("b", "x")
+        evict = asyncio.create_task(client.generate("c", "x"))
+        await asyncio.sleep(0.05)
+        await client.generate("a", "x")
+        await evict
+
+    stub, _, _ = _run(scenario, unload_delay=0.2)
+    events = stub.events
+    assert events.index(("unload", "a")) < len(events) - 1 - events[::-1].index(("gen_start", "a"))
+
+
+# ---------------- keep_alive и прогрев ---------------- #
+def test_generate_sends_keep_alive():
+    stub, _, text = _run(lambda stub, client: client.generate("a", "hello", options={"temperature": 0.2}))
+    assert text == "7"
+    payload = stub.payloads[-1]
+    assert payload["keep_alive"] == "30m"
+    assert payload["stream"] is False
+    assert payload["options"] == {"temperature": 0.2}
+
+
+def test_warm_up_loads_what_fits_without_evicting():
+    stub, client, warmed = _run(lambda stub, client: client.warm_up(["a", "b", "c", "a", ""]))
+    assert warmed == ["a", "b"]
+    assert [e for e in stub.events if e[0] == "warm"] == [("warm", "a"), ("warm", "b")]
+    assert all("prompt" not in p and p["keep_alive"] == "30m" for p in stub.payloads)
+    assert client.scheduler.evictions == 0
+
+
+def test_warm_up_syncs_with_loaded_models():
+    async def scenario(stub, client):
+        stub.loaded.add("c")
+        return await client.warm_up(["a", "b"])
+
+    _, client, warmed = _run(scenario)
+    # c уже занимает память на сервере, поэтому помещается только a.
+    assert warmed == ["a"]
+    assert sorted(client.scheduler.resident) == ["a", "c"]
+
+
+# ---------------- Совет моделей ---------------- #
+class FakeClient:
+    def __init__(self, answers):
+        self.answers = answers
+        self.prompts = {}
+
+    async def generate(self, model, prompt, timeout=None, options=None):
+        self.prompts[model] = prompt
+        answer = self.answers[model]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+PROJECT = {"id": "p", "name": "Proto", "category": "Lending", "source": "defillama",
+           "description": "Lending market", "url": "https://proto.xyz", "metrics": {"tvl": 1234567}}
+
+
+def _council(answers, chairman="chair"):
+    client = FakeClient(answers)
+    analyzer = OllamaCouncilAnalyzer(client=client, council=["an", "rk", "tc"], chairman=chairman)
+    return client, asyncio.run(analyzer.analyze_project(PROJECT))
+
+
+def test_council_blend_inverts_risk():
+    _, result = _council({"an": "8", "rk": "3", "tc": "5", "chair": "6"})
+    # голоса 8, 11-3=8, 5 -> 7.0; пополам с председателем 6 -> 6.5
+    assert result["score"] == 6.5
+    assert result["verdict"] == "HOLD"
+    assert result["council"] == {"analyst:an": 8.0, "risk:rk": 3.0, "tech:tc": 5.0}
+    assert result["chairman_score"] == 6.0
+    assert result["models_used"] == 4
+    assert "is_fallback" not in result
+
+
+def test_council_chairman_only():
+    _, result = _council({"an": RuntimeError("down"), "rk": "no idea", "tc": "", "chair": "8"})
+    assert result["score"] == 8.0
+    assert result["verdict"] == "STRONG_BUY"
+    assert result["council"] == {}
+    assert result["models_used"] == 1
+
+
+def test_council_without_chairman():
+    _, result = _council({"an": "9", "rk": "2", "tc": "7"}, chairman="")
+    assert result["score"] == 8.3
+    assert result["chairman_score"] is None
+
+
+def test_council_no_votes_falls_back():
+    _, result = _council({"an": "", "rk": RuntimeError("down"), "tc": "n/a", "chair": ""})
+    assert result.get("is_fallback") is True
+
+
+def test_council_prompts_carry_project_fields():
+    client, _ = _council({"an": "8", "rk": "3", "tc": "5", "chair": "6"})
+    for prompt in client.prompts.values():
+        assert "Lending market" in prompt
+        assert "1,234,567" in prompt
+        assert "https://proto.xyz" in prompt
+        assert "defillama" in prompt
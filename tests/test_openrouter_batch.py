@@ -0,0 +1,80 @@
+import asyncio
+import json
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from backend.analyzer.openrouter_analyzer import EnsembleOpenRouterAnalyzer, OpenRouterAnalyzer
+from backend.analyzer.result_cache import LLMResultCache
+
+PROJECTS = [
+    {"id": "p1", "name": "One", "category": "Lending", "metrics": {"tvl": 5e6}},
+    {"id": "p2", "name": "Two", "category": "Dexes", "metrics": {"tvl": 7e6}},
+]
+
+
+class FakeClient:
+    """Answers batch prompts with a JSON array and single prompts with one object."""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    async def create(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        ids = [p["id"] for p in PROJECTS if f"### id: {p['id']}" in prompt]
+        if ids:
+            text = json.dumps([{"id": pid, "rating": "6/10", "verdict": "HOLD"} for pid in ids])
+        else:
+            text = json.dumps({"rating": "8/10", "verdict": "BUY"})
+        completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+
+def _run(cache, *steps):
+    client = FakeClient()
+    analyzer = OpenRouterAnalyzer(client, "test/model", cache=cache)
+
+    async def main():
+        return [await step(analyzer) for step in steps]
+
+    return client, asyncio.run(main())
+
+
+def test_batch_answers_are_not_served_to_single_analysis(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    client, (batch, single) = _run(
+        cache,
+        lambda a: a.analyze_batch(PROJECTS),
+        lambda a: a.analyze_project(PROJECTS[0]),
+    )
+    assert batch["p1"]["score"] == 6.0
+    # The batch answer stays under the batch key; the single prompt is asked.
+    assert single["score"] == 8.0
+    assert len(client.prompts) == 2
+    cache.close()
+
+
+def test_batch_prefers_cached_single_answer(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    client, (_, batch, again) = _run(
+        cache,
+        lambda a: a.analyze_project(PROJECTS[0]),
+        lambda a: a.analyze_batch(PROJECTS),
+        lambda a: a.analyze_batch(PROJECTS),
+    )
+    assert batch["p1"]["score"] == 8.0
+    assert batch["p2"]["score"] == 8.0  # sent alone: a one-project chunk uses the single prompt
+    assert again == batch
+    assert len(client.prompts) == 2
+    cache.close()
+
+
+def test_ensemble_close_closes_the_cache(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    ensemble = EnsembleOpenRouterAnalyzer(api_key="test", models=["test/model"], cache=cache)
+    asyncio.run(ensemble.close())
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache._conn.execute("SELECT 1")
@@ -0,0 +1,101 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from backend.analyzer.openrouter_analyzer import PROMPT_TEMPLATE, OpenRouterAnalyzer, cacheable
+from backend.analyzer.result_cache import LLMResultCache
+
+PROJECT = {"id": "p1", "name": "Proto", "category": "Lending", "metrics": {"tvl": 5e6}}
+
+ANSWER = (
+    '{"rating": "7.5/10", "verdict": "BUY", "exchanges": ["Uniswap"], "where_to_buy": "dex", '
+    '"token_symbol": "PRT", "contract_address": "0xabc", "data_limitations": "' + "x" * 200 + '"}'
+)
+
+
+class FakeStream:
+    def __init__(self, text, size=7):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent >= len(self.chunks):
+            raise StopAsyncIteration
+        self.sent += 1
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.chunks[self.sent - 1]))])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, text):
+        self.text = text
+        self.streams = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        stream = FakeStream(self.text)
+        self.streams.append(stream)
+        return SimpleNamespace(headers={}, parse=lambda: stream)
+
+
+def _analyzer(client, cache):
+    return OpenRouterAnalyzer(
+        client,
+        "test/model",
+        cache=cache,
+        streaming=True,
+        required_fields=["score|rating", "verdict", "token_symbol"],
+    )
+
+
+def test_early_stopped_stream_is_cached(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    client = FakeClient(ANSWER)
+    analyzer = _analyzer(client, cache)
+    try:
+        first = asyncio.run(analyzer.analyze_project(PROJECT))
+        assert first["stopped_early"] is True
+        assert first["score"] == 7.5
+        assert first["where_to_buy"] == "dex"
+        assert first["exchanges"] == ["Uniswap"]
+        stream = client.streams[0]
+        assert stream.closed and stream.sent < len(stream.chunks)
+
+        second = asyncio.run(analyzer.analyze_project(PROJECT))
+        assert len(client.streams) == 1
+        assert second["score"] == 7.5
+        assert cache.stats()["hits"] == 1
+    finally:
+        cache.close()
+
+
+def test_truncated_stream_is_not_cached(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    client = FakeClient('{"rating": "6/10", "verdict": "HOLD", "research_summary": "обры')
+    analyzer = _analyzer(client, cache)
+    try:
+        result = asyncio.run(analyzer.analyze_project(PROJECT))
+        assert result["is_truncated"] is True
+        asyncio.run(analyzer.analyze_project(PROJECT))
+        assert len(client.streams) == 2
+    finally:
+        cache.close()
+
+
+def test_required_fields_close_the_template():
+    fields = [line.split('"')[1] for line in PROMPT_TEMPLATE.splitlines() if line.startswith('  "')]
+    assert fields[-2:] == ["token_symbol", "contract_address"]
+    assert fields.index("where_to_buy") < fields.index("token_symbol")
+
+
+def test_cacheable():
+    assert cacheable({"score": 7, "stopped_early": True})
+    assert not cacheable({"score": 7, "is_truncated": True})
+    assert not cacheable({"score": 5, "is_fallback": True})
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.analyzer.openrouter_analyzer import OpenRouterAnalyzer
+from backend.analyzer.prescreen import Prescreener, select_prompt
+from backend.analyzer.result_cache import LLMResultCache
+
+
+@pytest.mark.parametrize(
+    "project, kind",
+    [
+        ({"name": "repo", "source": "github", "metrics": {"tvl": 0.0}}, "generic"),
+        ({"name": "repo", "source": "github"}, "generic"),
+        ({"name": "pool", "source": "defillama", "metrics": {"tvl": 0}}, "defi"),
+        ({"name": "pool", "source": "defillama", "metrics": {"tvl": 5e6}}, "defi"),
+        ({"name": "other", "source": "manual", "metrics": {"tvl": 1e6}}, "defi"),
+        ({"name": "art", "source": "github", "category": "NFT", "metrics": {"tvl": 0.0}}, "nft"),
+    ],
+)
+def test_select_prompt_kind(project, kind):
+    assert select_prompt(project)[0] == kind
+
+
+def test_github_prompt_has_no_tvl():
+    _, prompt = select_prompt({"name": "repo", "source": "github", "metrics": {"tvl": 0.0}})
+    assert "TVL" not in prompt
+    assert "github" in prompt
+
+
+class FakeClient:
+    """Answers every prompt with the score registered for the project name in it."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        prompt = kwargs["messages"][-1]["content"]
+        answer = next(text for name, text in self.answers.items() if name in prompt)
+        if isinstance(answer, Exception):
+            raise answer
+        completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+
+def _pool(name, tvl=5e6):
+    return {"id": name.lower(), "name": name, "source": "defillama", "metrics": {"tvl": tvl}}
+
+
+def _prescreener(client, cache=None, cutoff=6.0):
+    return Prescreener(OpenRouterAnalyzer(client, "test/small", cache=cache), cutoff=cutoff)
+
+
+def test_screen_splits_by_cutoff():
+    client = FakeClient({"Alpha": "7", "Beta": "6", "Gamma": "5.9", "Delta": "9"})
+    projects = [_pool("Alpha"), _pool("Beta"), _pool("Gamma"), _pool("Delta")]
+    passed, rejected = asyncio.run(_prescreener(client).screen(projects))
+    assert [p["name"] for p in passed] == ["Delta", "Alpha", "Beta"]
+    assert [p["name"] for p in rejected] == ["Gamma"]
+    assert rejected[0]["prescreen"] == {"score": 5.9, "kind": "defi", "model": "test/small"}
+
+
+@pytest.mark.parametrize("answer", ["", '"hello"', "no idea", RuntimeError("boom")])
+def test_unscored_project_passes_last(answer):
+    client = FakeClient({"Alpha": "3", "Beta": answer, "Gamma": "8"})
+    passed, rejected = asyncio.run(_prescreener(client).screen([_pool("Alpha"), _pool("Beta"), _pool("Gamma")]))
+    assert [p["name"] for p in passed] == ["Gamma", "Beta"]
+    assert passed[-1]["prescreen"]["score"] is None
+    assert [p["name"] for p in rejected] == ["Alpha"]
+
+
+def test_score_is_cached_across_tvl_changes(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    client = FakeClient({"Alpha": "7"})
+    prescreener = _prescreener(client, cache)
+    first = asyncio.run(prescreener.score(_pool("Alpha", tvl=5_000_000)))
+    # Same TVL band: the filled prompt differs, the cache key does not.
+    second = asyncio.run(prescreener.score(_pool("Alpha", tvl=5_100_000)))
+    assert first == second == {"score": 7.0, "kind": "defi", "model": "test/small"}
+    assert client.calls == 1
+    assert cache.hits == 1
+    # TVL halved: a new band, asked again.
+    asyncio.run(prescreener.score(_pool("Alpha", tvl=2_000_000)))
+    assert client.calls == 2
+    cache.close()
+
+
+def test_unscored_answer_is_not_cached(tmp_path):
+    cache = LLMResultCache(str(tmp_path / "cache.db"))
+    client = FakeClient({"Alpha": "no idea"})
+    prescreener = _prescreener(client, cache)
+    for _ in range(2):
+        assert asyncio.run(prescreener.score(_pool("Alpha")))["score"] is None
+    assert client.calls == 2
+    cache.close()
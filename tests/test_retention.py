@@ -0,0 +1,76 @@
+import asyncio
+import gzip
+import json
+import os
+
+from backend.storage import blobs
+from backend.storage.database import Database
+from backend.storage.migrations import migrate_path
+from backend.storage.retention import EventRetention
+
+
+def _events(conn, project_id, count):
+    for i in range(count):
+        conn.execute(
+            "INSERT INTO events (project_id, event_type, data_ref, timestamp) VALUES (?, 'analysis', ?, ?)",
+            (project_id, blobs.put(conn, {"n": i}), f"2024-0{1 + i // 4}-01 00:00:{i:02d}"),
+        )
+
+
+def _run(path, setup, **kwargs):
+    async def main():
+        db = Database(path)
+        retention = EventRetention(db, archive_dir=os.path.join(os.path.dirname(path), "archive"), **kwargs)
+        try:
+            await db.write(setup)
+            result = await retention.run_once()
+            left = await db.fetchall("SELECT project_id, COUNT(*) AS n FROM events GROUP BY project_id ORDER BY project_id")
+            auto_vacuum = await db.exclusive(lambda conn: conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+            return result, {row["project_id"]: row["n"] for row in left}, auto_vacuum
+        finally:
+            await db.close()
+
+    return asyncio.run(main())
+
+
+def _archived(archive_dir):
+    records = []
+    for name in sorted(os.listdir(archive_dir)):
+        with gzip.open(os.path.join(archive_dir, name), "rt", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_expired_events_are_archived_in_chunks(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    migrate_path(path)
+
+    def setup(conn):
+        _events(conn, "a", 7)
+        _events(conn, "b", 2)
+
+    result, left, _ = _run(path, setup, keep_per_project=3, max_records=100, batch=2)
+    assert result["archived"] == 4
+    assert left == {"a": 3, "b": 2}
+    records = _archived(str(tmp_path / "archive"))
+    assert sorted(r["id"] for r in records) == [1, 2, 3, 4]
+    assert records[0]["event_data"] == {"n": 0}
+    # {"n": 0} and {"n": 1} are still referenced by b's events.
+    assert result["blobs_removed"] == 2
+
+
+def test_max_records_caps_the_whole_table(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    migrate_path(path)
+    result, left, _ = _run(path, lambda conn: _events(conn, "a", 5), keep_per_project=10, max_records=2, batch=100)
+    assert result["archived"] == 3
+    assert left == {"a": 2}
+
+
+def test_full_vacuum_needs_opt_in(tmp_path):
+    path = str(tmp_path / "db.sqlite")
+    migrate_path(path)
+    _, _, auto_vacuum = _run(path, lambda conn: _events(conn, "a", 1))
+    assert auto_vacuum == 0
+    _, _, auto_vacuum = _run(path, lambda conn: None, vacuum_convert=True)
+    assert auto_vacuum == 2
@@ -0,0 +1,175 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+from backend.scanner.crypto_scanner import CryptoTracker, merge_projects
+from backend.scanner.sources import GitHubSource, ScanSource, TokenBucket
+
+
+def _project(pid, source, url=None, **extra):
+    return {"id": pid, "name": pid, "source": source, "url": url, **extra}
+
+
+# ---------------- TokenBucket ---------------- #
+def test_token_bucket_burst_then_rate():
+    async def main():
+        bucket = TokenBucket(rate=20, per=1, burst=2)
+        times = []
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+            times.append(time.monotonic() - start)
+        return times
+
+    times = asyncio.run(main())
+    assert times[1] < 0.03  # запас burst — без ожидания
+    assert times[3] >= 0.09  # дальше по одному токену раз в 1/20 с
+
+
+def test_token_bucket_refills_while_idle():
+    async def main():
+        bucket = TokenBucket(rate=20, per=1, burst=1)
+        await bucket.acquire()
+        await asyncio.sleep(0.06)
+        start = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) < 0.02
+
+
+# ---------------- fetch_json через локальный HTTP-сервер ---------------- #
+REPOS = [
+    {"full_name": "org/Alpha", "name": "Alpha", "html_url": "https://github.com/org/Alpha",
+     "homepage": "https://alpha.xyz", "topics": ["defi"], "stargazers_count": 50},
+    {"full_name": "org/beta", "name": "beta", "html_url": "https://github.com/org/beta",
+     "topics": ["nft"], "stargazers_count": 20},
+]
+
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_get("/search", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/search"
+
+
+def test_fetch_json_respects_concurrency_and_headers():
+    state = {"active": 0, "peak": 0, "accept": []}
+
+    async def handler(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        state["accept"].append(request.headers.get("Accept"))
+        await asyncio.sleep(0.02)
+        state["active"] -= 1
+        return web.json_response({"items": REPOS})
+
+    async def main():
+        runner, url = await _serve(handler)
+        tracker = CryptoTracker({"sources": {}})
+        try:
+            source = GitHubSource(tracker, {"api_url": url, "max_concurrency": 1, "queries": ["a", "b", "c"]})
+            projects = await source.scan()
+        finally:
+            await tracker.close()
+            await runner.cleanup()
+        return projects
+
+    projects = asyncio.run(main())
+    assert state["peak"] == 1
+    assert state["accept"] == ["application/vnd.github+json"] * 3
+    # Одни и те же репозитории из трёх запросов — по одному разу.
+    assert sorted(p["id"] for p in projects) == ["github_org_alpha", "github_org_beta"]
+    alpha = next(p for p in projects if p["id"] == "github_org_alpha")
+    assert alpha["url"] == "https://alpha.xyz"
+    assert alpha["category"] == "DeFi"
+    assert alpha["metrics"]["stars"] == 50
+
+
+def test_fetch_json_http_error_gives_none():
+    async def handler(request):
+        return web.Response(status=500)
+
+    async def main():
+        runner, url = await _serve(handler)
+        tracker = CryptoTracker({"sources": {}})
+        try:
+            source = GitHubSource(tracker, {"api_url": url})
+            return await source.fetch_json(url), await source.scan()
+        finally:
+            await tracker.close()
+            await runner.cleanup()
+
+    assert asyncio.run(main()) == (None, [])
+
+
+# ---------------- merge_projects ---------------- #
+def test_merge_dedupes_by_id():
+    merged = merge_projects([[_project("a", "defillama")], [_project("a", "github")]])
+    assert len(merged) == 1
+    assert merged[0]["sources"] == ["defillama", "github"]
+
+
+def test_merge_dedupes_across_sources_by_normalised_url():
+    first = _project("uni", "defillama", "https://www.Uniswap.org/", links={"twitter": "t"})
+    second = _project("github_uniswap", "github", "uniswap.org", links={"github": "g", "twitter": "other"})
+    merged = merge_projects([[first], [second]])
+    assert [p["id"] for p in merged] == ["uni"]
+    assert merged[0]["links"] == {"twitter": "t", "github": "g"}
+    assert merged[0]["sources"] == ["defillama", "github"]
+
+
+def test_merge_keeps_same_url_within_one_source():
+    batch = [_project("uni-v2", "defillama", "https://uniswap.org"), _project("uni-v3", "defillama", "https://uniswap.org")]
+    assert [p["id"] for p in merge_projects([batch])] == ["uni-v2", "uni-v3"]
+
+
+def test_merge_without_url():
+    merged = merge_projects([[_project("a", "defillama")], [_project("b", "github")]])
+    assert [p["id"] for p in merged] == ["a", "b"]
+
+
+# ---------------- scan_candidates: изоляция источников ---------------- #
+class FakeSource(ScanSource):
+    def __init__(self, tracker, name, result=None, delay=0.0, error=None, timeout=1.0):
+        super().__init__(tracker, {"timeout": timeout})
+        self.name = name
+        self.result = result or []
+        self.delay = delay
+        self.error = error
+
+    async def scan(self):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_scan_candidates_isolates_slow_and_failing_sources():
+    async def main():
+        tracker = CryptoTracker({"sources": {}})
+        tracker.sources = [
+            FakeSource(tracker, "fast", [_project("a", "fast", "https://a.xyz")]),
+            FakeSource(tracker, "slow", [_project("b", "slow")], delay=5, timeout=0.05),
+            FakeSource(tracker, "broken", error=RuntimeError("boom")),
+            FakeSource(tracker, "other", [_project("c", "other", "https://a.xyz/")]),
+        ]
+        start = time.monotonic()
+        try:
+            result = await tracker.scan_candidates()
+        finally:
+            await tracker.close()
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(main())
+    assert elapsed < 1
+    assert result["source_errors"] == {"slow": "timeout", "broken": "boom"}
+    assert result["source_counts"] == {"fast": 1, "slow": 0, "broken": 0, "other": 1}
+    assert [p["id"] for p in result["candidates"]] == ["a"]
+    assert result["candidates"][0]["sources"] == ["fast", "other"]
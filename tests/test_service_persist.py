@@ -0,0 +1,66 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from backend.service.main_service import CryptoAlphaService
+from backend.storage import blobs
+from backend.storage.database import Database
+
+
+class Tracker:
+    def __init__(self):
+        self.committed = []
+
+    def commit_processed(self, projects):
+        self.committed.extend(p["id"] for p in projects)
+
+
+def _service(tmp_path):
+    service = CryptoAlphaService.__new__(CryptoAlphaService)
+    service.db = Database(str(tmp_path / "db.sqlite"))
+    service._schema_checked = False
+    service.tracker = Tracker()
+    service.fork_index = None
+    return service
+
+
+def _run(service, coro_fn):
+    async def main():
+        try:
+            await service.save_projects([{"id": "p1", "name": "P1", "raw_data": {"slug": "p1"}}])
+            return await coro_fn()
+        finally:
+            await service.db.close()
+
+    return asyncio.run(main())
+
+
+def test_persist_commits_after_successful_write(tmp_path):
+    service = _service(tmp_path)
+    item = {"project": {"id": "p1"}, "analysis": {"score": 7, "verdict": "BUY"}}
+
+    async def persist():
+        await service._stage_persist(item)
+        return await service.db.fetchone("SELECT status, verdict FROM projects WHERE id = 'p1'")
+
+    assert _run(service, persist) == {"status": "analyzed", "verdict": "BUY"}
+    assert service.tracker.committed == ["p1"]
+
+
+def test_failed_write_is_not_committed(tmp_path, monkeypatch):
+    service = _service(tmp_path)
+    item = {"project": {"id": "p1"}, "analysis": {"score": 7, "verdict": "BUY"}}
+
+    def broken(conn, packed):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    async def persist():
+        monkeypatch.setattr(blobs, "store", broken)
+        with pytest.raises(sqlite3.OperationalError):
+            await service._stage_persist(item)
+        monkeypatch.undo()
+        return await service.db.fetchone("SELECT status FROM projects WHERE id = 'p1'")
+
+    assert _run(service, persist) == {"status": "new"}
+    assert service.tracker.committed == []